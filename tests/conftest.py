@@ -0,0 +1,39 @@
+import collections
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yapr  # noqa: E402
+
+
+@pytest.fixture
+def radar(tmp_path, monkeypatch):
+    """A fresh server session on a replayed-log clock, with every file yapr writes kept in tmp_path"""
+    monkeypatch.setattr(yapr, "clock", yapr.LogClock(0))
+    monkeypatch.setattr(yapr, "EXPORT_LOG_PATH", str(tmp_path / "export.json"))
+    monkeypatch.setattr(yapr, "heatmaps", yapr.HeatmapStore(str(tmp_path / "heatmaps.npz")))
+    monkeypatch.setattr(yapr, "player_registry", yapr.PlayerRegistry(str(tmp_path / "players.db")))
+    monkeypatch.setattr(yapr, "detection_rules", yapr.DetectionRules(yapr.BUILTIN_RULES, str(tmp_path / "yapr_rules.json")))
+    monkeypatch.setattr(yapr.state, "persistent", dict(yapr.state.persistent,
+                                                       player_name="MyPilot", player_pos=None))
+    monkeypatch.setattr(yapr.state, "session", yapr.ServerSession(1, None))
+    return yapr.state
+
+
+@pytest.fixture
+def replay(radar):
+    """Parse log lines as the parser thread would, returns the events they logged"""
+    src = yapr.LogSource("TEST", "test.log", replay=True)
+    recent_lines = collections.deque(maxlen=400)
+
+    def feed(log: str):
+        before = {rec.seq for rec in radar["events"]}
+        lines = [line.strip().encode() for line in log.strip().splitlines()]
+        for raw in yapr.wanted_lines(src, lines):  # Through the byte prefilter, as the tailers do
+            yapr.parse_line((raw, 0.0, src.name), recent_lines)
+        return [rec for rec in reversed(radar["events"]) if rec.seq not in before]
+
+    return feed
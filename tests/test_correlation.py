@@ -0,0 +1,63 @@
+import yapr
+
+DEATH = ("<{ts}> [Notice] <Actor Death> CActor::Kill: '{victim}' [300] in zone 'rs_int_p6leo_ruinstation' "
+         "killed by '{killer}' [2] using 'behr_rifle_01' [Class behr_rifle] with damage type 'Bullet' "
+         "from direction x: 0.1, y: 0.2, z: 0.3")
+HIT = "<{ts}> [Notice] Fake hit FROM {attacker} TO body_01. Being sent to child {victim}"
+
+
+def engagements(events):
+    return [str(rec.detail) for rec in events if rec.kind == "engagement"]
+
+
+def test_death_joins_the_incap_and_hits_before_it():
+    engine = yapr.CorrelationEngine()
+    engine.hit("Bob", "Alice", 100.0)
+    engine.outcome("incap", "Alice", 101.0)
+    eng = engine.outcome("death", "Alice", 102.0, "Bob")
+    assert eng.describe() == "killed by Bob after hits from Bob x1"
+    assert eng.incap_ts == 101.0
+    assert len(engine.recent) == 1
+
+
+def test_corpse_after_a_death_joins_it():
+    engine = yapr.CorrelationEngine()
+    engine.hit("Bob", "Alice", 100.0)
+    death = engine.outcome("death", "Alice", 101.0, "Bob")
+    assert engine.outcome("corpse", "Alice", 102.0) is death
+    assert death.outcome == "death"
+
+
+def test_second_death_within_the_window_is_a_fresh_engagement():
+    engine = yapr.CorrelationEngine()
+    engine.hit("Bob", "Alice", 100.0)
+    first = engine.outcome("death", "Alice", 101.0, "Bob")
+    engine.hit("Carl", "Alice", 110.0)
+    second = engine.outcome("death", "Alice", 111.0, "Carl")
+    assert second is not first
+    assert first.describe() == "killed by Bob after hits from Bob x1"
+    assert second.describe() == "killed by Carl after hits from Carl x1"
+    assert list(engine.recent) == [second, first]
+
+
+def test_incap_after_a_death_is_a_fresh_engagement():
+    engine = yapr.CorrelationEngine()
+    engine.hit("Bob", "Alice", 100.0)
+    first = engine.outcome("death", "Alice", 101.0, "Bob")
+    engine.hit("Carl", "Alice", 105.0)
+    second = engine.outcome("incap", "Alice", 106.0)
+    assert second is not first
+    assert second.hits == {"Carl": 1}
+
+
+def test_replayed_deaths_within_the_window_each_log_an_engagement(replay):
+    events = replay("\n".join([
+        HIT.format(ts="2025-09-27T18:00:00.000Z", attacker="Bob_Enemy", victim="Alice_Raider"),
+        DEATH.format(ts="2025-09-27T18:00:01.000Z", victim="Alice_Raider", killer="Bob_Enemy"),
+        HIT.format(ts="2025-09-27T18:00:10.000Z", attacker="Carl_Enemy", victim="Alice_Raider"),
+        DEATH.format(ts="2025-09-27T18:00:11.000Z", victim="Alice_Raider", killer="Carl_Enemy"),
+    ]))
+    assert engagements(events) == [
+        "killed by Bob_Enemy after hits from Bob_Enemy x1",
+        "killed by Carl_Enemy after hits from Carl_Enemy x1",
+    ]
@@ -0,0 +1,52 @@
+import pytest
+
+import yapr
+
+pytestmark = pytest.mark.skipif(yapr.np is None, reason="heatmaps need NumPy")
+
+SEEN = '<{ts}> [Notice] nickname="{name}" something at position x: {x}, y: {y}, z: 7.0'
+DEATH = ("<{ts}> [Notice] <Actor Death> CActor::Kill: '{victim}' [300] in zone '{zone}' "
+         "killed by 'Bob_Enemy' [2] using 'behr_rifle_01' [Class behr_rifle] with damage type 'Bullet' "
+         "from direction x: 0.1, y: 0.2, z: 0.3")
+
+
+def cells(layer):
+    zone, cells = yapr.heatmaps.view()[layer]
+    return zone, [(x, y) for x, y, size, _ in cells]
+
+
+def test_deaths_are_binned_at_the_victims_position(replay):
+    replay("\n".join([
+        SEEN.format(ts="2025-09-27T18:00:00.000Z", name="Alice_Raider", x=100.0, y=200.0),
+        DEATH.format(ts="2025-09-27T18:00:01.000Z", victim="Alice_Raider", zone="rs_int_p6leo_ruinstation"),
+        SEEN.format(ts="2025-09-27T18:00:02.000Z", name="Carol_Raider", x=300.0, y=-100.0),
+        DEATH.format(ts="2025-09-27T18:00:03.000Z", victim="Carol_Raider", zone="rs_int_p6leo_ruinstation"),
+    ]))
+    zone, binned = cells("deaths")
+    assert zone == "rs_int_p6leo_ruinstation"
+    size = yapr.HEATMAP_CELL_SIZE
+    assert len(binned) == 2
+    for x, y in ((100.0, 200.0), (300.0, -100.0)):
+        assert any(cx <= x < cx + size and cy <= y < cy + size for cx, cy in binned)
+
+
+def test_death_without_a_known_position_is_skipped(replay):
+    replay(DEATH.format(ts="2025-09-27T18:00:01.000Z", victim="Alice_Raider", zone="rs_int_p6leo_ruinstation"))
+    assert "deaths" not in yapr.heatmaps.view()
+
+
+def test_vehicle_zones_get_no_grid(radar):
+    yapr.heatmaps.add("AEGS_Gladius_1234567", "kills", (1.0, 2.0))
+    yapr.heatmaps.add("rs_int_p6leo_ruinstation", "kills", (1.0, 2.0))
+    yapr.heatmaps.view()
+    assert list(yapr.heatmaps.maps) == [("rs_int_p6leo_ruinstation", "kills")]
+
+
+def test_grid_count_is_capped(radar, monkeypatch):
+    monkeypatch.setattr(yapr, "HEATMAP_MAX_GRIDS", 3)
+    for i in range(5):
+        yapr.heatmaps.add(f"zone_{i}", "sightings", (1.0, 2.0))
+        yapr.heatmaps.view()
+    yapr.heatmaps.add("zone_2", "sightings", (1.0, 2.0))
+    yapr.heatmaps.view()
+    assert list(yapr.heatmaps.maps) == [("zone_3", "sightings"), ("zone_4", "sightings"), ("zone_2", "sightings")]
@@ -0,0 +1,12 @@
+import yapr
+
+
+def test_only_parser_events_are_charged_to_the_current_line(radar, monkeypatch):
+    lag = yapr.IngestLagMonitor()
+    monkeypatch.setattr(yapr, "ingest_lag", lag)
+    lag.begin_line(100.0, 100.5, 0)
+    yapr.add_event("[MEMORY] Report from the UI thread")
+    assert list(lag.pending_ui) == []
+    yapr.log_event("location", 100.0, zone="Orison")
+    yapr.log_event("location", 100.0, zone="Lorville")
+    assert list(lag.pending_ui) == [100.0]
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import yapr
+
+NOISE = "<2025-09-27T18:00:00.000Z> [Notice] <Shader> compiled 12 variants"
+LOW = "<2025-09-27T18:00:00.000Z> [Notice] Entity moved at position x: 5.0, y: 6.0, z: 7.0"
+NORMAL = "<2025-09-27T18:00:00.000Z> [Notice] Fake hit FROM Bob_Enemy TO body_01. Being sent to child Alice_Raider"
+HIGH = "<2025-09-27T18:00:00.000Z> [Notice] Logged an incap.! nickname: Alice_Raider, causes: [Bleed]"
+
+
+def item(line):
+    return (line, 0.0, "TEST")
+
+
+def fill(q, n):
+    for _ in range(n):
+        assert q.put(item(NORMAL))
+
+
+def test_lines_are_classified_by_value(radar):
+    assert [yapr.classify_line(line) for line in (NOISE, LOW, NORMAL, HIGH)] == [
+        yapr.LineClass.NOISE, yapr.LineClass.LOW, yapr.LineClass.NORMAL, yapr.LineClass.HIGH]
+
+
+def test_everything_is_queued_below_the_shed_level(radar):
+    q = yapr.IngestQueue(maxsize=10)
+    for line in (NOISE, LOW, NORMAL, HIGH):
+        assert q.put(item(line))
+    assert q.qsize() == 4 and not q.dropped
+
+
+def test_noise_is_dropped_and_low_value_sampled_above_the_shed_level(radar):
+    q = yapr.IngestQueue(maxsize=100)
+    fill(q, q.shed_level)
+    assert not q.put(item(NOISE))
+    kept = sum(q.put(item(LOW)) for _ in range(yapr.LOW_VALUE_SAMPLE_EVERY * 3))
+    assert kept == 3
+    assert q.put(item(NORMAL))
+    assert q.dropped == {"noise": 1, "low": yapr.LOW_VALUE_SAMPLE_EVERY * 3 - 3}
+
+
+def test_full_queue_drops_normal_lines_and_blocks_high_value_ones(radar):
+    q = yapr.IngestQueue(maxsize=10)
+    fill(q, 10)
+    assert not q.put(item(NORMAL))
+    assert not q.put(item(HIGH), block=False)
+    threading.Timer(0.05, q.get).start()
+    assert q.put(item(HIGH))
+    assert q.blocked == 1
+    assert q.dropped == {"normal": 1, "high": 1}
+
+
+def test_unshed_put_waits_for_room_instead_of_dropping(radar):
+    q = yapr.IngestQueue(maxsize=10)
+    fill(q, 10)
+    start = time.monotonic()
+    threading.Timer(0.05, q.get).start()
+    assert q.put(item(NOISE), shed=False)
+    assert time.monotonic() - start >= 0.04
+    assert q.qsize() == 10 and not q.dropped
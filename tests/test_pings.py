@@ -0,0 +1,38 @@
+import yapr
+
+
+def ping(ts, tag=yapr.Tag.TRANSIT):
+    return yapr.Ping(ts, (0.0, 0.0, 0.0), "Orison", "START", tag)
+
+
+def test_expire_drops_pings_past_their_tags_lifetime():
+    store = yapr.PingStore()
+    store.append("Gate A", ping(100.0))
+    store.append("Gate A", ping(110.0))
+    store.append("Dungeon A", ping(100.0, yapr.Tag.DUNGEON))
+    store.expire(100.0 + yapr.PING_LIFETIME + 1)
+    assert [(key, [p.ts for p in pings]) for key, pings in store.items()] == [
+        ("Gate A", [110.0]), ("Dungeon A", [100.0])]
+    store.expire(100.0 + yapr.DUNGEON_PING_LIFETIME + 1)
+    assert store.keys() == []
+
+
+def test_buffer_capacity_trims_on_append_and_expiry_skips_trimmed_pings():
+    store = yapr.PingStore()
+    for i in range(yapr.PING_BUFFER_SIZE + 3):
+        store.append("Gate A", ping(100.0 + i))
+    (key, pings), = store.items()
+    assert [p.ts for p in pings] == [100.0 + i for i in range(3, yapr.PING_BUFFER_SIZE + 3)]
+    store.expire(104.0 + yapr.PING_LIFETIME)
+    (key, pings), = store.items()
+    assert pings[0].ts == 104.0
+
+
+def test_out_of_order_ping_is_sorted_in_and_only_the_newest_is_fresh():
+    store = yapr.PingStore()
+    store.append("Gate A", ping(100.0))
+    store.append("Gate A", ping(120.0))
+    store.append("Gate A", ping(110.0))
+    (key, pings), = store.items()
+    assert [p.ts for p in pings] == [100.0, 110.0, 120.0]
+    assert [p.fresh for p in pings] == [False, False, True]
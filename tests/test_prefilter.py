@@ -0,0 +1,27 @@
+import yapr
+
+SEEN = '<2025-09-27T18:00:00.000Z> [Notice] nickname="Alice_Raider" something at position x: 5.0, y: 6.0, z: 7.0'
+POSITION = "<2025-09-27T18:00:00.000Z> [Notice] Entity moved at position x: 5.0, y: 6.0, z: 7.0"
+NOISE = "<2025-09-27T18:00:00.500Z> [Notice] <Shader> compiled 12 variants"
+KILL = ("<2025-09-27T18:00:01.000Z> [Notice] <Actor Death> CActor::Kill: 'Alice_Raider' [300] in zone "
+        "'rs_int_p6leo_ruinstation' killed by 'MyPilot' [1] using 'behr_rifle_01' [Class behr_rifle] "
+        "with damage type 'Bullet' from direction x: 0.1, y: 0.2, z: 0.3")
+
+
+def passes(matcher, line):
+    return matcher.marker_bytes_re.search(line.lower().encode()) is not None
+
+
+def test_lookback_lines_pass_the_prefilter_without_their_rules():
+    rules = [rule for rule in yapr.BUILTIN_RULES if rule.name not in ("position", "nickname")]
+    matcher = yapr.RuleMatcher(rules)
+    assert passes(matcher, POSITION)
+    assert passes(matcher, SEEN)
+    assert not passes(matcher, NOISE)
+
+
+def test_kill_finds_the_victims_position_past_skipped_lines(replay):
+    events = replay("\n".join([SEEN] + [NOISE] * 50 + [KILL]))
+    kills = [rec for rec in events if rec.kind == "player_kill"]
+    assert len(kills) == 1
+    assert kills[0].pos == (5.0, 6.0, 7.0)
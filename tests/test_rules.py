@@ -0,0 +1,55 @@
+import json
+
+import yapr
+
+CONTROL = ("<2025-09-27T18:00:00.000Z> [Notice] CVehicleMovementBase::SetDriver: Local client node [1] "
+           "requesting control token for 'AEGS_Gladius_1234567' [1234567]")
+GRANTED = ("<2025-09-27T18:00:01.000Z> [Notice] CVehicle::Initialize: Local client node [1] "
+           "granted control token for 'ANVL_Hornet_7654321' [7654321]")
+
+
+def kinds(events):
+    return [rec.kind for rec in events if rec.kind != "system"]
+
+
+def test_vehicle_request_and_grant_each_log_once(replay, radar):
+    assert kinds(replay(CONTROL)) == ["my_vehicle"]
+    assert radar["current_vehicle"] == "AEGS_Gladius_1234567"
+    assert kinds(replay(GRANTED)) == ["my_vehicle"]
+    assert radar["current_vehicle"] == "ANVL_Hornet_7654321"
+
+
+def test_line_matching_both_vehicle_rules_is_one_vehicle_change(replay, radar):
+    line = (CONTROL.replace("[Notice]", "[Notice] CVehicle::Initialize")
+            + ", Local client node [1] granted control token for 'AEGS_Gladius_1234567' [1234567]")
+    assert yapr.vehicle_control_re.search(line) and yapr.vehicle_granted_re.search(line)
+    assert kinds(replay(line)) == ["my_vehicle"]
+
+
+def test_kill_line_runs_one_of_the_kill_rules(replay):
+    events = replay("<2025-09-27T18:00:00.000Z> [Notice] <Actor Death> CActor::Kill: "
+                    "'PU_Human_Enemy_GroundCombat_NPC_Pirate_Grunt_1234567890123' [301] in zone "
+                    "'rs_int_p6leo_ruinstation' killed by 'MyPilot' [1] using 'behr_rifle_01' [Class behr_rifle] "
+                    "with damage type 'Bullet' from direction x: 0.1, y: 0.2, z: 0.3")
+    assert kinds(events) == ["npc_kill"]
+
+
+def test_rules_file_adds_and_disables_rules(replay, radar):
+    with open(yapr.detection_rules.path, "w", encoding="utf-8") as f:
+        json.dump({
+            "rules": [{
+                "name": "jump_drive",
+                "literals": ["Jump Drive State Changed"],
+                "pattern": "<Jump Drive State Changed> Now (?P<state>\\w+)",
+                "event": "[JUMP] Jump drive {state}",
+                "tag": "vehicle",
+            }],
+            "disabled": ["vehicle_control", "vehicle_granted"],
+        }, f)
+    yapr.detection_rules.refresh(0.0)
+    assert yapr.detection_rules.file_rules == 1
+    events = replay("<2025-09-27T18:00:00.000Z> [Notice] <Jump Drive State Changed> Now Idle (adam: x)\n" + CONTROL)
+    rules = [yapr.format_event(rec) for rec in events if rec.kind == "rule"]
+    assert len(rules) == 1 and rules[0].endswith(" [JUMP] Jump drive Idle")
+    assert "my_vehicle" not in kinds(events)
+    assert radar["current_vehicle"] is None
@@ -0,0 +1,36 @@
+import json
+
+import yapr
+
+
+def test_oldest_entries_spill_and_stay_pending_until_flushed():
+    seen = yapr.SeenSet(maxlen=2)
+    for name in ("Alice", "Bob", "Carl"):
+        seen.add(name)
+    assert list(seen) == ["Bob", "Carl"]
+    assert "Alice" not in seen
+    assert seen.pending() == {"Alice", "Bob", "Carl"}
+    seen.flushed({"Alice"})
+    assert seen.pending() == {"Bob", "Carl"}
+
+
+def test_readding_a_spilled_entry_brings_it_back():
+    seen = yapr.SeenSet(maxlen=2)
+    for name in ("Alice", "Bob", "Carl", "Alice"):
+        seen.add(name)
+    assert list(seen) == ["Carl", "Alice"]
+    assert seen.spilled == {"Bob"}
+
+
+def test_export_keeps_spilled_names(radar, monkeypatch):
+    monkeypatch.setitem(radar.persistent, "player_names", yapr.SeenSet(maxlen=2))
+    for name in ("Alice_Raider", "Bob_Enemy", "Carl_Enemy"):
+        radar["player_names"].add(name)
+    yapr.export_summary_to_file()
+    with open(yapr.EXPORT_LOG_PATH, encoding="utf-8") as f:
+        assert json.load(f)["unique_players"] == ["Alice_Raider", "Bob_Enemy", "Carl_Enemy"]
+    assert radar["player_names"].spilled == set()
+    radar["player_names"].add("Dave_Enemy")
+    yapr.export_summary_to_file()
+    with open(yapr.EXPORT_LOG_PATH, encoding="utf-8") as f:
+        assert json.load(f)["unique_players"] == ["Alice_Raider", "Bob_Enemy", "Carl_Enemy", "Dave_Enemy"]
@@ -0,0 +1,48 @@
+import pickle
+
+import yapr
+
+LOG = """
+<2025-09-27T18:00:00.000Z> [Notice] nickname="Alice_Raider" something at position x: 5.0, y: 6.0, z: 7.0
+<2025-09-27T18:00:00.500Z> [Notice] Fake hit FROM Bob_Enemy TO body_01. Being sent to child Alice_Raider
+<2025-09-27T18:00:01.000Z> [Notice] <Actor Death> CActor::Kill: 'Alice_Raider' [300] in zone 'rs_int_p6leo_ruinstation' killed by 'MyPilot' [1] using 'behr_rifle_01' [Class behr_rifle] with damage type 'Bullet' from direction x: 0.1, y: 0.2, z: 0.3
+"""
+
+
+def events(radar):
+    return [yapr.format_event(rec) for rec in yapr.filter_events(radar["events"])]
+
+
+def test_snapshot_round_trips_through_pickle(replay, radar, monkeypatch):
+    replay(LOG)
+    vehicle = yapr.Vehicle("AEGS_Gladius", 1, (1.0, 2.0, 3.0), "OOC_Stanton_1", "Bob_Enemy", yapr.clock.now())
+    vehicle.history.append(yapr.Ping(yapr.clock.now(), vehicle.pos, vehicle.zone, "SOFTED", yapr.Tag.VEHICLE))
+    radar["vehicles"]["7654321"] = vehicle
+    snap = yapr.snapshot_state(-1)
+    assert snap["vehicles"]["7654321"].history is not vehicle.history
+    snap = pickle.loads(pickle.dumps(snap))
+    expected_events, expected_pings = events(radar), radar["pings"].items()
+
+    # The UI process: its own state, started before the parser process detected anything
+    monkeypatch.setattr(yapr, "PLAYER_NAME", "Unknown")
+    monkeypatch.setattr(radar, "persistent", dict(radar.persistent, player_name="Unknown", players_killed=yapr.SeenSet()))
+    monkeypatch.setattr(radar, "session", yapr.ServerSession(1, None))
+    yapr.apply_snapshot(snap)
+
+    assert radar["player_name"] == "MyPilot" and yapr.is_self("MyPilot")
+    assert radar["total_kills"] == 1 and list(radar["players_killed"]) == ["Alice_Raider"]
+    assert set(radar["entities"]) == set(snap["entities"])
+    assert radar["vehicles"]["7654321"].history[0].action == "SOFTED"
+    assert [(key, [(p.ts, p.pos, p.victim_name) for p in pings]) for key, pings in radar["pings"].items()] == [
+        (key, [(p.ts, p.pos, p.victim_name) for p in pings]) for key, pings in expected_pings]
+    assert events(radar) == expected_events
+    assert radar.session.started == snap["now"]
+
+
+def test_snapshot_sends_only_newer_events(replay, radar):
+    replay(LOG)
+    first = yapr.snapshot_state(-1)
+    newest = max(rec.seq for rec in first["events"])
+    assert yapr.snapshot_state(newest)["events"] == []
+    yapr.add_event("[TEST] After the first snapshot")
+    assert [rec.detail for rec in yapr.snapshot_state(newest)["events"]] == ["[TEST] After the first snapshot"]
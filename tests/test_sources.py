@@ -0,0 +1,22 @@
+import asyncio
+import gzip
+
+import pytest
+
+import yapr
+
+LOG = (b"<2025-09-27T18:00:00.000Z> [Notice] nickname=\"Alice_Raider\" something at position x: 5.0, y: 6.0, z: 7.0\n"
+       b"<2025-09-27T18:00:01.000Z> [Notice] Nothing any rule wants\n") * 50
+
+
+@pytest.mark.parametrize("name, compress", [("Game.log", bytes), ("Game.log.gz", gzip.compress)])
+def test_replay_reports_its_position(radar, tmp_path, name, compress):
+    path = tmp_path / name
+    path.write_bytes(compress(LOG))
+    src = yapr.LogSource("REPLAY", str(path), replay=True)
+    out_q = yapr.IngestQueue(maxsize=1000)
+    asyncio.run(yapr.replay_source(src, out_q, speed=0))
+    assert src.status == "finished"
+    assert src.position == len(LOG)
+    assert src.to_dict()["position"] == len(LOG)
+    assert (src.lines, src.skipped) == (100, 50)
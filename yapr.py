@@ -16,6 +16,7 @@
 # YERTZ WAS HERE
 
 import threading
+import asyncio
 import time
 import re
 import collections
@@ -24,11 +25,33 @@ import os
 import json
 import math
 import sys
+import enum
+import collections.abc
+import heapq
+import itertools
+import multiprocessing
+import sqlite3
+import tempfile
+import shutil
+import gzip
+import lzma
 from datetime import datetime, timezone
 try:
     import winsound
 except Exception:
     winsound = None
+try:
+    import psutil
+except Exception:
+    psutil = None
+try:
+    import numpy as np
+except Exception:
+    np = None
+try:
+    import zstandard
+except Exception:
+    zstandard = None
 
 try:
     import tkinter as tk
@@ -47,9 +70,14 @@ else:
     # Running as script
     APPLICATION_PATH = os.path.dirname(os.path.abspath(__file__))
 EXPORT_LOG_PATH = os.path.join(APPLICATION_PATH, "yapr_export.json")
+HEATMAP_PATH = os.path.join(APPLICATION_PATH, "yapr_heatmaps.npz")
+PLAYER_REGISTRY_PATH = os.path.join(APPLICATION_PATH, "yapr_players.db")
+RULES_PATH = os.path.join(APPLICATION_PATH, "yapr_rules.json")
 PLAYER_NAME = "Unknown"  # Will be auto-detected
 GAME_VERSION = "Unknown"  # Will be auto-detected
 TAIL_SLEEP = 0.12
+TAIL_READ_SIZE = 65536  # Bytes read from a log at a time before splitting into lines
+SOURCE_RETRY_SLEEP = 2.0  # How often to look for a log that doesn't exist yet (e.g. PTU not started)
 ENTITY_TIMEOUT = 580.0
 PING_LIFETIME = 45.0
 DUNGEON_PING_LIFETIME = 120.0
@@ -58,7 +86,14 @@ PING_FLASH_WINDOW = 2.5
 INITIAL_SCALE = 1.2
 STACK_OFFSET_PX = 20
 PLAYER_TRANSIT_ASSOCIATION_WINDOW = 20.0
-MAX_PINGS_PER_MANAGER = 3
+TRANSIT_CANDIDATE_MAX_DISTANCE = 200.0  # Metres between a sighting and a carriage for them to be linked
+TRANSIT_MAX_CANDIDATES = 3
+SIGHTING_BUFFER_SIZE = 256
+PING_BUFFER_SIZE = 10
+REGEX_BENCH_LINE_LENGTH = 16384  # Long lines in Game.log run to several KB
+REGEX_BENCH_BUDGET_MS = 1.0  # Worst case a single pattern may take on one line
+RULES_RELOAD_INTERVAL = 2.0  # Seconds between checks of the rules file for changes
+LOW_PRIORITY_PING_BUFFER_SIZE = 1
 SOUND_COOLDOWN = 3.0
 PLAYER_DOT_RADIUS = 8
 PLAYER_DOT_RADIUS_INNER = 6
@@ -66,8 +101,56 @@ MAX_ZONE_MENTIONS_DISPLAY = 5
 EXIT_PING_LIFETIME = 30.0
 DUPLICATE_PING_WINDOW = 10.0
 VEHICLE_TIMEOUT = 300.0
+LAG_SAMPLE_WINDOW = 500
+REPLAY_SPEED = 10.0
+REPLAY_MAX_IDLE = 5.0  # Longest real-time wait between replayed lines, in seconds
+NAME_CACHE_SIZE = 4096
+EVENT_LOG_SIZE = 600
+EXPORT_RECENT_EVENTS = 100
+LINE_QUEUE_SIZE = 20000
+LINE_QUEUE_SHED_LEVEL = 0.5  # Fraction of LINE_QUEUE_SIZE at which low-value lines start being shed
+LOW_VALUE_SAMPLE_EVERY = 10  # While shedding, keep one in this many low-value lines
+MANAGER_CACHE_SIZE = 512
+SEEN_SET_SIZE = 5000  # Newest names/zones kept in memory per persistent set; older ones live in the export
+VEHICLE_HISTORY_SIZE = 16
+SPAWN_RESET_COOLDOWN = 10.0
+POSITION_CELL_SIZE = 10.0  # Metres per side of an anonymous-position grid cell
+POSITION_CELL_TIMEOUT = 120.0
+POSITION_MAX_CELLS = 2000
+CLUSTER_RADIUS_PX = 14  # Radar markers closer than this on screen are drawn as one cluster
+EDGE_MARKER_MARGIN_PX = 10
+EDGE_MARKER_SPACING_PX = 12
+SNAPSHOT_INTERVAL = 0.25  # Seconds between state snapshots from the parser process
+PARSER_STOP_TIMEOUT = 5.0
+API_DIFF_INTERVAL = 0.25  # Seconds between entity/vehicle diffs sent to API clients
+API_CLIENT_BUFFER = 1000  # Messages an API client may fall behind before it is disconnected
+API_DRAIN_TIMEOUT = 5.0  # Seconds a client may leave a write unread before it is disconnected
+HEATMAP_BINS = 128
+HEATMAP_CELL_SIZE = 8.0  # Metres per heatmap bin, so one zone's map spans about 1km
+HEATMAP_BATCH = 64  # Points buffered per zone/layer before they are binned
+HEATMAP_MAX_DRAW_CELLS = 1500
+HEATMAP_MAX_GRIDS = 64  # Zone/layer grids kept, about 64KB each; the least recently added to is dropped
+HEATMAP_LAYERS = ("kills", "deaths", "sightings")
+HEATMAP_COLOR_KEYS = {"kills": "player_kill_fg", "deaths": "death_fg", "sightings": "player_fg"}
+ACTIVITY_WINDOW = 900  # Seconds of per-second buckets kept by each rolling counter
+ACTIVITY_SPARK_POINTS = 30
+ACTIVITY_MAX_MANAGERS = 64
+ACTIVITY_PANEL_HEIGHT = 48
+SESSION_ARCHIVE_SIZE = 5  # Previous server sessions kept for review and export
+PLAYER_REGISTRY_CACHE_SIZE = 512  # Player records kept in memory, the rest stay in SQLite
+PLAYER_ENCOUNTER_GAP = 300.0  # Seconds unseen before a sighting counts as a new encounter
+EXPORT_RECENT_PLAYERS = 25
+ENGAGEMENT_WINDOW = 30.0  # Seconds of hits joined with the incap or death that follows them
+CORRELATION_RING_SIZE = 32  # Hits/incaps/corpses/deaths remembered per name and kind
+CORRELATION_MAX_RINGS = 4096
+ENGAGEMENT_HISTORY_SIZE = 200
+
+# Busy lifts whose buffers only keep the newest ping
+LOW_PRIORITY_MANAGERS = (
+    "Elevator", "HangarLobby", "Habs Transit", "TransitManager-001", "TransitManager_Hangar-to-Lobby",
+    "TransitManager_Habs", "Spaceport-to-Hangars", "Internal", "Spaceport_to_Hangars", "MetroPlatform",
+)
 
-landing_door_re = re.compile(r'LandingArea.*- Door:\s*([^,\]]+)[\],].*State:\s*([A-Za-z]+)', re.IGNORECASE)
 exit_event_re = re.compile(r'\bExit Event\b', re.IGNORECASE)
 
 PLAYER_NAME_BLACKLIST = {
@@ -79,12 +162,88 @@ PLAYER_NAME_BLACKLIST = {
     "cz station", "orbituary", "ruin station", "unknown", "entity", "and", "position", "stopped", "started", "hangardoor_smallfront"
 }
 
+NPC_NAME_PATTERNS = (
+    'pu_human_enemy', 'npc_', '_npc_', 'groundcombat', 'contestedzones',
+    'ai_', '_ai_', 'bot_', '_bot_',
+)
+VEHICLE_ZONE_INDICATORS = (
+    '_ship_', 'container', 'vehicle', 'hull_c', 'guardian', 'misc_', 'anvl_', 'orig_',
+    'aegs_', 'rsi_', 'crus_', 'drak_', 'argo_', 'mrai_',
+)
+
 # ---------------- REGEX PATTERNS ----------------
+class SplitMatch:
+    """Groups found by a SequencePattern or RepeatPattern, read like a re.Match"""
+    __slots__ = ("_groups", "_end")
+
+    def __init__(self, groups: tuple, end: int):
+        self._groups = groups
+        self._end = end
+
+    def group(self, index: int):
+        return self._groups[index - 1]
+
+    def groups(self) -> tuple:
+        return self._groups
+
+    def end(self) -> int:
+        return self._end
+
+class SequencePattern:
+    """'step1.*?step2.*?...' matched one step at a time instead of by one backtracking regex.
+
+    Each step is searched once from where the previous one ended. For the literal-led
+    steps used here a later match can't end earlier, so this finds the same groups as
+    the combined regex, but a failing line costs one pass per step rather than one
+    rescan of the rest of the line per occurrence of the first step. Optional steps
+    behave like trailing (?:.*?step)? groups: when absent their groups are None.
+    """
+    def __init__(self, *steps: str, optional: tuple = (), flags: int = re.IGNORECASE):
+        self.steps = [re.compile(step, flags) for step in steps]
+        self.optional = [re.compile(step, flags) for step in optional]
+
+    def search(self, line: str):
+        groups = []
+        pos = 0
+        for step in self.steps:
+            m = step.search(line, pos)
+            if m is None:
+                return None
+            groups.extend(m.groups())
+            pos = m.end()
+        for step in self.optional:
+            m = step.search(line, pos)
+            if m is None:
+                groups.extend([None] * step.groups)
+            else:
+                groups.extend(m.groups())
+                pos = m.end()
+        return SplitMatch(tuple(groups), pos)
+
+class RepeatPattern:
+    """First capture of a one-group pattern that occurs again later in the line,
+    like 'X.*?\\1' under IGNORECASE but found with one findall instead of backtracking"""
+    def __init__(self, pattern: str, flags: int = re.IGNORECASE):
+        self.item = re.compile(pattern, flags)
+
+    def search(self, line: str):
+        found = [(m.group(1), m.end()) for m in self.item.finditer(line)]
+        later = {}  # lowered value -> index of its next occurrence, filled right to left
+        repeat_at = [None] * len(found)
+        for i in range(len(found) - 1, -1, -1):
+            key = found[i][0].lower()
+            repeat_at[i] = later.get(key)
+            later[key] = i
+        for i, j in enumerate(repeat_at):
+            if j is not None:
+                return SplitMatch((found[i][0],), found[j][1])
+        return None
+
 login_pattern_re = re.compile(r"\[Notice\] <Legacy login response> \[CIG-net\] User Login Success - Handle\[([A-Za-z0-9_-]+)\]", re.IGNORECASE)
 version_pattern_re = re.compile(r"\[Cmdline\s*\]\s*--system-trace-env-id='pub-sc-alpha-(\d+)-\d+'", re.IGNORECASE)
 player_geid_re = re.compile(r'playerGEID=(\d+)', re.IGNORECASE)
-player_id_re = re.compile(r'geid (\d+).*?name ([A-Za-z0-9_-]+)', re.IGNORECASE)
-spawn_reset_re = re.compile(r"<Spawn Flow>.*?Player '([^']+)' \[(\d+)\] lost reservation for spawnpoint", re.IGNORECASE)
+player_id_re = SequencePattern(r'geid (\d+)', r'name ([A-Za-z0-9_-]+)')
+spawn_reset_re = SequencePattern(r"<Spawn Flow>", r"Player '([^']{1,64})' \[(\d+)\] lost reservation for spawnpoint")
 
 carriage_re = re.compile(
     r'Carriage\s+(\d+)\s+\(Id:\s*([0-9]+)\)\s+for manager\s+([A-Za-z0-9_\-]+)\s+(starting|finished)\s+transit\s+in zone\s+([A-Za-z0-9_\-]+)\s+at position x:\s*([-\d.]+),\s*y:\s*([-\d.]+),\s*z:\s*([-\d.]+)',
@@ -98,12 +257,13 @@ vehicle_destruction_re = re.compile(
     re.IGNORECASE
 )
 
-fuel_controller_lambda_re = re.compile(r'<lambda_1>::operator.*?Ownerless fuel controller created', re.IGNORECASE)
+fuel_controller_lambda_re = SequencePattern(r'<lambda_1>::operator', r'Ownerless fuel controller created')
 fuel_controller_confirm_re = re.compile(r'No vehicle for Fuel controller during RWES', re.IGNORECASE)
 vehicle_control_re = re.compile(r"CVehicleMovementBase::SetDriver: Local client node \[(\d+)\] requesting control token for '([^']+)' \[(\d+)\]", re.IGNORECASE)
-vehicle_granted_re = re.compile(r"CVehicle::Initialize.*?Local client node \[(\d+)\] granted control token for '([^']+)' \[(\d+)\]", re.IGNORECASE)
+vehicle_granted_re = SequencePattern(r"CVehicle::Initialize",
+                                     r"Local client node \[(\d+)\] granted control token for '([^']+)' \[(\d+)\]")
 
-jump_drive_re = re.compile(r'<Jump Drive State Changed> Now (\w+).*?adam: ([^)]+)\)', re.IGNORECASE)
+jump_drive_re = SequencePattern(r'<Jump Drive State Changed> Now (\w+)', r'adam: ([^)]+)\)')
 
 pos_re = re.compile(r'at position x:\s*([-\d.]+),\s*y:\s*([-\d.]+),\s*z:\s*([-\d.]+)', re.IGNORECASE)
 nick_re = re.compile(r'nickname="([^"]+)"', re.IGNORECASE)
@@ -118,90 +278,1326 @@ death_alt_re = re.compile(
     r"<Actor Death>\s*CActor::Kill: '([^']+)' \[\d+\] in zone '([^']+)' killed by '([^']+)' \[[^\]]+\] using '([^']+)' \[Class ([^\]]+)\] with damage type '([^']+)'",
     re.IGNORECASE
 )
-death_fallback_re = re.compile(
-    r"CActor::Kill: '([^']+)'(?: \[\d+\])?(?:.*?in zone '([^']+)')?(?:.*?killed by '([^']+)')?(?:.*?using '([^']+)')?(?:.*?damage type '([^']+)')?",
-    re.IGNORECASE
+death_fallback_re = SequencePattern(
+    r"CActor::Kill: '([^']+)'",
+    optional=(r"in zone '([^']+)'", r"killed by '([^']+)'", r"using '([^']+)'", r"damage type '([^']+)'"),
 )
-incap_re = re.compile(r"Logged an incap.! nickname: ([^,]+), causes: (.+)", re.IGNORECASE)
+incap_re = re.compile(r"Logged an incap.! nickname: ([^,]{1,64}), causes: (.+)", re.IGNORECASE)
 stall_re = re.compile(r"Actor stall detected, Player: ([^,]+), Type: (\w+), Length: ([\d.]+).", re.IGNORECASE)
-spawn_flow_re = re.compile(r"Player '([^']+)' \[(\d+)\].*?(?:lost|gained|reservation)", re.IGNORECASE)
-entity_detach_re = re.compile(r'name = "([^"]+)".*?name = "\1"', re.IGNORECASE)
+spawn_flow_re = SequencePattern(r"Player '([^']{1,64})' \[(\d+)\]", r"lost|gained|reservation")
+entity_detach_re = RepeatPattern(r'name = "([^"]+)"')
 timestamp_re = re.compile(r'^<([^>]+)>')
 location_re = re.compile(r'landing zone location "@([^"]+)"', re.IGNORECASE)
-corpsify_re = re.compile(r"\[ActorState\] Corpse.*?Player '([^']+)'.*?Running corpsify", re.IGNORECASE)
+landing_door_re = SequencePattern(r'LandingArea', r'- Door:\s*([^,\]]{1,128})[\],]', r'State:\s*([A-Za-z]+)')
+corpsify_re = SequencePattern(r"\[ActorState\] Corpse", r"Player '([^']{1,64})'", r"Running corpsify")
 hostility_hit_re = re.compile(
-    r'Fake hit FROM\s+(\S+)\s+TO\s+(\S+)\.[^.]*?(?:Being sent to child\s+(\S+))?',
+    r'Fake hit FROM\s+(\S+)\s+TO\s+(\S+)\.(?:[^.]*?Being sent to child\s+(\S+))?',
     re.IGNORECASE
 )
 
-setup_envelope_re = re.compile(
-    r'<Setup Envelope Failure>.*?\|\s*([A-Z]{4}_[^[]+)\[(\d+)\]',
-    re.IGNORECASE
+setup_envelope_re = SequencePattern(r'<Setup Envelope Failure>', r'\|\s*([A-Z]{4}_[^[|]+)\[(\d+)\]')
+manager_suffix_re = re.compile(r'_[0-9]+$')
+dungeon_entrance_re = re.compile(r'Dungeon_Entrance_?([A-F])', re.IGNORECASE)
+dungeon_exit_re = re.compile(r'Dungeon_Exit_?([A-F])', re.IGNORECASE)
+dungeon_exfil_re = re.compile(r'Dungeon_Exfil_?([A-F])', re.IGNORECASE)
+transit_manager_re = re.compile(r'(TransitManager[^\s,;:]*)')
+# Literals of lines the detection rules look back at (position lines are tied to the transit
+# manager, nickname or victim named shortly before); kept past the prefilter with the rule
+# literals even when a rules file disables the rules that act on them
+CONTEXT_MARKERS = ("TransitManager", "at position x:", 'nickname="')
+# Lines that are never shed: kills, transit, vehicle destruction, login and server swaps
+HIGH_VALUE_MARKERS = (
+    "CActor::Kill", "for manager", "<Vehicle Destruction>", "User Login Success", "OnClientSpawned",
+    "SC_Frontend closed", "Logged an incap", "corpsify", "lost reservation for spawnpoint",
 )
+LOW_VALUE_MARKERS = ("Actor stall detected", "at position x:")
+
+high_value_line_re = re.compile('|'.join(re.escape(m) for m in HIGH_VALUE_MARKERS), re.IGNORECASE)
+low_value_line_re = re.compile('|'.join(re.escape(m) for m in LOW_VALUE_MARKERS), re.IGNORECASE)
+
+npc_name_re = re.compile('|'.join(re.escape(p) for p in NPC_NAME_PATTERNS), re.IGNORECASE)
+vehicle_zone_re = re.compile('|'.join(re.escape(i) for i in VEHICLE_ZONE_INDICATORS), re.IGNORECASE)
 spawned_re = re.compile(r'\[CSessionManager::OnClientSpawned\] Spawned!', re.IGNORECASE)
 frontend_closed_re = re.compile(r'Loading screen for Frontend_Main : SC_Frontend closed after ([\d.]+) seconds', re.IGNORECASE)
 
 # ---------------- MANAGER ALIASES ----------------
-ManagerAlias = {
-    "TransitManager_Hangar-to-Lobby": "HangarLobby",
-    "TransitManager-001": "Elevator",
-    "TransitManager_Dungeon_EntranceA": "Ghost Arena A (F2)",
-    "TransitManager_Dungeon_EntranceB": "Ghost Arena B (F1)",
-    "TransitManager_Dungeon_EntranceC": "Ghost Arena C (Arcade)",
-    "TransitManager_Dungeon_EntranceD": "Dungeon Entrance D",
-    "TransitManager_Dungeon_EntranceE": "Dungeon Entrance E",
-    "TransitManager_Dungeon_EntranceF": "Dungeon Entrance F",
-    "p2l4_contestedzone": "CZ Station Lobby Lifts",
-    "p5l2_contestedzone": "Orbituary CZ Lobby Lifts",
-    "rs_int_p6leo_ruinstation": "Ruin Station",
-    "TransitManager_TransitDungeonSideEntrance": "Dungeon Side Entrance",
-    "TransitManager_TransitDungeonMaintenance": "Dungeon Maintenance",
-    "TransitManager_DungeonExec_RewardHangar": "EXHANG",
-    "TransitManager_Dungeon_Exfil_A": "D Exfil (A)",
-    "TransitManager_Dungeon_Exfil_B": "D Exfil (B)",
-    "TransitManager_Dungeon_Exfil_C": "D Exfil (C)",
-    "TransitManager_Dungeon_Exfil_D": "D Exfil (D)",
-    "TransitManager_Dungeon_Exfil_E": "D Exfil (E)",
-    "TransitManager_Dungeon_Exfil_F": "D Exfil (F)",
-    "TransitManager_TransitDungeonMainEntrance": "Dungeon Entrance 04",
-    "TransitManager_TransitDungeonSideEntrance": "Dungeon Entrance 02",
-    "TransitManager_Habs": "Habs Transit",
-}
+MANAGER_ALIAS_TABLE = (
+    ("TransitManager_Hangar-to-Lobby", "HangarLobby"),
+    ("TransitManager-001", "Elevator"),
+    ("TransitManager_Dungeon_EntranceA", "Ghost Arena A (F2)"),
+    ("TransitManager_Dungeon_EntranceB", "Ghost Arena B (F1)"),
+    ("TransitManager_Dungeon_EntranceC", "Ghost Arena C (Arcade)"),
+    ("TransitManager_Dungeon_EntranceD", "Dungeon Entrance D"),
+    ("TransitManager_Dungeon_EntranceE", "Dungeon Entrance E"),
+    ("TransitManager_Dungeon_EntranceF", "Dungeon Entrance F"),
+    ("p2l4_contestedzone", "CZ Station Lobby Lifts"),
+    ("p5l2_contestedzone", "Orbituary CZ Lobby Lifts"),
+    ("rs_int_p6leo_ruinstation", "Ruin Station"),
+    ("TransitManager_TransitDungeonMaintenance", "Dungeon Maintenance"),
+    ("TransitManager_DungeonExec_RewardHangar", "EXHANG"),
+    ("TransitManager_Dungeon_Exfil_A", "D Exfil (A)"),
+    ("TransitManager_Dungeon_Exfil_B", "D Exfil (B)"),
+    ("TransitManager_Dungeon_Exfil_C", "D Exfil (C)"),
+    ("TransitManager_Dungeon_Exfil_D", "D Exfil (D)"),
+    ("TransitManager_Dungeon_Exfil_E", "D Exfil (E)"),
+    ("TransitManager_Dungeon_Exfil_F", "D Exfil (F)"),
+    ("TransitManager_TransitDungeonMainEntrance", "Dungeon Entrance 04"),
+    ("TransitManager_TransitDungeonSideEntrance", "Dungeon Entrance 02"),
+    ("TransitManager_Habs", "Habs Transit"),
+)
+
+def build_manager_aliases(table) -> dict:
+    """Build the alias lookup, refusing a manager id that is defined twice"""
+    aliases = {}
+    for raw, friendly in table:
+        if raw in aliases:
+            raise ValueError(f"Duplicate manager alias for {raw}: {aliases[raw]!r} and {friendly!r}")
+        aliases[raw] = friendly
+    return aliases
+
+ManagerAlias = build_manager_aliases(MANAGER_ALIAS_TABLE)
+
+# ---------------- CLOCK ----------------
+class WallClock:
+    """Real time, used when tailing the live Game.log"""
+    def now(self) -> float:
+        return time.time()
+
+    def observe(self, log_ts):
+        pass
+
+class LogClock:
+    """Time driven by parsed log timestamps, used when replaying a recorded session.
+
+    With speed 0 the clock only moves when a timestamped line is parsed, which
+    makes runs deterministic. With a replay speed it keeps running between lines
+    at that rate so pings still age while the log is quiet.
+    """
+    def __init__(self, speed: float = 0.0):
+        self.speed = speed
+        self.log_ts = None
+        self.wall_ts = 0.0
+        self.last_now = 0.0
+
+    def observe(self, log_ts):
+        if log_ts is None:
+            return
+        if self.log_ts is None or log_ts > self.log_ts:
+            self.log_ts = log_ts
+            self.wall_ts = time.time()
+
+    def now(self) -> float:
+        if self.log_ts is None:
+            return time.time()
+        now = self.log_ts
+        if self.speed > 0:
+            now += (time.time() - self.wall_ts) * self.speed
+        # Never run backwards when the next line lands before the interpolated time
+        self.last_now = max(self.last_now, now)
+        return self.last_now
+
+# ---------------- RECORDS ----------------
+class Tag(enum.IntEnum):
+    """Ping and entity kinds"""
+    TRANSIT = 0
+    DUNGEON = 1
+    EXIT = 2
+    NPC_KILL = 3
+    PLAYER_KILL = 4
+    VEHICLE = 5
+    VEHICLE_POTENTIAL = 6
+    VEHICLE_CONFIRMED = 7
+    PLAYER = 8
+
+class Status(enum.IntEnum):
+    ALIVE = 0
+    INCAP = 1
+    DEAD = 2
+
+class Anchor(enum.IntEnum):
+    """Where an overlay ping is stacked on the radar; NONE draws it at its position"""
+    NONE = 0
+    TOP_RIGHT = 1
+    BOTTOM_RIGHT = 2
+    BOTTOM_LEFT = 3
+
+# Indexed by Tag
+TAG_NAMES = tuple(t.name.lower() for t in Tag)
+TAG_COLOR_KEYS = ('transit_fg', 'dungeon_fg', 'transit_fg', 'npc_kill_fg', 'player_kill_fg',
+                  'vehicle_fg', 'vehicle_potential_fg', 'vehicle_confirmed_fg', 'player_fg')
+PING_LIFETIMES = (PING_LIFETIME, DUNGEON_PING_LIFETIME, EXIT_PING_LIFETIME, NPC_KILL_LIFETIME,
+                  NPC_KILL_LIFETIME, 60.0, 30.0, 30.0, PING_LIFETIME)
+KILL_TAGS = (Tag.NPC_KILL, Tag.PLAYER_KILL, Tag.VEHICLE)
+VEHICLE_STATE_NAMES = {0: "Alive", 1: "Softed", 2: "FullDead"}
+
+class Ping:
+    __slots__ = ("ts", "pos", "zone", "action", "tag", "fresh", "anchor", "vehicle_name",
+                 "attacker", "carriage", "carriage_id", "player_name", "candidates", "victim_name")
+
+    def __init__(self, ts: float, pos: tuple, zone: str, action: str, tag: Tag,
+                 anchor: Anchor = Anchor.NONE, vehicle_name: str = None, attacker: str = None,
+                 carriage: str = None, carriage_id: str = None, player_name: str = None,
+                 victim_name: str = None):
+        self.ts = ts
+        self.pos = pos
+        self.zone = zone
+        self.action = action
+        self.tag = tag
+        self.fresh = True
+        self.anchor = anchor
+        self.vehicle_name = vehicle_name
+        self.attacker = attacker
+        self.carriage = carriage
+        self.carriage_id = carriage_id
+        self.player_name = player_name
+        self.candidates = ()  # Other players who may have taken the carriage, best first
+        self.victim_name = victim_name
+
+    @property
+    def overlay(self) -> bool:
+        return self.anchor != Anchor.NONE
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.ts,
+            "pos": list(self.pos) if self.pos else None,
+            "zone": self.zone,
+            "action": self.action,
+            "tag": self.tag.name,
+            "vehicle_name": self.vehicle_name,
+            "attacker": self.attacker,
+            "player_name": self.player_name,
+            "candidates": list(self.candidates),
+            "victim_name": self.victim_name,
+        }
+
+class Entity:
+    __slots__ = ("type", "status", "pos", "last_seen", "spawn_reset_ts", "death_ts")
+
+    def __init__(self, type: Tag = Tag.PLAYER, pos: tuple = None, last_seen: float = 0.0):
+        self.type = type
+        self.status = Status.ALIVE
+        self.pos = pos
+        self.last_seen = last_seen
+        self.spawn_reset_ts = 0.0  # 0 = no spawn reset seen
+        self.death_ts = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type.name,
+            "status": self.status.name,
+            "pos": list(self.pos) if self.pos else None,
+            "last_seen": self.last_seen,
+            "spawn_reset_ts": self.spawn_reset_ts,
+            "death_ts": self.death_ts,
+        }
+
+VehicleHit = collections.namedtuple("VehicleHit", "level_from level_to attacker ts")
+
+class Vehicle:
+    __slots__ = ("name", "state", "pos", "zone", "driver", "last_update", "history")
+
+    def __init__(self, name: str, state: int, pos: tuple, zone: str, driver: str, last_update: float):
+        self.name = name
+        self.state = state
+        self.pos = pos
+        self.zone = zone
+        self.driver = driver
+        self.last_update = last_update
+        self.history = collections.deque(maxlen=VEHICLE_HISTORY_SIZE)
+
+    def copy(self) -> "Vehicle":
+        """Detached copy that can be pickled while the parser keeps appending hits to this one"""
+        dup = Vehicle(self.name, self.state, self.pos, self.zone, self.driver, self.last_update)
+        dup.history.extend(tuple(self.history))
+        return dup
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "state": VEHICLE_STATE_NAMES.get(self.state, str(self.state)),
+            "pos": list(self.pos) if self.pos else None,
+            "zone": self.zone,
+            "driver": self.driver,
+            "last_update": self.last_update,
+            "attacker": self.history[-1].attacker if self.history else None,
+        }
+
+# ---------------- PING STORE ----------------
+class PingStore:
+    """Per-manager ping buffers kept in time order, expired through one global deadline heap.
+
+    Each buffer's capacity is fixed when its manager is first seen, so trimming
+    happens on append and expiry only touches pings whose deadline has passed.
+    """
+    def __init__(self):
+        self.buffers = {}
+        self.deadlines = []  # heap of (expiry ts, seq, manager, ping)
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+
+    def _buffer(self, key: str) -> collections.deque:
+        buf = self.buffers.get(key)
+        if buf is None:
+            low_priority = any(lp in key for lp in LOW_PRIORITY_MANAGERS)
+            buf = collections.deque(maxlen=LOW_PRIORITY_PING_BUFFER_SIZE if low_priority else PING_BUFFER_SIZE)
+            self.buffers[key] = buf
+        return buf
+
+    def append(self, key: str, ping: Ping):
+        with self.lock:
+            buf = self._buffer(key)
+            if buf and ping.ts < buf[-1].ts:
+                # Out of order (clock stepped back), re-sort this one small buffer
+                ordered = sorted(list(buf) + [ping], key=lambda p: p.ts)
+                buf.clear()
+                buf.extend(ordered)
+                for p in buf:
+                    p.fresh = False
+                buf[-1].fresh = True
+            else:
+                if buf:
+                    buf[-1].fresh = False
+                buf.append(ping)
+            heapq.heappush(self.deadlines, (ping.ts + PING_LIFETIMES[ping.tag], next(self.seq), key, ping))
+
+    def expire(self, now: float):
+        """Drop every ping whose lifetime has run out, O(expired * log n)"""
+        with self.lock:
+            deadlines = self.deadlines
+            while deadlines and deadlines[0][0] < now:
+                _, _, key, ping = heapq.heappop(deadlines)
+                buf = self.buffers.get(key)
+                if buf is None:
+                    continue
+                if buf[0] is ping:
+                    buf.popleft()
+                else:
+                    try:
+                        buf.remove(ping)
+                    except ValueError:
+                        pass  # Already pushed out by the buffer's capacity
+                if not buf:
+                    del self.buffers[key]
+
+    def items(self) -> list:
+        with self.lock:
+            return [(key, list(buf)) for key, buf in self.buffers.items()]
+
+    def keys(self) -> list:
+        with self.lock:
+            return list(self.buffers)
+
+    def load(self, items):
+        """Replace the buffers with (manager, pings) pairs from a snapshot; no expiry bookkeeping"""
+        with self.lock:
+            self.buffers = {}
+            for key, pings in items:
+                self._buffer(key).extend(pings)
+            self.deadlines = []
+
+    def clear(self):
+        with self.lock:
+            self.buffers.clear()
+            self.deadlines = []
+
+    def __getitem__(self, key: str) -> collections.deque:
+        return self.buffers[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.buffers
+
+    def __len__(self) -> int:
+        return len(self.buffers)
+
+# ---------------- SEEN SETS ----------------
+class SeenSet:
+    """Set of interned strings that keeps the newest entries in memory and spills older ones to the export"""
+    __slots__ = ("maxlen", "recent", "spilled", "lock")
+
+    def __init__(self, maxlen: int = SEEN_SET_SIZE):
+        self.maxlen = maxlen
+        self.recent = collections.OrderedDict()
+        self.spilled = set()
+        self.lock = threading.Lock()
+
+    def add(self, item: str):
+        item = sys.intern(str(item))
+        with self.lock:
+            if item in self.recent:
+                self.recent.move_to_end(item)
+                return
+            self.recent[item] = None
+            self.spilled.discard(item)
+            if len(self.recent) > self.maxlen:
+                oldest, _ = self.recent.popitem(last=False)
+                self.spilled.add(oldest)
+
+    def pending(self) -> set:
+        """Everything not yet known to be on disk: recent entries plus spilled ones"""
+        with self.lock:
+            return set(self.recent) | self.spilled
+
+    def flushed(self, items):
+        """Forget spilled entries once an export containing them has been written"""
+        with self.lock:
+            self.spilled.difference_update(items)
+
+    def clear(self):
+        with self.lock:
+            self.recent.clear()
+            self.spilled.clear()
+
+    def __contains__(self, item) -> bool:
+        return item in self.recent
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.recent))
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+# ---------------- POSITION GRID ----------------
+class GridCell:
+    __slots__ = ("count", "last_seen")
+
+    def __init__(self, last_seen: float):
+        self.count = 0
+        self.last_seen = last_seen
+
+class PositionGrid:
+    """Unnamed positions quantized into square cells with a hit count and last-seen time.
+
+    Cells are kept in last-seen order, so expiry and the size cap both pop from the front.
+    """
+    def __init__(self, cell_size: float = POSITION_CELL_SIZE, max_cells: int = POSITION_MAX_CELLS):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, x: float, y: float, now: float):
+        key = (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+        with self.lock:
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = GridCell(now)
+                if len(self.cells) > self.max_cells:
+                    self.cells.popitem(last=False)
+            else:
+                self.cells.move_to_end(key)
+                cell.last_seen = now
+            cell.count += 1
+
+    def expire(self, now: float):
+        with self.lock:
+            cells = self.cells
+            while cells:
+                key, cell = next(iter(cells.items()))
+                if now - cell.last_seen <= POSITION_CELL_TIMEOUT:
+                    break
+                del cells[key]
+
+    def dump(self) -> list:
+        with self.lock:
+            return [(key, c.count, c.last_seen) for key, c in self.cells.items()]
+
+    def load(self, cells):
+        """Replace the cells with (key, count, last seen) triples from dump()"""
+        with self.lock:
+            self.cells.clear()
+            for key, count, last_seen in cells:
+                cell = self.cells[key] = GridCell(last_seen)
+                cell.count = count
+
+    def items(self) -> list:
+        """(centre x, centre y, count, last seen) for every live cell"""
+        size = self.cell_size
+        with self.lock:
+            return [((ix + 0.5) * size, (iy + 0.5) * size, c.count, c.last_seen)
+                    for (ix, iy), c in self.cells.items()]
+
+    def clear(self):
+        with self.lock:
+            self.cells.clear()
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+# ---------------- ACTIVITY ----------------
+class RollingCounter:
+    """Event counts in per-second buckets on a ring covering the last `window` seconds"""
+    __slots__ = ("window", "buckets", "stamps")
+
+    def __init__(self, window: int = ACTIVITY_WINDOW):
+        self.window = int(window)
+        self.buckets = [0] * self.window
+        self.stamps = [-1] * self.window  # The second each slot currently counts
+
+    def add(self, ts: float, n: int = 1):
+        sec = int(ts)
+        i = sec % self.window
+        if self.stamps[i] != sec:
+            self.stamps[i] = sec
+            self.buckets[i] = 0
+        self.buckets[i] += n
+
+    def total(self, now: float, seconds: int) -> int:
+        newest = int(now)
+        oldest = newest - seconds
+        return sum(b for b, s in zip(self.buckets, self.stamps) if oldest < s <= newest)
+
+    def series(self, now: float, seconds: int, points: int) -> list:
+        """Counts in `points` equal bins over the last `seconds`, oldest first"""
+        newest = int(now)
+        width = seconds / points
+        out = [0] * points
+        for b, s in zip(self.buckets, self.stamps):
+            age = newest - s
+            if 0 <= age < seconds:
+                out[points - 1 - int(age // width)] += b
+        return out
+
+class RecentUniques:
+    """Names with their last-seen time, oldest first; names older than the window are dropped"""
+    def __init__(self, window: int = ACTIVITY_WINDOW):
+        self.window = window
+        self.seen = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, name: str, ts: float):
+        with self.lock:
+            self.seen[name] = ts
+            self.seen.move_to_end(name)
+            cutoff = ts - self.window
+            while self.seen and next(iter(self.seen.values())) < cutoff:
+                self.seen.popitem(last=False)
+
+    def count(self, now: float, seconds: int) -> int:
+        cutoff = now - seconds
+        n = 0
+        with self.lock:
+            for ts in reversed(self.seen.values()):
+                if ts < cutoff:
+                    break
+                n += 1
+        return n
+
+class ActivityCounters:
+    """Rolling kills, player sightings, dungeon transit starts and hostility hits for the current server"""
+    def __init__(self):
+        self.kills = RollingCounter()
+        self.sightings = RollingCounter()
+        self.players = RecentUniques()
+        self.hostility = RollingCounter()
+        self.dungeon_starts = RollingCounter()
+        self.dungeon_by_manager = {}  # manager -> RollingCounter, at most ACTIVITY_MAX_MANAGERS
+
+    def kill(self, ts: float):
+        self.kills.add(ts)
+
+    def player_seen(self, name: str, ts: float):
+        self.sightings.add(ts)
+        self.players.add(name, ts)
+
+    def hostility_hit(self, ts: float):
+        self.hostility.add(ts)
+
+    def dungeon_start(self, manager: str, ts: float):
+        self.dungeon_starts.add(ts)
+        counter = self.dungeon_by_manager.get(manager)
+        if counter is None:
+            if len(self.dungeon_by_manager) >= ACTIVITY_MAX_MANAGERS:
+                del self.dungeon_by_manager[next(iter(self.dungeon_by_manager))]
+            counter = self.dungeon_by_manager[manager] = RollingCounter()
+        counter.add(ts)
+
+    def summary(self, now: float) -> dict:
+        """Plain numbers and sparkline series for the activity panel"""
+        window, points = ACTIVITY_WINDOW, ACTIVITY_SPARK_POINTS
+        by_manager = [(m, c.total(now, window)) for m, c in list(self.dungeon_by_manager.items())]
+        return {
+            "kills_per_min": self.kills.total(now, 60),
+            "kills_series": self.kills.series(now, window, points),
+            "players_5m": self.players.count(now, 300),
+            "players_15m": self.players.count(now, 900),
+            "sightings_series": self.sightings.series(now, window, points),
+            "dungeon_starts": self.dungeon_starts.total(now, window),
+            "dungeon_top": sorted((x for x in by_manager if x[1]), key=lambda x: -x[1])[:3],
+            "dungeon_series": self.dungeon_starts.series(now, window, points),
+            "hostility_per_min": self.hostility.total(now, 60),
+            "hostility_series": self.hostility.series(now, window, points),
+        }
+
+# ---------------- CORRELATION ----------------
+class EventRing:
+    """Fixed-capacity ring of (ts, value) kept in time order, so window queries bisect"""
+    __slots__ = ("stamps", "values", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.stamps = [0.0] * capacity
+        self.values = [None] * capacity
+        self.head = 0  # Index of the oldest entry
+        self.size = 0
+
+    def append(self, ts: float, value):
+        cap = len(self.stamps)
+        if self.size:
+            # Sources interleave slightly out of order; clamping keeps the ring sorted
+            ts = max(ts, self.stamps[(self.head + self.size - 1) % cap])
+        if self.size < cap:
+            i = (self.head + self.size) % cap
+            self.size += 1
+        else:
+            i = self.head
+            self.head = (self.head + 1) % cap
+        self.stamps[i] = ts
+        self.values[i] = value
+
+    def _first_at(self, ts: float) -> int:
+        """Logical index of the first entry with a timestamp >= ts"""
+        cap = len(self.stamps)
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.stamps[(self.head + mid) % cap] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start: float, end: float) -> list:
+        """(ts, value) pairs with start <= ts <= end, oldest first"""
+        cap = len(self.stamps)
+        out = []
+        for k in range(self._first_at(start), self.size):
+            i = (self.head + k) % cap
+            if self.stamps[i] > end:
+                break
+            out.append((self.stamps[i], self.values[i]))
+        return out
+
+class Engagement:
+    """Hits on one player joined with the incap, corpse or death that followed"""
+    __slots__ = ("victim", "ts", "outcome", "killer", "hits", "incap_ts", "record", "since", "last_ts")
+
+    def __init__(self, victim: str, ts: float, outcome: str, since: float = None):
+        self.victim = victim
+        self.ts = ts
+        self.outcome = outcome  # "incap", "corpse" or "death"
+        self.since = ts - ENGAGEMENT_WINDOW if since is None else since  # Hits after this count
+        self.last_ts = ts  # Its latest outcome
+        self.killer = None
+        self.hits = {}  # attacker -> hits in the window, first hitter first
+        self.incap_ts = None
+        self.record = None  # Its events-feed entry, once it has hits
+
+    def attackers(self) -> list:
+        names = list(self.hits)
+        if self.killer and self.killer not in self.hits:
+            names.append(self.killer)
+        return names
+
+    def describe(self) -> str:
+        verb = {"incap": "downed", "corpse": "died", "death": "killed"}[self.outcome]
+        parts = [verb]
+        if self.killer:
+            parts.append(f"by {self.killer}")
+        if self.hits:
+            hits = ", ".join(f"{name} x{n}" for name, n in self.hits.items())
+            parts.append(f"after hits from {hits}")
+        return " ".join(parts)
+
+    __str__ = describe  # The events feed formats the engagement itself, whenever it is shown
+
+    def to_dict(self) -> dict:
+        return {
+            "victim": self.victim,
+            "ts": self.ts,
+            "outcome": self.outcome,
+            "killer": self.killer,
+            "hits": dict(self.hits),
+            "incap_ts": self.incap_ts,
+        }
+
+class SightingBuffer:
+    """Recent player sightings in time order, matched to transit pings by age and distance"""
+    def __init__(self, capacity: int = SIGHTING_BUFFER_SIZE):
+        self.ring = EventRing(capacity)
+        self.claimed = {}  # name -> newest sighting already attributed to a transit
+
+    def add(self, name: str, ts: float, pos: tuple = None):
+        self.ring.append(ts, (name, pos))
+
+    def candidates(self, ts: float, pos: tuple = None, window: float = PLAYER_TRANSIT_ASSOCIATION_WINDOW,
+                   limit: int = TRANSIT_MAX_CANDIDATES) -> list:
+        """(name, sighting ts) of the players seen in the window before ts, best match first.
+
+        Newer sightings score better, and so do closer ones when both positions are
+        known; anyone further than TRANSIT_CANDIDATE_MAX_DISTANCE is not a candidate.
+        """
+        latest = {}  # name -> (newest sighting ts, newest known position)
+        for seen_ts, (name, seen_pos) in self.ring.window(ts - window, ts):
+            if seen_ts <= self.claimed.get(name, -1.0):
+                continue
+            latest[name] = (seen_ts, seen_pos or latest.get(name, (0.0, None))[1])
+        scored = []
+        for name, (seen_ts, seen_pos) in latest.items():
+            if pos and seen_pos:
+                dist = math.sqrt(sum((a - b) ** 2 for a, b in zip(pos, seen_pos)))
+                if dist > TRANSIT_CANDIDATE_MAX_DISTANCE:
+                    continue
+                closeness = dist / TRANSIT_CANDIDATE_MAX_DISTANCE
+            else:
+                closeness = 0.5
+            scored.append(((ts - seen_ts) / window + closeness, seen_ts, name))
+        scored.sort()
+        return [(name, seen_ts) for _, seen_ts, name in scored[:limit]]
+
+    def claim(self, name: str, seen_ts: float):
+        """Stop sightings up to seen_ts from matching another transit"""
+        self.claimed[name] = seen_ts
+        if len(self.claimed) > len(self.ring.stamps):
+            cutoff = seen_ts - PLAYER_TRANSIT_ASSOCIATION_WINDOW
+            self.claimed = {n: t for n, t in self.claimed.items() if t > cutoff}
+
+class CorrelationEngine:
+    """Per-name rings of recent hits, incaps, corpses and deaths, joined into engagements.
+
+    Each (kind, name) gets an EventRing of CORRELATION_RING_SIZE entries and the
+    least recently touched rings are dropped past CORRELATION_MAX_RINGS, so memory
+    is bounded however many names go by. A window query is a binary search in one ring.
+    """
+    KINDS = ("hit", "incap", "corpse", "death")
+
+    def __init__(self, window: float = ENGAGEMENT_WINDOW):
+        self.window = window
+        self.rings = collections.OrderedDict()  # (kind, name) -> EventRing
+        self.open = {}  # victim -> Engagement still within the window
+        self.recent = collections.deque(maxlen=ENGAGEMENT_HISTORY_SIZE)
+
+    def record(self, kind: str, name: str, ts: float, other: str = None):
+        key = (kind, name)
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = EventRing(CORRELATION_RING_SIZE)
+            if len(self.rings) > CORRELATION_MAX_RINGS:
+                self.rings.popitem(last=False)
+        else:
+            self.rings.move_to_end(key)
+        ring.append(ts, other)
+
+    def query(self, kind: str, name: str, start: float, end: float) -> list:
+        ring = self.rings.get((kind, name))
+        return ring.window(start, end) if ring else []
+
+    def hit(self, attacker: str, victim: str, ts: float):
+        self.record("hit", victim, ts, attacker)
+
+    def outcome(self, kind: str, victim: str, ts: float, killer: str = None) -> Engagement:
+        """Record an incap, corpse or death and join it with the hits before it.
+
+        Returns the engagement, new or the one still open for this victim within
+        the window, which this outcome may have given a killer or more hits. A
+        death or corpse closes it: only a corpse still joins it after that, the
+        next incap or death starts a fresh one counting hits since the last outcome.
+        """
+        self.record(kind, victim, ts, killer)
+        eng = self.open.get(victim)
+        fresh = (eng is None or ts - eng.ts > self.window
+                 or (eng.outcome != "incap" and kind != "corpse"))
+        if fresh:
+            since = ts - self.window if eng is None else max(ts - self.window, eng.last_ts)
+            eng = Engagement(victim, ts, kind, since)
+            self.open[victim] = eng
+            self.recent.appendleft(eng)
+            if len(self.open) > CORRELATION_MAX_RINGS:
+                self.open = {v: e for v, e in self.open.items() if ts - e.ts <= self.window}
+        elif eng.outcome == "incap" or kind == "death":
+            eng.outcome = kind
+        eng.last_ts = ts
+        if killer and not eng.killer:
+            eng.killer = killer
+        hits = {}
+        for hit_ts, attacker in self.query("hit", victim, eng.since, ts):
+            if hit_ts > eng.since:
+                hits[attacker] = hits.get(attacker, 0) + 1
+        eng.hits = hits
+        incaps = [i for i in self.query("incap", victim, eng.since, ts) if i[0] > eng.since]
+        if incaps:
+            eng.incap_ts = incaps[0][0]
+        return eng
+
+    def __len__(self) -> int:
+        return len(self.rings)
+
+# ---------------- LINE QUEUE ----------------
+class LineClass(enum.IntEnum):
+    NOISE = 0
+    LOW = 1
+    NORMAL = 2
+    HIGH = 3
+
+def classify_line(line: str) -> LineClass:
+    """Prefilter verdict used to decide what to shed when the parser falls behind"""
+    if high_value_line_re.search(line):
+        return LineClass.HIGH
+    if low_value_line_re.search(line) and "nickname=" not in line:
+        return LineClass.LOW
+    if detection_rules.compiled.marker_re.search(line):
+        return LineClass.NORMAL
+    return LineClass.NOISE
+
+class IngestQueue:
+    """Bounded (line, read_ts, source) buffer between the tailers and the parser.
+
+    Below the shed level every line is queued. Above it, noise is dropped and
+    low-value lines (stall and position spam) are sampled. Once full, normal
+    lines are dropped too and high-value lines block the producer until the
+    parser catches up, so nothing important is lost and memory stays bounded.
+    Replays put with shed=False: every line blocks instead, so a replay parses
+    the whole log however far the reader gets ahead of the parser.
+    """
+    def __init__(self, maxsize: int = LINE_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.shed_level = int(maxsize * LINE_QUEUE_SHED_LEVEL)
+        self.items = collections.deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.dropped = collections.Counter()
+        self.low_value_seen = 0
+        self.blocked = 0
+
+    def put(self, item, block: bool = True, shed: bool = True) -> bool:
+        """Queue item, returns False if it was shed"""
+        with self.lock:
+            if not shed:
+                while len(self.items) >= self.maxsize:
+                    self.not_full.wait()
+            elif len(self.items) >= self.shed_level and item is not None:
+                line_class = classify_line(item[0])
+                if line_class == LineClass.NOISE:
+                    self.dropped["noise"] += 1
+                    return False
+                if line_class == LineClass.LOW:
+                    self.low_value_seen += 1
+                    if self.low_value_seen % LOW_VALUE_SAMPLE_EVERY:
+                        self.dropped["low"] += 1
+                        return False
+                if len(self.items) >= self.maxsize:
+                    if line_class != LineClass.HIGH or not block:
+                        self.dropped[line_class.name.lower()] += 1
+                        return False
+                    self.blocked += 1
+                    while len(self.items) >= self.maxsize:
+                        self.not_full.wait()
+            self.items.append(item)
+            self.not_empty.notify()
+            return True
+
+    def get(self, block: bool = True, timeout: float = None):
+        with self.lock:
+            if not block and not self.items:
+                raise queue.Empty
+            while not self.items:
+                if not self.not_empty.wait(timeout):
+                    raise queue.Empty
+            item = self.items.popleft()
+            self.not_full.notify()
+            return item
+
+    def qsize(self) -> int:
+        return len(self.items)
+
+    def drop_summary(self) -> str:
+        total = sum(self.dropped.values())
+        if not total:
+            return "shed 0"
+        parts = ", ".join(f"{k} {v}" for k, v in sorted(self.dropped.items()))
+        return f"shed {total} ({parts})"
 
 # ---------------- SHARED STATE ----------------
-state = {
+class ServerSession:
+    """Live radar data for one game server; a server swap archives it and starts a fresh one"""
+    def __init__(self, number: int, started: float):
+        self.number = number
+        self.started = started
+        self.ended = None
+        self.data = {
+            "entities": {},
+            "events": collections.deque(maxlen=EVENT_LOG_SIZE),
+            "pings": PingStore(),
+            "position_grid": PositionGrid(),
+            "activity": ActivityCounters(),
+            "engagements": CorrelationEngine(),
+            "sightings": SightingBuffer(),
+            "zone_mentions": collections.deque(maxlen=20),
+            "vehicles": {},
+            "pending_vehicle": None,
+            "current_vehicle": None,
+            "session_kills": 0,
+            "session_npc_kills": 0,
+            "session_player_kills": 0,
+            "spawn_reset_cooldown": {},
+        }
+
+    def summary(self) -> dict:
+        data = self.data
+        return {
+            "number": self.number,
+            "started": self.started,
+            "ended": self.ended,
+            "players": sum(1 for e in list(data["entities"].values()) if e.type == Tag.PLAYER),
+            "vehicles": len(data["vehicles"]),
+            "kills": data["session_kills"],
+            "npc_kills": data["session_npc_kills"],
+            "player_kills": data["session_player_kills"],
+            "events": len(data["events"]),
+            "engagements": len(data["engagements"].recent),
+        }
+
+SESSION_KEYS = frozenset(ServerSession(0, 0.0).data)
+
+class RadarState(collections.abc.MutableMapping):
+    """The shared state dict: session keys live in the current ServerSession, the rest persist.
+
+    Swapping servers is one reference change; the previous session goes to a
+    bounded archive instead of being cleared field by field.
+    """
+    def __init__(self, persistent: dict):
+        self.persistent = persistent
+        # Stamped by the first parsed line, on whichever clock (wall or replayed log) is in use by then
+        self.session = ServerSession(1, None)
+        self.archive = collections.deque(maxlen=SESSION_ARCHIVE_SIZE)
+
+    def __getitem__(self, key):
+        if key in SESSION_KEYS:
+            return self.session.data[key]
+        return self.persistent[key]
+
+    def __setitem__(self, key, value):
+        if key in SESSION_KEYS:
+            self.session.data[key] = value
+        else:
+            self.persistent[key] = value
+
+    def __delitem__(self, key):
+        if key in SESSION_KEYS:
+            raise KeyError(f"{key} is part of every session")
+        del self.persistent[key]
+
+    def __iter__(self):
+        return itertools.chain(self.session.data, self.persistent)
+
+    def __len__(self) -> int:
+        return len(self.session.data) + len(self.persistent)
+
+    def stamp_start(self, now: float):
+        """Start the current session at now unless it already has a start"""
+        if self.session.started is None:
+            self.session.started = now
+
+    def new_session(self, now: float) -> ServerSession:
+        old = self.session
+        old.ended = now
+        self.archive.appendleft(old)
+        self.session = ServerSession(old.number + 1, now)
+        return old
+
+    def sessions(self) -> list:
+        """Current session first, then the archived ones, newest first"""
+        return [self.session] + list(self.archive)
+
+state = RadarState({
     "player_pos": None,
-    "entities": {},
-    "events": collections.deque(maxlen=600),
-    "pings": collections.defaultdict(list),
-    "last_seen_player": {"name": None, "ts": 0},
     "current_station": "Station",
     "last_sound_ts": 0.0,
     "sound_enabled": False,
-    "zone_mentions": collections.deque(maxlen=20),
-    "transit_locations": set(),
-    "detected_zones": set(),
-    "player_names": set(),
-    "players_killed": set(),
+    "transit_locations": SeenSet(),
+    "detected_zones": SeenSet(),
+    "player_names": SeenSet(),
+    "players_killed": SeenSet(),
     "last_export": 0.0,
     "last_export_log": 0.0,
-    "vehicles": {},
-    "pending_vehicle": None,
-    "current_vehicle": None,
     "player_name": PLAYER_NAME,
     "game_version": GAME_VERSION,
     "total_kills": 0,
-    "session_kills": 0,
     "npc_kills": 0,
     "player_kills": 0,
-    "session_npc_kills": 0,
-    "session_player_kills": 0,
     "player_id": None,
-    "spawn_reset_cooldown": {},
     "pending_server_swap": False,
+    "radar_epoch": 0,  # Bumped whenever clear_radar_data() starts a new session
+    "line_source": None,  # Source of the line being parsed, only set when tailing several logs
     "server_swap_time": 0,
-}
-line_q = queue.Queue()
+})
+line_q = IngestQueue()
+clock = WallClock()
+
+# ---------------- HEATMAPS ----------------
+class HeatmapStore:
+    """Per-zone 2D histograms of kill, death and sighting positions, kept as NumPy arrays.
+
+    Points are buffered and binned in batches with np.add.at. Each zone's grid is
+    centred on the first point seen there and covers HEATMAP_BINS cells of
+    HEATMAP_CELL_SIZE metres per side; points outside it are ignored. Ship and
+    other vehicle zones are skipped, their positions move with the vehicle, and
+    at most HEATMAP_MAX_GRIDS grids are kept. Without NumPy every method is a no-op.
+    """
+    def __init__(self, path: str = HEATMAP_PATH):
+        self.path = path
+        self.maps = collections.OrderedDict()  # (zone, layer) -> (origin xy array, uint32 grid), least recently added to first
+        self.pending = collections.defaultdict(list)
+        self.last_zone = {}  # layer -> zone most recently added to
+        self.version = 0
+        self.saved_version = 0
+        self.views = None
+        self.lock = threading.Lock()
+
+    def add(self, zone: str, layer: str, pos):
+        if np is None or not zone or not pos or is_vehicle_zone(zone):
+            return
+        key = (zone, layer)
+        with self.lock:
+            points = self.pending[key]
+            points.append((pos[0], pos[1]))
+            self.last_zone[layer] = zone
+            if len(points) >= HEATMAP_BATCH:
+                self._flush()
+
+    def _flush(self):
+        """Bin every pending point (lock held)"""
+        if not self.pending:
+            return
+        for key, points in self.pending.items():
+            pts = np.asarray(points, dtype=np.float64)
+            entry = self.maps.get(key)
+            if entry is None:
+                half = HEATMAP_BINS * HEATMAP_CELL_SIZE / 2
+                origin = np.floor(pts[0] / HEATMAP_CELL_SIZE) * HEATMAP_CELL_SIZE - half
+                entry = self.maps[key] = (origin, np.zeros((HEATMAP_BINS, HEATMAP_BINS), dtype=np.uint32))
+                if len(self.maps) > HEATMAP_MAX_GRIDS:
+                    self.maps.popitem(last=False)
+            else:
+                self.maps.move_to_end(key)
+            origin, grid = entry
+            idx = np.floor((pts - origin) / HEATMAP_CELL_SIZE).astype(np.int64)
+            idx = idx[((idx >= 0) & (idx < HEATMAP_BINS)).all(axis=1)]
+            np.add.at(grid, (idx[:, 1], idx[:, 0]), 1)
+        self.pending.clear()
+        self.version += 1
+
+    def view(self) -> dict:
+        """layer -> (zone, [(x, y, size, intensity 0-1), ...]) for each layer's latest zone"""
+        if np is None:
+            return {}
+        with self.lock:
+            self._flush()
+            if self.views is not None and self.views[0] == self.version:
+                return self.views[1]
+            views = {}
+            for layer, zone in self.last_zone.items():
+                entry = self.maps.get((zone, layer))
+                if entry is not None:
+                    views[layer] = (zone, self._cells(*entry))
+            self.views = (self.version, views)
+            return views
+
+    def _cells(self, origin, grid) -> list:
+        size = HEATMAP_CELL_SIZE
+        # Pool neighbouring bins until there are few enough rectangles to draw
+        while np.count_nonzero(grid) > HEATMAP_MAX_DRAW_CELLS and grid.shape[0] > 1:
+            n = grid.shape[0] // 2
+            grid = grid[:n*2, :n*2].reshape(n, 2, n, 2).sum(axis=(1, 3))
+            size *= 2
+        ys, xs = np.nonzero(grid)
+        if not len(xs):
+            return []
+        values = np.log1p(grid[ys, xs].astype(np.float64))
+        values /= values.max()
+        return [(float(origin[0] + x * size), float(origin[1] + y * size), size, float(v))
+                for x, y, v in zip(xs, ys, values)]
+
+    def save(self):
+        """Write every grid to one compressed .npz if anything changed since the last save"""
+        if np is None:
+            return
+        with self.lock:
+            self._flush()
+            if self.version == self.saved_version or not self.maps:
+                return
+            keys = list(self.maps)
+            data = {
+                "keys": np.array([f"{zone}\t{layer}" for zone, layer in keys]),
+                "origins": np.array([self.maps[k][0] for k in keys]),
+                "grids": np.array([self.maps[k][1] for k in keys]),
+            }
+            version = self.version
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **data)
+        os.replace(tmp, self.path)
+        self.saved_version = version
+
+    def load(self):
+        if np is None or not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            keys, origins, grids = data["keys"], data["origins"], data["grids"]
+        if grids.shape[1:] != (HEATMAP_BINS, HEATMAP_BINS):
+            return  # Saved with a different grid size
+        with self.lock:
+            for key, origin, grid in zip(keys, origins, grids):
+                zone, layer = str(key).split("\t", 1)
+                if not is_vehicle_zone(zone):
+                    self.maps[(zone, layer)] = (origin, grid.astype(np.uint32))
+            while len(self.maps) > HEATMAP_MAX_GRIDS:
+                self.maps.popitem(last=False)
+
+heatmaps = HeatmapStore()
+
+# ---------------- PLAYER REGISTRY ----------------
+PLAYER_REGISTRY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    encounters INTEGER NOT NULL,
+    kills_by_me INTEGER NOT NULL,
+    deaths_to INTEGER NOT NULL,
+    hostility INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_last_seen ON players (last_seen);
+CREATE TABLE IF NOT EXISTS player_zones (
+    name TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    sightings INTEGER NOT NULL,
+    PRIMARY KEY (name, zone)
+) WITHOUT ROWID;
+"""
+
+class PlayerRecord:
+    """What the registry knows about one player, across every session"""
+    __slots__ = ("name", "first_seen", "last_seen", "encounters", "kills_by_me", "deaths_to",
+                 "hostility", "zones")
+
+    def __init__(self, name: str, first_seen: float = 0.0, last_seen: float = 0.0, encounters: int = 0,
+                 kills_by_me: int = 0, deaths_to: int = 0, hostility: int = 0, zones: dict = None):
+        self.name = name
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.encounters = encounters
+        self.kills_by_me = kills_by_me
+        self.deaths_to = deaths_to
+        self.hostility = hostility
+        self.zones = zones or {}  # zone -> sightings
+
+    def row(self) -> tuple:
+        return (self.name, self.first_seen, self.last_seen, self.encounters,
+                self.kills_by_me, self.deaths_to, self.hostility)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "encounters": self.encounters,
+            "kills_by_me": self.kills_by_me,
+            "deaths_to": self.deaths_to,
+            "hostility": self.hostility,
+            "zones": dict(self.zones),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        return cls(d["name"], d["first_seen"], d["last_seen"], d["encounters"],
+                   d["kills_by_me"], d["deaths_to"], d["hostility"], d["zones"])
+
+    def describe(self) -> str:
+        """Short history for the players panel, e.g. 'seen 14x, killed you 2x'; empty for a first encounter"""
+        parts = [f"seen {self.encounters}x"] if self.encounters > 1 else []
+        if self.kills_by_me:
+            parts.append(f"you killed {self.kills_by_me}x")
+        if self.deaths_to:
+            parts.append(f"killed you {self.deaths_to}x")
+        if self.hostility:
+            parts.append(f"hostile {self.hostility}x")
+        return ", ".join(parts)
+
+class PlayerRegistry:
+    """Persistent player history in SQLite, indexed by name, with recently used records cached.
+
+    The parser only updates cached records; flush() writes the changed ones in one
+    transaction on export, through its own connection and without holding the lock,
+    so sightings never wait on the disk. Lookups that miss the cache are a primary-key
+    SELECT, so the registry can hold any number of players without being loaded up front.
+    """
+    def __init__(self, path: str = PLAYER_REGISTRY_PATH, cache_size: int = PLAYER_REGISTRY_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.records = collections.OrderedDict()  # name -> unchanged PlayerRecord, least recently used first
+        self.changed = {}  # name -> PlayerRecord updated since the last flush
+        self.conn = None
+        self.write_conn = None
+        self.failed = False
+        self.lock = threading.RLock()
+        self.flush_lock = threading.Lock()  # One flush at a time; held while writing, unlike lock
+
+    def _db(self):
+        """Open the database on first use (lock held); None if it can't be opened"""
+        if self.conn is None and not self.failed:
+            try:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(PLAYER_REGISTRY_SCHEMA)
+                self.conn = conn
+            except sqlite3.Error as e:
+                self.failed = True
+                add_event(f"[REGISTRY ERROR] {e}", "info")
+        return self.conn
+
+    def _load(self, name: str):
+        db = self._db()
+        if db is None:
+            return None
+        try:
+            row = db.execute("SELECT * FROM players WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            zones = dict(db.execute("SELECT zone, sightings FROM player_zones WHERE name = ?", (name,)))
+        except sqlite3.Error:
+            return None
+        return PlayerRecord(*row, zones=zones)
+
+    def _trim(self):
+        while len(self.records) > self.cache_size:
+            self.records.popitem(last=False)
+
+    def get(self, name: str):
+        with self.lock:
+            rec = self.changed.get(name)
+            if rec is not None:
+                return rec
+            rec = self.records.get(name)
+            if rec is not None:
+                self.records.move_to_end(name)
+                return rec
+            rec = self._load(name)
+            if rec is not None:
+                self.records[name] = rec
+                self._trim()
+            return rec
+
+    def _touch(self, name: str, now: float, zone: str = None) -> PlayerRecord:
+        """Record a sighting (lock held); a gap of PLAYER_ENCOUNTER_GAP starts a new encounter"""
+        rec = self.changed.get(name)
+        if rec is None:
+            rec = self.records.pop(name, None) or self._load(name) or PlayerRecord(name)
+            self.changed[name] = rec
+        if not rec.encounters or now - rec.last_seen > PLAYER_ENCOUNTER_GAP:
+            rec.encounters += 1
+        if not rec.first_seen:
+            rec.first_seen = now
+        rec.last_seen = max(rec.last_seen, now)
+        if zone:
+            rec.zones[zone] = rec.zones.get(zone, 0) + 1
+        return rec
+
+    def seen(self, name: str, now: float, zone: str = None):
+        with self.lock:
+            self._touch(name, now, zone)
+
+    def killed_by_me(self, name: str, now: float, zone: str = None):
+        with self.lock:
+            self._touch(name, now, zone).kills_by_me += 1
+
+    def killed_me(self, name: str, now: float, zone: str = None):
+        with self.lock:
+            self._touch(name, now, zone).deaths_to += 1
+
+    def hostile(self, name: str, now: float):
+        with self.lock:
+            self._touch(name, now).hostility += 1
+
+    def merge(self, records: dict):
+        """Cache records sent by the parser process, which is the one that writes them"""
+        with self.lock:
+            for name, d in records.items():
+                self.records.pop(name, None)
+                self.records[name] = PlayerRecord.from_dict(d)
+            self._trim()
+
+    def view(self, names) -> dict:
+        """Cached records for the given names, as dicts for a snapshot"""
+        with self.lock:
+            records = ((self.changed.get(name) or self.records.get(name)) for name in names)
+            return {rec.name: rec.to_dict() for rec in records if rec is not None}
+
+    def flush(self) -> int:
+        """Write every changed record in one transaction, returns how many were written.
+
+        The changed records are swapped out and their rows copied under the lock, then
+        written without it; a record the parser touches meanwhile is simply marked
+        changed again and goes out with the next flush.
+        """
+        with self.flush_lock:
+            with self.lock:
+                dirty = list(self.changed.values())
+                if not dirty:
+                    return 0
+                if self._db() is None:
+                    self.changed.clear()  # Nowhere to keep them
+                    return 0
+                rows = [rec.row() for rec in dirty]
+                zone_rows = [(rec.name, zone, n) for rec in dirty for zone, n in rec.zones.items()]
+                self.changed = {}
+                for rec in dirty:
+                    self.records[rec.name] = rec
+            try:
+                if self.write_conn is None:
+                    self.write_conn = sqlite3.connect(self.path, check_same_thread=False)
+                with self.write_conn as db:
+                    db.executemany("INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    db.executemany("INSERT OR REPLACE INTO player_zones VALUES (?, ?, ?)", zone_rows)
+            except sqlite3.Error as e:
+                add_event(f"[REGISTRY ERROR] {e}", "info")
+                with self.lock:
+                    for rec in dirty:
+                        if rec.name not in self.changed:
+                            self.records.pop(rec.name, None)
+                            self.changed[rec.name] = rec
+                return 0
+            with self.lock:
+                # Only now, so an evicted record can't be reloaded from rows not yet written
+                self._trim()
+            return len(dirty)
+
+    def recent(self, limit: int) -> list:
+        """The most recently seen players (call after flush())"""
+        with self.lock:
+            db = self._db()
+            if db is None:
+                return []
+            try:
+                names = [row[0] for row in db.execute(
+                    "SELECT name FROM players ORDER BY last_seen DESC LIMIT ?", (limit,))]
+            except sqlite3.Error:
+                return []
+            records = (self.get(name) for name in names)
+            return [rec.to_dict() for rec in records if rec is not None]
+
+    def count(self) -> int:
+        with self.lock:
+            db = self._db()
+            if db is None:
+                return len(self.records)
+            try:
+                return db.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+            except sqlite3.Error:
+                return len(self.records)
+
+player_registry = PlayerRegistry()
 
 # ---------------- CONFIG MANAGEMENT ----------------
 
@@ -236,23 +1632,26 @@ def load_config():
         add_event(f"[CONFIG] Error loading config: {e}", "info")
         print(f"[DEBUG] Load error: {e}")
 
-def scan_log_for_metadata():
+    try:
+        heatmaps.load()
+    except Exception as e:
+        add_event(f"[HEATMAP] Could not load {os.path.basename(HEATMAP_PATH)}: {e}", "info")
+
+def scan_log_for_metadata(path: str = LOG_PATH):
     """Scan the entire game log to find player name and game version"""
     try:
-        if not os.path.exists(LOG_PATH):
+        if not os.path.exists(path):
             return
 
         add_event("[SYSTEM] Scanning log file for player name and game version...", "info")
 
-        with open(LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
             for line in f:
                 if state["player_name"] == "Unknown":
                     login_m = login_pattern_re.search(line)
                     if login_m:
                         detected_name = login_m.group(1)
-                        state["player_name"] = detected_name
-                        global PLAYER_NAME
-                        PLAYER_NAME = detected_name
+                        set_player_name(detected_name)
                         add_event(f"[SYSTEM] Player detected: {detected_name}", "you")
 
                 if state["player_id"] is None:
@@ -302,58 +1701,150 @@ def scan_log_for_metadata():
 
 def is_self(name: str) -> bool:
     """Check if a name matches the current player (case-insensitive)"""
-    if not name or not state.get("player_name"):
+    if not name:
         return False
-    return name.strip().lower() == state.get("player_name", "").strip().lower()
+    return name_classifier.lookup(name)[2]
+
+def set_player_name(name: str):
+    """Record the detected player name; cached name verdicts depend on it"""
+    global PLAYER_NAME
+    state["player_name"] = name
+    PLAYER_NAME = name
+    name_classifier.invalidate()
 
 def clear_radar_data():
-    """Clear real-time radar data when swapping servers, preserve persistent stats"""
-    # Save persistent data before clearing
-    persistent_kills = {
-        "npc_kills": state["npc_kills"],
-        "player_kills": state["player_kills"],
-        "total_kills": state["total_kills"],
-        "player_name": state["player_name"],
-        "game_version": state["game_version"],
-        "player_id": state["player_id"],
+    """Start a fresh server session on a swap; the old one is archived and persistent stats are untouched"""
+    old = state.new_session(clock.now())
+    state["radar_epoch"] += 1
+    add_event(f"[SERVER SWAP] Session {old.number} archived - new server session started", "info")
+
+# ---------------- EVENTS ----------------
+class EventRecord:
+    """One entry of the events feed; the display text is only built when first needed"""
+    __slots__ = ("seq", "kind", "ts", "tag", "names", "zone", "pos", "detail", "source", "text")
+
+    def __init__(self, kind: str, ts, tag: str, names: tuple = (), zone: str = None,
+                 pos: tuple = None, detail=None):
+        self.seq = next(_event_seq)
+        self.kind = kind
+        self.ts = ts
+        self.tag = tag
+        self.names = names
+        self.zone = zone
+        self.pos = pos
+        self.detail = detail
+        self.source = None
+        self.text = None
+
+_event_seq = itertools.count(1)
+
+# kind -> (log tag, template). Templates may use {ts} {name} {other} {tagged_other} {zone} {pos} {detail}
+EVENT_KINDS = {
+    "system": ("info", "{detail}"),
+    "spawn_reset": ("player", "{ts} [SPAWN RESET] {name} reset their spawn at {detail}"),
+    "vehicle_detected": ("vehicle", "{ts} [VEHICLE] {name} detected nearby"),
+    "vehicle_attacker": ("player", "{ts} [PLAYER] {name} detected (vehicle destruction)"),
+    "vehicle_destroyed": ("vehicle", "{ts} [VEHICLE {detail[0]}] {name} destroyed by {other} ({detail[1]}→{detail[2]})"),
+    "my_vehicle": ("you", "{ts} [MY VEHICLE] Entered {name}"),
+    "location": ("info", "{ts} [LOCATION] Detected station: {zone}"),
+    "door": ("transit", "{ts} [DOOR] {detail} {name}"),
+    "transit": ("transit", "{ts} [{detail[0]} {detail[1]}] {tagged_other}{name} zone={zone} pos={pos}"),
+    "dungeon_transit": ("dungeon", "{ts} [{detail[0]} {detail[1]}] {tagged_other}{name} zone={zone} pos={pos}"),
+    "sound": ("info", "{ts} [SOUND] Dungeon alert"),
+    "player_seen": ("player", "{ts} [PLAYER] {name} @ {pos}"),
+    "player_seen_nopos": ("player", "{ts} [PLAYER] {name} detected (pos unknown)"),
+    "corpse_instant": ("death", "{ts} [CORPSE INSTANT] {name} detected and immediately dead"),
+    "corpse": ("death", "{ts} [CORPSE] {name} is now a corpse"),
+    "player_kill": ("player_kill", "{ts} [PLAYER KILL] Killed {name} at pos={pos}"),
+    "player_kill_zone": ("player_kill", "{ts} [PLAYER KILL] Killed {name} in {zone}"),
+    "npc_kill": ("npc_kill", "{ts} [NPC KILL] Killed {name}"),
+    "npc_kill_zone": ("npc_kill", "{ts} [NPC KILL] Killed {name} in {zone}"),
+    "incap": ("death", "{ts} [INCAP] {name} incapacitated, causes: {detail}"),
+    "stall": ("player", "{ts} [STALL] Saw {name} (type: {detail[0]}, len: {detail[1]})"),
+    "respawn": ("player", "{ts} [SPAWN FLOW] {name} respawned, marked alive again"),
+    "spawn_flow": ("player", "{ts} [SPAWN FLOW] Detected {name}"),
+    "entity_detach": ("player", "{ts} [ENTITY] Detected {name} (entity detach)"),
+    "hostility_attacker": ("player", "{ts} [PLAYER] {name} detected (hostility attacker)"),
+    "hostility_target": ("player", "{ts} [PLAYER] {name} detected (hostility target)"),
+    "engagement": ("death", "{ts} [ENGAGEMENT] {name} {detail}"),
+    "rule": ("info", "{ts} {detail}"),  # Logged by rules-file rules, which pick their own tag
+}
+
+# Events panel filter -> log tags it shows (None = everything)
+EVENT_FILTERS = {
+    "All": None,
+    "Players": {"player", "you"},
+    "Kills": {"npc_kill", "player_kill"},
+    "Deaths": {"death"},
+    "Transit": {"transit", "dungeon"},
+    "Vehicles": {"vehicle"},
+    "System": {"info"},
+}
+
+def _push_event(rec: EventRecord):
+    state["events"].appendleft(rec)
+    if api_hub and api_hub.active:
+        api_hub.publish("event", event_to_dict(rec))
+
+def add_event(text: str, tag: str = "info"):
+    """Add a free-text system message to the events feed"""
+    _push_event(EventRecord("system", None, tag, detail=text))
+
+def log_event(kind: str, ts: float, names: tuple = (), zone: str = None, pos: tuple = None, detail=None,
+              tag: str = None):
+    """Add a structured parser event; nothing is formatted until the UI shows it"""
+    rec = EventRecord(kind, ts, tag or EVENT_KINDS[kind][0], names, zone, pos, detail)
+    rec.source = state["line_source"]
+    _push_event(rec)
+    ingest_lag.note_event()  # Only here: add_event is also called from the UI thread
+    return rec
+
+def format_event(rec: EventRecord) -> str:
+    if rec.text is None:
+        other = rec.names[1] if len(rec.names) > 1 and rec.names[1] else ""
+        rec.text = EVENT_KINDS[rec.kind][1].format(
+            ts=datetime.fromtimestamp(rec.ts, timezone.utc).strftime("%H:%M:%S") if rec.ts is not None else "",
+            name=rec.names[0] if rec.names else "",
+            other=other,
+            tagged_other=f"[{other}] " if other else "",
+            zone=rec.zone,
+            pos=f"({rec.pos[0]:.1f},{rec.pos[1]:.1f},{rec.pos[2]:.1f})" if rec.pos else "",
+            detail=rec.detail,
+        )
+        if rec.source:
+            rec.text = f"[{rec.source}] {rec.text}"
+    return rec.text
+
+def event_to_dict(rec: EventRecord) -> dict:
+    return {
+        "seq": rec.seq,
+        "kind": rec.kind,
+        "ts": rec.ts,
+        "tag": rec.tag,
+        "names": [n for n in rec.names if n],
+        "zone": rec.zone,
+        "pos": list(rec.pos) if rec.pos else None,
+        "detail": rec.detail.to_dict() if isinstance(rec.detail, Engagement) else rec.detail,
+        "source": rec.source,
+        "text": format_event(rec),
     }
 
-    # Clear real-time tracking
-    state["entities"].clear()
-    state["pings"].clear()
-    state["vehicles"].clear()
-    state["pending_vehicle"] = None
-    state["current_vehicle"] = None
-    state["last_seen_player"] = {"name": None, "ts": 0}
-    state["spawn_reset_cooldown"].clear()
-
-    # Keep zone mentions but clear old ones
-    state["zone_mentions"].clear()
-
-    # Clear recent events
-    state["events"].clear()
-
-    # Reset session kills (they're for the new server session)
-    state["session_npc_kills"] = 0
-    state["session_player_kills"] = 0
-    state["session_kills"] = 0
-
-    # Restore persistent data
-    state["npc_kills"] = persistent_kills["npc_kills"]
-    state["player_kills"] = persistent_kills["player_kills"]
-    state["total_kills"] = persistent_kills["total_kills"]
-    state["player_name"] = persistent_kills["player_name"]
-    state["game_version"] = persistent_kills["game_version"]
-    state["player_id"] = persistent_kills["player_id"]
-
-    add_event("[SERVER SWAP] Radar data cleared - new server session started", "info")
+def filter_events(events, filter_name: str = "All", name: str = None, after_seq: int = 0,
+                  limit: int = None) -> list:
+    """Events newer than after_seq matching a panel filter and optionally involving a given name,
+    newest first and at most limit of them"""
+    tags = EVENT_FILTERS.get(filter_name)
+    found = []
+    for e in list(events):
+        if e.seq <= after_seq or (limit is not None and len(found) >= limit):
+            break
+        if (tags is None or e.tag in tags) and (name is None or name in e.names):
+            found.append(e)
+    return found
+
 # ---------------- HELPERS ----------------
-def add_event(text: str, tag: str = "info"):
-    state["events"].appendleft((text, tag))
 
-def is_valid_player_name(name: str) -> bool:
-    if not name:
-        return False
+def _check_player_name(name: str) -> bool:
     n = name.strip()
     if not n:
         return False
@@ -362,9 +1853,7 @@ def is_valid_player_name(name: str) -> bool:
     n_lower = n.lower()
     if n_lower.startswith("team_") or n_lower.startswith("srv_"):
         return False
-    if n_lower.startswith("ui_entity") or "ui_entity" in n_lower:
-        return False
-    if n_lower.startswith("pu_pilots") or "pu_pilots" in n_lower:
+    if "ui_entity" in n_lower or "pu_pilots" in n_lower:
         return False
     if "human-civilian-pilot" in n_lower or "civilian_pilot" in n_lower:
         return False
@@ -381,79 +1870,125 @@ def is_valid_player_name(name: str) -> bool:
             return False
     return True
 
+def _check_npc_name(name: str) -> bool:
+    if npc_name_re.search(name):
+        return True
+    if '_' in name:
+        last = name.rsplit('_', 1)[-1]
+        if last.isdigit() and len(last) >= 10:
+            return True
+    return False
+
+class NameClassifier:
+    """Bounded cache of per-name verdicts (valid player name, NPC, self).
+
+    A session only sees a few hundred distinct names but the handlers and the
+    player panel check them on every line and every UI tick. Call invalidate()
+    when the player name changes.
+    """
+    def __init__(self, maxsize: int = NAME_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, name: str) -> tuple:
+        entry = self.cache.get(name)
+        if entry is not None:
+            return entry
+        cache = self.cache
+        player_name = state.get("player_name") or ""
+        entry = (_check_player_name(name),
+                 _check_npc_name(name),
+                 bool(player_name) and name.strip().lower() == player_name.strip().lower())
+        with self.lock:
+            if cache is not self.cache:
+                # Invalidated while we were classifying, the verdict may be stale
+                return entry
+            if len(self.cache) >= self.maxsize:
+                # Oldest verdict first; dicts keep insertion order
+                self.cache.pop(next(iter(self.cache)), None)
+            self.cache[name] = entry
+        return entry
+
+    def invalidate(self):
+        with self.lock:
+            self.cache = {}
+
+name_classifier = NameClassifier()
+
+def is_valid_player_name(name: str) -> bool:
+    if not name:
+        return False
+    return name_classifier.lookup(name)[0]
+
 def is_npc_name(name: str) -> bool:
     if not name:
         return False
-    n = name.lower()
-    npc_patterns = [
-        'pu_human_enemy', 'npc_', '_npc_', 'groundcombat', 'contestedzones',
-        'ai_', '_ai_', 'bot_', '_bot_',
-    ]
-    for pattern in npc_patterns:
-        if pattern in n:
-            return True
-    if '_' in n:
-        parts = n.split('_')
-        if parts[-1].isdigit() and len(parts[-1]) >= 10:
-            return True
-    return False
+    return name_classifier.lookup(name)[1]
 
 def is_vehicle_zone(zone: str) -> bool:
-    z = zone.lower()
-    vehicle_indicators = ['_ship_', 'container', 'vehicle', 'hull_c', 'guardian', 'misc_', 'anvl_', 'orig_', 'aegs_', 'rsi_', 'crus_', 'drak_', 'argo_', 'mrai_']
-    return any(ind in z for ind in vehicle_indicators)
+    return bool(vehicle_zone_re.search(zone))
 
-def normalize_manager(raw: str, zone: str = "") -> str:
-    base = re.sub(r'_[0-9]+$', '', raw)
-    m = re.search(r'Dungeon_Entrance_?([A-F])', base, re.IGNORECASE)
+def _resolve_manager(raw: str, station: str) -> str:
+    base = manager_suffix_re.sub('', raw)
+    m = dungeon_entrance_re.search(base)
     if m:
         letter = m.group(1).upper()
         key = f"TransitManager_Dungeon_Entrance{letter}"
         return ManagerAlias.get(key, f"Dungeon Entrance {letter}")
-    m2 = re.search(r'Dungeon_Exit_?([A-F])', base, re.IGNORECASE)
+    m2 = dungeon_exit_re.search(base)
     if m2:
         letter = m2.group(1).upper()
         return f"Dungeon Exit {letter}"
-    m3 = re.search(r'Dungeon_Exfil_?([A-F])', base, re.IGNORECASE)
+    m3 = dungeon_exfil_re.search(base)
     if m3:
         letter = m3.group(1).upper()
         key = f"TransitManager_Dungeon_Exfil_{letter}"
         return ManagerAlias.get(key, f"Dungeon Exfil {letter}")
     alias = ManagerAlias.get(base, base)
-    alias = alias.replace("Station", state.get("current_station", "Station"))
+    alias = alias.replace("Station", station)
     return alias
 
-def classify_tag(raw_name: str) -> str:
+class ManagerAliasCache:
+    """Bounded cache of friendly manager names keyed by (raw manager, current station)"""
+    def __init__(self, maxsize: int = MANAGER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.cache = {}
+
+    def resolve(self, raw: str) -> str:
+        station = state.get("current_station", "Station")
+        key = (raw, station)
+        friendly = self.cache.get(key)
+        if friendly is None:
+            friendly = sys.intern(_resolve_manager(raw, station))
+            if len(self.cache) >= self.maxsize:
+                self.cache = {}
+            self.cache[key] = friendly
+        return friendly
+
+    def invalidate(self):
+        self.cache = {}
+
+manager_aliases = ManagerAliasCache()
+
+def normalize_manager(raw: str, zone: str = "") -> str:
+    return manager_aliases.resolve(raw)
+
+def classify_tag(raw_name: str) -> Tag:
     n = raw_name.lower()
     if 'exfil' in n or 'exit' in n:
-        return 'exit'
+        return Tag.EXIT
     if 'dungeon' in n:
-        return 'dungeon'
-    if 'transit' in n or 'hangar' in n or 'lobby' in n:
-        return 'transit'
-    return 'transit'
+        return Tag.DUNGEON
+    return Tag.TRANSIT
 
-def get_color_for_age(age: float, lifetime: float, is_newest: bool, tag: str, colors: dict) -> str:
+def get_color_for_age(age: float, lifetime: float, is_newest: bool, tag: Tag, colors: dict) -> str:
     """Enhanced color transition - each ping fades independently based on its own age"""
     if age <= PING_FLASH_WINDOW:
         return "#ffffff"
 
     alpha = max(0.0, 1.0 - (age / lifetime))
-
-    if tag == "npc_kill":
-        type_col = colors['npc_kill_fg']
-    elif tag == "player_kill":
-        type_col = colors['player_kill_fg']
-    elif tag == "dungeon":
-        type_col = colors['dungeon_fg']
-    elif tag == "vehicle":
-        type_col = colors.get('vehicle_fg', '#00ff00')
-    elif tag == "vehicle_potential":
-        type_col = colors.get('vehicle_potential_fg', '#ff0000')
-    elif tag == "vehicle_confirmed":
-        type_col = colors.get('vehicle_confirmed_fg', '#ffff00')
-    else:
-        type_col = colors['transit_fg']
+    type_col = colors[TAG_COLOR_KEYS[tag]]
 
     if alpha >= 0.5:
         blend_factor = (1.0 - alpha) / 0.5
@@ -469,6 +2004,29 @@ def interpolate_color(color1: str, color2: str, ratio: float) -> str:
     result = tuple(int(c1[i] + (c2[i] - c1[i]) * ratio) for i in range(3))
     return f"#{result[0]:02x}{result[1]:02x}{result[2]:02x}"
 
+def cluster_points(points, radius: float) -> list:
+    """Greedily group (x, y) points lying within radius of a cluster's first point, as lists of indices"""
+    seeds = {}  # grid cell -> indices of clusters seeded in it
+    clusters = []
+    r2 = radius * radius
+    for idx, (x, y) in enumerate(points):
+        cx, cy = int(x // radius), int(y // radius)
+        home = None
+        for cell in ((cx + i, cy + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+            for c in seeds.get(cell, ()):
+                sx, sy = points[clusters[c][0]]
+                if (x - sx) ** 2 + (y - sy) ** 2 <= r2:
+                    home = c
+                    break
+            if home is not None:
+                break
+        if home is None:
+            seeds.setdefault((cx, cy), []).append(len(clusters))
+            clusters.append([idx])
+        else:
+            clusters[home].append(idx)
+    return clusters
+
 def gray_hex_from_alpha(alpha: float) -> str:
     a = max(0.0, min(1.0, alpha))
     v = int(60 + (230 - 60) * a)
@@ -481,21 +2039,43 @@ def record_zone(zone_text: str, source: str = ""):
     if zm is None:
         return
     # Add to detected zones for export
-    state["detected_zones"].add(str(zone_text))
+    zone_text = sys.intern(str(zone_text))
+    state["detected_zones"].add(zone_text)
     try:
         latest = zm[0][2]
         if isinstance(latest, str) and latest.lower() == str(zone_text).lower():
             return
     except IndexError:
         pass
-    zm.appendleft((time.time(), source, str(zone_text)))
+    zm.appendleft((clock.now(), source, zone_text))
+
+def note_player(name: str, zone: str = None):
+    """Remember a detected player for the export, the registry and the rolling activity counters.
+    zone is where the line puts the player, if it says; your own station is no guide to theirs"""
+    now = clock.now()
+    state["player_names"].add(name)
+    state["activity"].player_seen(name, now)
+    player_registry.seen(name, now, zone)
+
+def note_outcome(kind: str, victim: str, event_ts, killer: str = None):
+    """Join an incap, corpse or death with the hits before it. An engagement goes to the events
+    feed once it has hits; its record holds the engagement, so a killer or hits a later outcome
+    adds show up wherever the record is formatted after that"""
+    eng = state["engagements"].outcome(kind, victim, clock.now(), killer)
+    if not eng.hits:
+        return
+    names = (victim, *eng.attackers())
+    if eng.record is None:
+        eng.record = log_event("engagement", event_ts, names, detail=eng)
+    else:
+        eng.record.names = names
+        eng.record.text = None
 
-def add_ping(friendly: str, ping: dict):
-    now = ping.get('ts', time.time())
-    lst = state.setdefault("pings", {}).setdefault(friendly, [])
-    lst.append(ping)
-    state["pings"][friendly] = lst
-    state["entities"][friendly] = {"pos": ping.get('pos', (0.0,0.0,0.0)), "type": ping.get('tag'), "last_seen": now}
+def add_ping(friendly: str, ping: Ping):
+    state["pings"].append(friendly, ping)
+    state["entities"][friendly] = Entity(ping.tag, ping.pos, ping.ts)
+    if api_hub and api_hub.active:
+        api_hub.publish("ping", {"manager": friendly, **ping.to_dict()})
 
 def play_dungeon_alert():
     if not winsound:
@@ -529,10 +2109,12 @@ def export_summary_to_file():
         existing_players_killed = set(existing_data.get("players_killed", []))
         existing_zones = set(existing_data.get("detected_zones", []))
 
-        current_transits = state.get("transit_locations", set())
-        current_players = state.get("player_names", set())
-        current_players_killed = state.get("players_killed", set())
-        current_zones = state.get("detected_zones", set())
+        player_registry.flush()
+
+        current_transits = state["transit_locations"].pending()
+        current_players = state["player_names"].pending()
+        current_players_killed = state["players_killed"].pending()
+        current_zones = state["detected_zones"].pending()
 
         all_transits = existing_transits.union(current_transits)
         all_players = existing_players.union(current_players)
@@ -549,12 +2131,25 @@ def export_summary_to_file():
             "unique_transits": sorted(list(all_transits)),
             "unique_players": sorted(list(all_players)),
             "players_killed": sorted(list(all_players_killed)),
+            "registered_players": player_registry.count(),
+            "recent_players": player_registry.recent(EXPORT_RECENT_PLAYERS),
             "detected_zones": sorted(list(all_zones)),
+            "recent_events": [event_to_dict(e) for e in filter_events(state["events"], limit=EXPORT_RECENT_EVENTS)],
+            "memory": memory_report(),
+            "sources": {name: src.to_dict() for name, src in list(log_sources.items())},
+            "sessions": [session.summary() for session in state.sessions()],
+            "recent_engagements": [eng.to_dict() for eng in list(state["engagements"].recent)[:EXPORT_RECENT_EVENTS]],
         }
 
         with open(EXPORT_LOG_PATH, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
 
+        heatmaps.save()
+        state["transit_locations"].flushed(current_transits)
+        state["player_names"].flushed(current_players)
+        state["players_killed"].flushed(current_players_killed)
+        state["detected_zones"].flushed(current_zones)
+
         current_time = time.time()
         if current_time - state.get("last_export_log", 0) > 300:
             add_event(f"[EXPORT] Data updated in {os.path.basename(EXPORT_LOG_PATH)}", "info")
@@ -562,6 +2157,44 @@ def export_summary_to_file():
     except Exception as e:
         add_event(f"[EXPORT ERROR] {e}", "info")
 
+def current_rss():
+    """Resident set size of this process in bytes, None where it can't be read"""
+    if psutil:
+        try:
+            return psutil.Process().memory_info().rss
+        except Exception:
+            pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def memory_report() -> dict:
+    """Sizes of the long-lived structures plus process RSS, for spotting growth"""
+    rss = current_rss()
+    return {
+        "rss_mb": round(rss / 1048576, 1) if rss else None,
+        "entities": len(state["entities"]),
+        "vehicles": len(state["vehicles"]),
+        "vehicle_hits": sum(len(v.history) for v in list(state["vehicles"].values())),
+        "pings": sum(len(buf) for _, buf in state["pings"].items()),
+        "ping_deadlines": len(state["pings"].deadlines),
+        "position_cells": len(state["position_grid"]),
+        "events": len(state["events"]),
+        "player_names": len(state["player_names"]),
+        "players_killed": len(state["players_killed"]),
+        "detected_zones": len(state["detected_zones"]),
+        "transit_locations": len(state["transit_locations"]),
+        "spawn_reset_cooldown": len(state["spawn_reset_cooldown"]),
+        "correlation_rings": len(state["engagements"]),
+        "name_cache": len(name_classifier.cache),
+        "manager_cache": len(manager_aliases.cache),
+        "line_queue": line_q.qsize(),
+        "archived_sessions": len(state.archive),
+        "registry_cache": len(player_registry.records) + len(player_registry.changed),
+    }
+
 def periodic_export_thread():
     while True:
         try:
@@ -570,758 +2203,1398 @@ def periodic_export_thread():
         except Exception:
             time.sleep(60)
 
-# ---------------- FILE TAILER ----------------
-def tail_file(path: str, out_q: queue.Queue):
+# ---------------- INGEST LAG ----------------
+def parse_log_timestamp(ts: str):
+    """Convert a Game.log <timestamp> to epoch seconds, None if it can't be parsed"""
     try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            f.seek(0, os.SEEK_END)
-            while True:
-                line = f.readline()
-                if not line:
-                    time.sleep(TAIL_SLEEP)
+        if ts.endswith("Z"):
+            ts = ts[:-1] + "+00:00"
+        dt = datetime.fromisoformat(ts)
+    except (ValueError, TypeError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+class IngestLagMonitor:
+    """Rolling lag from log timestamp to tailer read, parser done and first UI draw"""
+    STAGES = ("tail", "parse", "ui")
+
+    def __init__(self, window: int = LAG_SAMPLE_WINDOW):
+        self.lock = threading.Lock()
+        self.samples = {stage: collections.deque(maxlen=window) for stage in self.STAGES}
+        self.queue_depth = collections.deque(maxlen=window)
+        self.pending_ui = collections.deque(maxlen=window)
+        self.current = None  # (log_ts, read_ts) of the line being parsed
+        self.current_has_event = False
+
+    def begin_line(self, log_ts, read_ts: float, depth: int):
+        """Called by the parser when it dequeues a line"""
+        with self.lock:
+            self.queue_depth.append(depth)
+            if log_ts is None:
+                self.current = None
+                return
+            self.current = (log_ts, read_ts)
+            self.current_has_event = False
+            self.samples["tail"].append(read_ts - log_ts)
+
+    def end_line(self):
+        """Called by the parser before it waits for the next line"""
+        with self.lock:
+            if self.current is None:
+                return
+            self.samples["parse"].append(time.time() - self.current[0])
+            self.current = None
+
+    def note_event(self):
+        """The current line produced an event, so its UI lag is worth measuring"""
+        with self.lock:
+            if self.current is None or self.current_has_event:
+                return
+            self.current_has_event = True
+            self.pending_ui.append(self.current[0])
+
+    def mark_drawn(self, draw_ts: float):
+        with self.lock:
+            while self.pending_ui:
+                self.samples["ui"].append(draw_ts - self.pending_ui.popleft())
+
+    def summary(self) -> dict:
+        with self.lock:
+            result = {}
+            for stage, values in self.samples.items():
+                if not values:
+                    result[stage] = None
                     continue
-                out_q.put(line.rstrip("\n"))
-    except Exception as e:
-        out_q.put(f"[ERROR] Tail thread stopped: {e}")
+                ordered = sorted(values)
+                result[stage] = (ordered[len(ordered) // 2],
+                                 ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                                 ordered[-1])
+            depth = list(self.queue_depth)
+            result["queue"] = (depth[-1] if depth else 0, max(depth) if depth else 0)
+            return result
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        parts = []
+        for stage in self.STAGES:
+            values = summary[stage]
+            if values is None:
+                parts.append(f"{stage} -")
+            else:
+                p50, p95, worst = (int(v * 1000) for v in values)
+                parts.append(f"{stage} {p50}/{p95}/{worst}")
+        current, peak = summary["queue"]
+        return f"Lag ms p50/p95/max: {' | '.join(parts)} | queue {current} (max {peak})"
+
+ingest_lag = IngestLagMonitor()
+
+# ---------------- LOG SOURCES ----------------
+class LogSource:
+    """One Game.log being tailed or replayed, with its read position and counters"""
+    __slots__ = ("name", "path", "replay", "position", "lines", "skipped", "bytes", "rotations",
+                 "status", "started", "last_line_ts")
+
+    def __init__(self, name: str, path: str, replay: bool = False):
+        self.name = name
+        self.path = path
+        self.replay = replay
+        self.position = 0
+        self.lines = 0
+        self.skipped = 0  # Lines no handler wants, dropped before decoding
+        self.bytes = 0
+        self.rotations = 0
+        self.status = "waiting"
+        self.started = time.time()
+        self.last_line_ts = None
+
+    def to_dict(self) -> dict:
+        elapsed = max(time.time() - self.started, 1e-6)
+        return {
+            "path": self.path,
+            "status": self.status,
+            "position": self.position,
+            "lines": self.lines,
+            "skipped": self.skipped,
+            "bytes": self.bytes,
+            "lines_per_sec": round(self.lines / elapsed, 1),
+            "rotations": self.rotations,
+        }
 
-# ---------------- PARSER ----------------
-def parser_loop(in_q: queue.Queue, state: dict):
-    recent_lines = collections.deque(maxlen=400)
-    while True:
-        raw = in_q.get()
-        if raw is None:
-            time.sleep(0.05)
-            continue
+log_sources = {}  # name -> LogSource, in the order given on the command line
 
-        if state["player_id"] is None:
-            pid_m = player_id_re.search(raw)
-            if pid_m:
-                player_id = pid_m.group(1)
-                player_name = pid_m.group(2)
-                if player_name == state.get("player_name") or state.get("player_name") == "Unknown":
-                    state["player_id"] = player_id
-                    add_event(f"[SYSTEM] Player ID detected: {player_id}", "info")
-
-            geid_m = player_geid_re.search(raw)
-            if geid_m:
-                potential_geid = geid_m.group(1)
-                # Check if this line also contains our player name
-                if state.get("player_name") != "Unknown" and state["player_name"] in raw:
-                    state["player_id"] = potential_geid
-                    add_event(f"[SYSTEM] Player GEID detected: {potential_geid}", "info")
-                elif state["player_id"] is None:
-                    state["player_id"] = potential_geid
-
-        login_m = login_pattern_re.search(raw)
-        if login_m:
-            detected_name = login_m.group(1)
-            if state["player_name"] == "Unknown" or state["player_name"] != detected_name:
-                state["player_name"] = detected_name
-                global PLAYER_NAME
-                PLAYER_NAME = detected_name
-                add_event(f"[SYSTEM] Player detected: {detected_name}", "you")
-
-        version_m = version_pattern_re.search(raw)
-        if version_m:
-            version_num = version_m.group(1)
-            if len(version_num) == 3:
-                detected_version = f"{version_num[0]}.{version_num[1:]}"
-            else:
-                detected_version = version_num
-            if state["game_version"] == "Unknown" or state["game_version"] != detected_version:
-                state["game_version"] = detected_version
-                global GAME_VERSION
-                GAME_VERSION = detected_version
-                add_event(f"[SYSTEM] Game version detected: {detected_version}", "info")
-
-        ts_m = timestamp_re.search(raw)
-        ts = ts_m.group(1) if ts_m else datetime.now(timezone.utc).isoformat()
-        short_ts = ts.split('T')[1][:8] if 'T' in ts else ts
-        recent_lines.append(raw)
-
-        # ========== SERVER SWAP DETECTION ==========
-        if spawned_re.search(raw):
-            state["pending_server_swap"] = True
-            state["server_swap_time"] = time.time()
-
-        frontend_m = frontend_closed_re.search(raw)
-        if frontend_m and state.get("pending_server_swap"):
-            # Check if this happened within 10 seconds of the spawn
-            if time.time() - state.get("server_swap_time", 0) < 10:
-                load_time = frontend_m.group(1)
-                add_event(f"[SERVER SWAP] Detected server change (loaded in {load_time}s) - clearing radar data", "info")
-                clear_radar_data()
-                state["pending_server_swap"] = False
-
-        # ========== SPAWN RESET DETECTION ==========
-        spawn_reset_m = spawn_reset_re.search(raw)
-        if spawn_reset_m:
-            name = spawn_reset_m.group(1).strip()
-            player_id = spawn_reset_m.group(2)
-
-            # Skip if this is your own player ID/GEID
-            if player_id == state.get("player_id") or is_self(name):
-                continue
+def channel_log_path(channel: str) -> str:
+    """Game.log path of another install channel (PTU, EPTU, ...) next to the LIVE one"""
+    return os.path.join(os.path.dirname(os.path.dirname(LOG_PATH)), channel, "Game.log")
 
-            if is_valid_player_name(name):
-                # Extract spawnpoint info from the full line
-                spawnpoint_match = re.search(r'spawnpoint\s+([^\[]+)', raw, re.IGNORECASE)
-                if spawnpoint_match:
-                    spawnpoint_name = spawnpoint_match.group(1).strip()
+def parse_source_spec(spec: str) -> LogSource:
+    """NAME or NAME=PATH from --source; a bare channel name resolves next to LIVE"""
+    name, sep, path = spec.partition("=")
+    name = name.strip().upper()
+    return LogSource(name, path.strip() if sep else channel_log_path(name))
 
-                    # Check if this is actually a spawn reset (not just "Unknown")
-                    spawn_indicators = ['bed', 'hab', 'medbay', 'medical', 'spawnpoint', 'clinic']
-                    is_actual_reset = any(indicator in spawnpoint_name.lower() for indicator in spawn_indicators)
+async def _enqueue(out_q, item, shed: bool = True):
+    if out_q.qsize() >= out_q.maxsize:
+        # A full queue may block high-value lines (every line when not shedding); wait for room off the event loop
+        await asyncio.get_event_loop().run_in_executor(None, lambda: out_q.put(item, shed=shed))
+    else:
+        out_q.put(item, shed=shed)
+
+# Leading bytes of the archive formats a replayed log may be stored in
+LOG_ARCHIVE_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
 
-                    # Skip if it's just "Unknown" spawnpoint
-                    if spawnpoint_name.lower() == "unknown":
+def log_format(path: str) -> str:
+    """'gzip', 'xz', 'zstd' or 'plain', from the file's first bytes rather than its name"""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, fmt in LOG_ARCHIVE_MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return "plain"
+
+def open_log(path: str):
+    """Open a log for binary reads, decompressing gzip/xz/zstd archives as a stream (no temporary file)"""
+    fmt = log_format(path)
+    if fmt == "gzip":
+        return gzip.open(path, "rb")
+    if fmt == "xz":
+        return lzma.open(path, "rb")
+    if fmt == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{os.path.basename(path)} is zstd compressed; install zstandard to replay it")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+    return open(path, "rb")
+
+def split_lines(pending: bytes, chunk: bytes):
+    """Complete lines of pending + chunk and the partial line left after the last newline"""
+    lines = (pending + chunk).split(b"\n")
+    return lines, lines.pop()
+
+def wanted_lines(src: LogSource, lines):
+    """Decode the raw lines some handler could want; the rest are only counted"""
+    for raw in lines:
+        src.lines += 1
+        if detection_rules.compiled.marker_bytes_re.search(raw.lower()) is None:
+            src.skipped += 1
+            continue
+        yield raw.decode("utf-8", errors="ignore").rstrip("\r")
+
+async def tail_source(src: LogSource, out_q):
+    """Follow src from its current end, reopening it when the game truncates or recreates it"""
+    pending = b""
+    f = None
+    waited = False  # A log that appears after we started is read from its first line
+    try:
+        while True:
+            if f is None:
+                if not os.path.exists(src.path):
+                    src.status = "waiting"
+                    waited = True
+                    await asyncio.sleep(SOURCE_RETRY_SLEEP)
+                    continue
+                f = open(src.path, "rb")
+                if not waited:
+                    f.seek(0, os.SEEK_END)
+                src.position = f.tell()
+                src.status = "tailing"
+            chunk = f.read(TAIL_READ_SIZE)
+            if not chunk:
+                try:
+                    size = os.path.getsize(src.path)
+                except OSError:
+                    size = None
+                if size is None or size < src.position:
+                    # New game session: the log was recreated, start again from its top
+                    f.close()
+                    f = open(src.path, "rb") if size is not None else None
+                    src.position = 0
+                    src.rotations += 1
+                    pending = b""
+                    if f is None:
+                        waited = True
                         continue
+                await asyncio.sleep(TAIL_SLEEP)
+                continue
+            src.position += len(chunk)
+            src.bytes += len(chunk)
+            # A partial last line means the game is mid-write; it waits in pending for the rest
+            lines, pending = split_lines(pending, chunk)
+            for line in wanted_lines(src, lines):
+                src.last_line_ts = time.time()
+                await _enqueue(out_q, (line, src.last_line_ts, src.name))
+    except Exception as e:
+        src.status = "error"
+        out_q.put((f"[ERROR] Tailing {src.name} stopped: {e}", time.time(), src.name))
+    finally:
+        if f is not None:
+            f.close()
+
+async def replay_source(src: LogSource, out_q, speed: float = REPLAY_SPEED):
+    """Feed a recorded Game.log (plain or compressed) into the parser, paced by its own timestamps
+    (speed 0 = as fast as possible)"""
+    try:
+        src.status = "replaying"
+        with open_log(src.path) as f:
+            prev_log_ts = None
+            pending = b""
+            while True:
+                chunk = f.read(TAIL_READ_SIZE)
+                src.position += len(chunk)  # Offset in the decompressed log
+                src.bytes += len(chunk)
+                if chunk:
+                    lines, pending = split_lines(pending, chunk)
+                else:
+                    lines, pending = [pending] if pending else [], b""
+                for line in wanted_lines(src, lines):
+                    # Skipped lines don't pace; their gaps add up into the next kept line's wait
+                    ts_m = timestamp_re.search(line)
+                    log_ts = parse_log_timestamp(ts_m.group(1)) if ts_m else None
+                    if speed > 0 and log_ts is not None:
+                        if prev_log_ts is not None and log_ts > prev_log_ts:
+                            await asyncio.sleep(min(REPLAY_MAX_IDLE, (log_ts - prev_log_ts) / speed))
+                        prev_log_ts = log_ts
+                    src.last_line_ts = time.time()
+                    await _enqueue(out_q, (line, src.last_line_ts, src.name), shed=False)
+                if not chunk:
+                    break
+        src.status = "finished"
+        out_q.put((f"[REPLAY] Finished replaying {os.path.basename(src.path)}", time.time(), src.name))
+    except Exception as e:
+        src.status = "error"
+        out_q.put((f"[ERROR] Replay of {src.name} stopped: {e}", time.time(), src.name))
+
+async def _ingest(sources, out_q, speed: float):
+    await asyncio.gather(*(replay_source(src, out_q, speed) if src.replay else tail_source(src, out_q)
+                           for src in sources))
+
+def run_sources(sources, out_q, speed: float = REPLAY_SPEED):
+    """Thread entry point: tail or replay every source concurrently on one asyncio loop"""
+    for src in sources:
+        log_sources[src.name] = src
+    asyncio.run(_ingest(sources, out_q, speed))
+
+def status_summary() -> str:
+    """Text of the lag line under the radar: lag, shedding and, with several logs, each source"""
+    text = f"{ingest_lag.format_summary()} | {line_q.drop_summary()}"
+    if len(log_sources) > 1:
+        text += " | " + ", ".join(f"{src.name} {src.status} {src.lines}" for src in log_sources.values())
+    return text
+
+# ---------------- DETECTION RULES ----------------
+class LineContext:
+    """A parsed line as the rule handlers see it, plus what earlier rules noted about it"""
+    __slots__ = ("raw", "event_ts", "recent_lines", "death_matched", "killed", "vehicle_matched")
+
+    def __init__(self, raw: str, event_ts: float, recent_lines):
+        self.raw = raw
+        self.event_ts = event_ts
+        self.recent_lines = recent_lines
+        self.death_matched = False
+        self.killed = False
+        self.vehicle_matched = False
+
+class DetectionRule:
+    """One detection: the handler for a pattern's match, tried only on lines containing one of its literals.
+
+    literals are lowered substrings at least one of which is in every line the pattern can match.
+    A rule without a pattern gets None and does its own matching. Rules run by ascending priority;
+    a handler returning True ends the line there, so later rules and the stale-entity sweep skip it.
+    """
+    __slots__ = ("name", "literals", "pattern", "handler", "priority", "origin")
+
+    def __init__(self, name: str, literals: tuple, pattern, handler, priority: int, origin: str = "builtin"):
+        self.name = name
+        self.literals = tuple(literals)
+        self.pattern = pattern
+        self.handler = handler
+        self.priority = priority
+        self.origin = origin
+
+class RuleMatcher:
+    """A rule table compiled into one literal scan plus the patterns of the rules it selects.
+
+    The scan is a lookahead alternation over every literal, longest first, so it reports the
+    longest literal starting at each position of the lowered line. Any shorter literal starting
+    there is a prefix of it, so each literal also stands for the rules of its prefixes.
+    """
+    def __init__(self, rules):
+        self.rules = sorted(rules, key=lambda rule: rule.priority)
+        literals = sorted({lit for rule in self.rules for lit in rule.literals}, key=len, reverse=True)
+        self.by_literal = {lit: frozenset(i for i, rule in enumerate(self.rules)
+                                          if any(lit.startswith(own) for own in rule.literals))
+                           for lit in literals}
+        self.literal_re = re.compile("(?=(" + "|".join(map(re.escape, literals)) + "))" if literals else "(?!)")
+        # The same literals, plus the look-back context, are the prefilter for whole lines
+        markers = literals + [m.lower() for m in CONTEXT_MARKERS]
+        self.marker_re = re.compile("|".join(map(re.escape, markers)), re.IGNORECASE)
+        # and for raw log bytes, matched against bytes.lower() (ASCII is all the markers need);
+        # a case-sensitive alternation over lowered bytes is several times faster than an IGNORECASE one
+        self.marker_bytes_re = re.compile(b"|".join(re.escape(m.encode()) for m in markers))
+
+    def dispatch(self, ctx: LineContext) -> bool:
+        """Run the rules whose literals are in the line, in priority order; True once one ends it"""
+        found = set(self.literal_re.findall(ctx.raw.lower()))
+        if not found:
+            return False
+        for i in sorted(frozenset().union(*(self.by_literal[lit] for lit in found))):
+            rule = self.rules[i]
+            m = None
+            if rule.pattern is not None:
+                m = rule.pattern.search(ctx.raw)
+                if m is None:
+                    continue
+            if rule.handler(m, ctx):
+                return True
+        return False
 
-                    if is_actual_reset:
-                        now = time.time()
-
-                        last_reset = state["spawn_reset_cooldown"].get(name, 0)
-                        if now - last_reset < 10:
-                            continue
-
-                        state["spawn_reset_cooldown"][name] = now
-
-                        ent = state["entities"].get(name, {"type":"player", "status":"alive"})
-                        ent.update({
-                            "spawn_reset": True,
-                            "spawn_reset_ts": now,
-                            "last_seen": now
-                        })
-                        state["entities"][name] = ent
-                        state["player_names"].add(name)
-                        add_event(f"{short_ts} [SPAWN RESET] {name} reset their spawn at {spawnpoint_name}", "player")
-
-        # ========== VEHICLE DETECTION ==========
-        setup_envelope_m = setup_envelope_re.search(raw)
-        if setup_envelope_m:
-            vehicle_name = setup_envelope_m.group(1).strip()
-            vehicle_id = setup_envelope_m.group(2).strip()
-            now = time.time()
-
-            # Store this as a pending vehicle with name
-            state["pending_vehicle"] = {
-                "ts": now,
-                "confirmed": False,
-                "name": vehicle_name,
-                "id": vehicle_id,
-                "from_envelope": True
-            }
+def _on_identity(m, ctx):
+    if state["player_id"] is not None:
+        return
+    pid_m = player_id_re.search(ctx.raw)
+    if pid_m:
+        player_id = pid_m.group(1)
+        player_name = pid_m.group(2)
+        if player_name == state.get("player_name") or state.get("player_name") == "Unknown":
+            state["player_id"] = player_id
+            add_event(f"[SYSTEM] Player ID detected: {player_id}", "info")
+
+    geid_m = player_geid_re.search(ctx.raw)
+    if geid_m:
+        potential_geid = geid_m.group(1)
+        # Check if this line also contains our player name
+        if state.get("player_name") != "Unknown" and state["player_name"] in ctx.raw:
+            state["player_id"] = potential_geid
+            add_event(f"[SYSTEM] Player GEID detected: {potential_geid}", "info")
+        elif state["player_id"] is None:
+            state["player_id"] = potential_geid
+
+def _on_login(login_m, ctx):
+    detected_name = login_m.group(1)
+    if state["player_name"] == "Unknown" or state["player_name"] != detected_name:
+        set_player_name(detected_name)
+        add_event(f"[SYSTEM] Player detected: {detected_name}", "you")
+
+def _on_version(version_m, ctx):
+    global GAME_VERSION
+    version_num = version_m.group(1)
+    if len(version_num) == 3:
+        detected_version = f"{version_num[0]}.{version_num[1:]}"
+    else:
+        detected_version = version_num
+    if state["game_version"] == "Unknown" or state["game_version"] != detected_version:
+        state["game_version"] = detected_version
+        GAME_VERSION = detected_version
+        add_event(f"[SYSTEM] Game version detected: {detected_version}", "info")
+
+def _on_spawned(m, ctx):
+    state["pending_server_swap"] = True
+    state["server_swap_time"] = clock.now()
+
+def _on_frontend_closed(frontend_m, ctx):
+    # Check if this happened within 10 seconds of the spawn
+    if state.get("pending_server_swap") and clock.now() - state.get("server_swap_time", 0) < 10:
+        load_time = frontend_m.group(1)
+        add_event(f"[SERVER SWAP] Detected server change (loaded in {load_time}s) - clearing radar data", "info")
+        clear_radar_data()
+        state["pending_server_swap"] = False
+
+def _on_spawn_reset(spawn_reset_m, ctx):
+    name = sys.intern(spawn_reset_m.group(1).strip())
+    player_id = spawn_reset_m.group(2)
+
+    # Skip if this is your own player ID/GEID
+    if player_id == state.get("player_id") or is_self(name):
+        return True
+
+    if is_valid_player_name(name):
+        # Extract spawnpoint info from the full line
+        spawnpoint_match = re.search(r'spawnpoint\s+([^\[]+)', ctx.raw, re.IGNORECASE)
+        if spawnpoint_match:
+            spawnpoint_name = spawnpoint_match.group(1).strip()
+
+            # Check if this is actually a spawn reset (not just "Unknown")
+            spawn_indicators = ['bed', 'hab', 'medbay', 'medical', 'spawnpoint', 'clinic']
+            is_actual_reset = any(indicator in spawnpoint_name.lower() for indicator in spawn_indicators)
+
+            # Skip if it's just "Unknown" spawnpoint
+            if spawnpoint_name.lower() == "unknown":
+                return True
+
+            if is_actual_reset:
+                now = clock.now()
+
+                last_reset = state["spawn_reset_cooldown"].get(name, 0)
+                if now - last_reset < SPAWN_RESET_COOLDOWN:
+                    return True
+
+                state["spawn_reset_cooldown"][name] = now
+
+                ent = state["entities"].get(name) or Entity()
+                ent.spawn_reset_ts = now
+                ent.last_seen = now
+                state["entities"][name] = ent
+                note_player(name)
+                log_event("spawn_reset", ctx.event_ts, (name,), detail=spawnpoint_name)
+
+def _on_setup_envelope(setup_envelope_m, ctx):
+    vehicle_name = sys.intern(setup_envelope_m.group(1).strip())
+    vehicle_id = setup_envelope_m.group(2).strip()
+    now = clock.now()
+
+    # Store this as a pending vehicle with name
+    state["pending_vehicle"] = {
+        "ts": now,
+        "confirmed": False,
+        "name": vehicle_name,
+        "id": vehicle_id,
+        "from_envelope": True
+    }
 
-        if fuel_controller_lambda_re.search(raw):
-            now = time.time()
-
-            # Check if we have a pending vehicle from setup envelope (within 5 seconds)
-            pending = state.get("pending_vehicle")
-            if pending and pending.get("from_envelope") and (now - pending.get("ts", 0) < 5):
-                # We have a named vehicle from setup envelope
-                vehicle_name = pending.get("name", "Unknown Vehicle")
-                vehicle_name_short = vehicle_name.split('_')[0] if '_' in vehicle_name else vehicle_name
-
-                ping = {
-                    "ts": now,
-                    "pos": (0.0, 0.0, 0.0),
-                    "zone": state.get("current_station", "Unknown"),
-                    "action": "DETECTED",
-                    "tag": "vehicle_potential",
-                    "fresh": True,
-                    "overlay": True,
-                    "overlay_anchor": "bottom_left",
-                    "vehicle_name": vehicle_name
-                }
-                add_ping(f"Vehicle: {vehicle_name_short}", ping)
-                add_event(f"{short_ts} [VEHICLE] {vehicle_name_short} detected nearby", "vehicle")
-            else:
-                # Unknown vehicle
-                state["pending_vehicle"] = {"ts": now, "confirmed": False}
-
-                ping = {
-                    "ts": now,
-                    "pos": (0.0, 0.0, 0.0),
-                    "zone": state.get("current_station", "Unknown"),
-                    "action": "DETECTED",
-                    "tag": "vehicle_potential",
-                    "fresh": True,
-                    "overlay": True,
-                    "overlay_anchor": "bottom_left"
-                }
-                add_ping("Vehicle?", ping)
+def _on_fuel_controller(m, ctx):
+    now = clock.now()
 
-            _cleanup_pings(state)
+    # Check if we have a pending vehicle from setup envelope (within 5 seconds)
+    pending = state.get("pending_vehicle")
+    if pending and pending.get("from_envelope") and (now - pending.get("ts", 0) < 5):
+        # We have a named vehicle from setup envelope
+        vehicle_name = pending.get("name", "Unknown Vehicle")
+        vehicle_name_short = vehicle_name.split('_')[0] if '_' in vehicle_name else vehicle_name
 
-        if fuel_controller_confirm_re.search(raw):
-            if state.get("pending_vehicle") and not state["pending_vehicle"].get("confirmed"):
-                state["pending_vehicle"]["confirmed"] = True
-                vehicle_name = state["pending_vehicle"].get("name")
-
-                if vehicle_name:
-                    # Update named vehicle ping
-                    vehicle_name_short = vehicle_name.split('_')[0] if '_' in vehicle_name else vehicle_name
-                    if f"Vehicle: {vehicle_name_short}" in state["pings"]:
-                        for ping in state["pings"][f"Vehicle: {vehicle_name_short}"]:
-                            ping["action"] = "CONFIRMED"
-                            ping["tag"] = "vehicle_confirmed"
-                else:
-                    # Update unknown vehicle ping
-                    if "Vehicle?" in state["pings"]:
-                        for ping in state["pings"]["Vehicle?"]:
-                            ping["action"] = "CONFIRMED"
-                            ping["tag"] = "vehicle_confirmed"
-
-        vd_m = vehicle_destruction_re.search(raw)
-        if vd_m:
-            vehicle_name, vehicle_id, zone, pos_x, pos_y, pos_z, driver, level_from, level_to, caused_by, damage_type = vd_m.groups()
-            now = time.time()
-            pos = (float(pos_x), float(pos_y), float(pos_z))
-
-            # Record the zone
-            record_zone(zone, 'vehicle_destruction')
-
-            if caused_by and is_valid_player_name(caused_by) and not is_self(caused_by):
-                if caused_by not in state["entities"] or state["entities"].get(caused_by, {}).get("type") != "player":
-                    state["entities"][caused_by] = {
-                        "type": "player",
-                        "status": "alive",
-                        "last_seen": now,
-                        "pos": pos
-                    }
-                    state["player_names"].add(caused_by)
-                    add_event(f"{short_ts} [PLAYER] {caused_by} detected (vehicle destruction)", "player")
-                else:
-                    state["entities"][caused_by]["last_seen"] = now
-                    state["entities"][caused_by]["pos"] = pos
-
-            vid = vehicle_id
-            state_names = {0: "Alive", 1: "Softed", 2: "FullDead"}
-
-            if vid not in state["vehicles"]:
-                state["vehicles"][vid] = {
-                    "name": vehicle_name,
-                    "state": int(level_from),
-                    "pos": pos,
-                    "zone": zone,
-                    "driver": driver,
-                    "last_update": now,
-                    "history": []
-                }
-
-            vehicle = state["vehicles"][vid]
-            vehicle["state"] = int(level_to)
-            vehicle["pos"] = pos
-            vehicle["zone"] = zone
-            vehicle["last_update"] = now
-            vehicle["history"].append({
-                "from": int(level_from),
-                "to": int(level_to),
-                "attacker": caused_by,
-                "ts": now
-            })
-
-            ping = {
-                "ts": now,
-                "pos": pos,
-                "zone": zone,
-                "action": f"{state_names[int(level_from)]}→{state_names[int(level_to)]}",
-                "tag": "vehicle",
-                "fresh": True,
-                "vehicle_name": vehicle_name,
-                "attacker": caused_by,
-                "overlay": True,
-                "overlay_anchor": "top_right"
-            }
+        ping = Ping(now, (0.0, 0.0, 0.0), state.get("current_station", "Unknown"), "DETECTED",
+                    Tag.VEHICLE_POTENTIAL, anchor=Anchor.BOTTOM_LEFT, vehicle_name=vehicle_name)
+        add_ping(f"Vehicle: {vehicle_name_short}", ping)
+        log_event("vehicle_detected", ctx.event_ts, (vehicle_name_short,))
+    else:
+        # Unknown vehicle
+        state["pending_vehicle"] = {"ts": now, "confirmed": False}
+
+        ping = Ping(now, (0.0, 0.0, 0.0), state.get("current_station", "Unknown"), "DETECTED",
+                    Tag.VEHICLE_POTENTIAL, anchor=Anchor.BOTTOM_LEFT)
+        add_ping("Vehicle?", ping)
+
+    _cleanup_pings(state)
+
+def _on_fuel_confirm(m, ctx):
+    if state.get("pending_vehicle") and not state["pending_vehicle"].get("confirmed"):
+        state["pending_vehicle"]["confirmed"] = True
+        vehicle_name = state["pending_vehicle"].get("name")
+
+        if vehicle_name:
+            # Update named vehicle ping
+            vehicle_name_short = vehicle_name.split('_')[0] if '_' in vehicle_name else vehicle_name
+            if f"Vehicle: {vehicle_name_short}" in state["pings"]:
+                for ping in state["pings"][f"Vehicle: {vehicle_name_short}"]:
+                    ping.action = "CONFIRMED"
+                    ping.tag = Tag.VEHICLE_CONFIRMED
+        else:
+            # Update unknown vehicle ping
+            if "Vehicle?" in state["pings"]:
+                for ping in state["pings"]["Vehicle?"]:
+                    ping.action = "CONFIRMED"
+                    ping.tag = Tag.VEHICLE_CONFIRMED
+
+def _on_vehicle_destruction(vd_m, ctx):
+    vehicle_name, vehicle_id, zone, pos_x, pos_y, pos_z, driver, level_from, level_to, caused_by, damage_type = vd_m.groups()
+    now = clock.now()
+    pos = (float(pos_x), float(pos_y), float(pos_z))
+
+    # Record the zone
+    record_zone(zone, 'vehicle_destruction')
+
+    if caused_by and is_valid_player_name(caused_by) and not is_self(caused_by):
+        attacker_ent = state["entities"].get(caused_by)
+        if attacker_ent is None or attacker_ent.type != Tag.PLAYER:
+            state["entities"][caused_by] = Entity(Tag.PLAYER, pos, now)
+            note_player(caused_by, zone)
+            log_event("vehicle_attacker", ctx.event_ts, (caused_by,), zone=zone, pos=pos)
+        else:
+            attacker_ent.last_seen = now
+            attacker_ent.pos = pos
+
+    vid = vehicle_id
+    level_from, level_to = int(level_from), int(level_to)
+
+    vehicle = state["vehicles"].get(vid)
+    if vehicle is None:
+        vehicle = state["vehicles"][vid] = Vehicle(vehicle_name, level_from, pos, zone, driver, now)
+
+    vehicle.state = level_to
+    vehicle.pos = pos
+    vehicle.zone = zone
+    vehicle.last_update = now
+    vehicle.history.append(VehicleHit(level_from, level_to, caused_by, now))
+
+    ping = Ping(now, pos, zone, f"{VEHICLE_STATE_NAMES[level_from]}→{VEHICLE_STATE_NAMES[level_to]}",
+                Tag.VEHICLE, anchor=Anchor.TOP_RIGHT, vehicle_name=vehicle_name, attacker=caused_by)
+
+    friendly = f"Vehicle: {vehicle_name.split('_')[0]}"
+    add_ping(friendly, ping)
+    log_event("vehicle_destroyed", ctx.event_ts, (vehicle_name, caused_by), zone=zone, pos=pos,
+              detail=(VEHICLE_STATE_NAMES[level_to], level_from, level_to))
+    _cleanup_pings(state)
+
+def _on_vehicle_control(vc_m, ctx):
+    """Both the control request and the grant; a line with both is one vehicle change"""
+    if ctx.vehicle_matched:
+        return
+    ctx.vehicle_matched = True
+    client_id, vehicle_name, vehicle_id = vc_m.groups()
+    state["current_vehicle"] = vehicle_name
+    log_event("my_vehicle", ctx.event_ts, (vehicle_name,))
+
+def _on_location(loc_m, ctx):
+    loc_raw = loc_m.group(1).lower()
+    base_loc = loc_raw.replace("@pyro_", "").replace("@", "").replace("_", "")
+    station_name = base_loc.title()
+    record_zone(station_name, 'station')
+    if station_name != state.get("current_station"):
+        state["current_station"] = station_name
+        manager_aliases.invalidate()
+        log_event("location", ctx.event_ts, zone=station_name)
+
+def _on_door(door_m, ctx):
+    door_name = door_m.group(1).strip()
+    door_state = door_m.group(2).strip()
+    now_ts = clock.now()
+    if 'Hangar' in door_name or 'HangarDoor' in door_name:
+        friendly = normalize_manager('TransitManager_Hangar-to-Lobby')
+        overlay_anchor = Anchor.BOTTOM_RIGHT
+    elif 'Lobby' in door_name or 'LobbyDoor' in door_name:
+        friendly = normalize_manager('TransitManager-001')
+        overlay_anchor = Anchor.NONE
+    else:
+        friendly = door_name
+        overlay_anchor = Anchor.NONE
+    ping = Ping(now_ts, (0.0, 0.0, 0.0), state.get("current_station", "Station"), door_state.upper(),
+                Tag.TRANSIT, anchor=overlay_anchor)
+    add_ping(friendly, ping)
+    log_event("door", ctx.event_ts, (friendly,), zone=ping.zone, detail=door_state)
+    _cleanup_pings(state)
+
+def _on_carriage(m, ctx):
+    car_no, car_id, manager_raw, action, zone = m.group(1,2,3,4,5)
+    zone = sys.intern(zone)
+    x, y, z = map(float, (m.group(6), m.group(7), m.group(8)))
+    friendly = normalize_manager(manager_raw, zone)
+    state["transit_locations"].add(friendly)
+    record_zone(zone, 'transit')
+    tag = classify_tag(manager_raw)
+    action_label = "START" if "start" in action.lower() else "FINISH"
+    now_ts = clock.now()
+    ping = Ping(now_ts, (x, y, z), zone, action_label, tag,
+                anchor=Anchor.BOTTOM_RIGHT if tag == Tag.EXIT else Anchor.NONE,
+                carriage=car_no, carriage_id=car_id)
+    matches = state["sightings"].candidates(now_ts, ping.pos)
+    if matches:
+        player, seen_ts = matches[0]
+        state["sightings"].claim(player, seen_ts)
+        ping.player_name = player
+        ping.candidates = tuple(other for other, _ in matches[1:])
+    add_ping(friendly, ping)
+    ping_type = "DUNGEON" if tag == Tag.DUNGEON else "EXIT" if tag == Tag.EXIT else "TRANSIT"
+    log_event("dungeon_transit" if tag == Tag.DUNGEON else "transit", ctx.event_ts,
+              (friendly, ping.player_name, *ping.candidates), zone=zone, pos=ping.pos, detail=(ping_type, action_label))
+    if tag == Tag.DUNGEON and action_label == "START":
+        state["activity"].dungeon_start(friendly, now_ts)
+    if tag == Tag.DUNGEON and state.get("sound_enabled") and (now_ts - state.get("last_sound_ts",0) > SOUND_COOLDOWN):
+        play_dungeon_alert()
+        state["last_sound_ts"] = now_ts
+        log_event("sound", ctx.event_ts, (friendly,))
+    _cleanup_pings(state)
+    return True
 
-            friendly = f"Vehicle: {vehicle_name.split('_')[0]}"
-            add_ping(friendly, ping)
-            add_event(f"{short_ts} [VEHICLE {state_names[int(level_to)]}] {vehicle_name} destroyed by {caused_by} ({level_from}→{level_to})", "vehicle")
-            _cleanup_pings(state)
+def _on_nickname(nm, ctx):
+    name = sys.intern(nm.group(1).strip())
+    if is_valid_player_name(name):
+        # Skip if this is you
+        if is_self(name):
+            return True
+
+        # Check if line contains your player ID/GEID - if so, skip
+        if state.get("player_id") and state["player_id"] in ctx.raw:
+            return True
 
-        vc_m = vehicle_control_re.search(raw) or vehicle_granted_re.search(raw)
-        if vc_m:
-            client_id, vehicle_name, vehicle_id = vc_m.groups()
-            state["current_vehicle"] = vehicle_name
-            add_event(f"{short_ts} [MY VEHICLE] Entered {vehicle_name}", "you")
-
-        # ========== LOCATION DETECTION ==========
-        loc_m = location_re.search(raw)
-        if loc_m:
-            loc_raw = loc_m.group(1).lower()
-            base_loc = loc_raw.replace("@pyro_", "").replace("@", "").replace("_", "")
-            station_name = base_loc.title()
-            record_zone(station_name, 'station')
-            if station_name != state.get("current_station"):
-                state["current_station"] = station_name
-                add_event(f"{short_ts} [LOCATION] Detected station: {station_name}", "info")
-
-        # ========== DOOR DETECTION ==========
-        door_m = landing_door_re.search(raw)
-        if door_m:
-            door_name = door_m.group(1).strip()
-            door_state = door_m.group(2).strip()
-            now_ts = time.time()
-            if 'Hangar' in door_name or 'HangarDoor' in door_name:
-                friendly = normalize_manager('TransitManager_Hangar-to-Lobby')
-                overlay_anchor = 'bottom_right'
-            elif 'Lobby' in door_name or 'LobbyDoor' in door_name:
-                friendly = normalize_manager('TransitManager-001')
-                overlay_anchor = None
+        now = clock.now()
+
+        prevpos = None
+        for prev in reversed(list(ctx.recent_lines)[-12:]):
+            pm = pos_re.search(prev)
+            if pm:
+                prevpos = tuple(map(float, pm.groups()))
+                break
+        state["sightings"].add(name, now, prevpos)
+        ent = state["entities"].get(name) or Entity()
+        ent.last_seen = now
+        if prevpos:
+            ent.pos = prevpos
+            log_event("player_seen", ctx.event_ts, (name,), pos=prevpos)
+            heatmaps.add(state["current_station"], "sightings", prevpos)
+            if name == state["player_name"]:
+                state["player_pos"] = prevpos
+        else:
+            log_event("player_seen_nopos", ctx.event_ts, (name,))
+        state["entities"][name] = ent
+        note_player(name)
+
+def _on_corpsify(corpsify_m, ctx):
+    name = sys.intern(corpsify_m.group(1).strip())
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        ent = state["entities"].get(name)
+        instant = ent is None or now - ent.last_seen > 60
+        if ent is None:
+            ent = Entity()
+        ent.status = Status.DEAD
+        ent.last_seen = now
+        ent.death_ts = now
+        if instant:
+            log_event("corpse_instant", ctx.event_ts, (name,))
+        else:
+            log_event("corpse", ctx.event_ts, (name,))
+        state["entities"][name] = ent
+        note_player(name)
+        note_outcome("corpse", name, ctx.event_ts)
+
+def _victim_position(ctx, victim: str):
+    """Position from the newest recent line naming victim, or None"""
+    for prev in reversed(ctx.recent_lines):
+        if victim in prev:
+            p = pos_re.search(prev)
+            if p:
+                return tuple(map(float, p.groups()))
+    return None
+
+def _record_kill(ctx, victim, zone, killer):
+    """Shared by both full kill line formats; True when the line is your own death"""
+    ctx.death_matched = True
+    if victim and not is_npc_name(victim) and (is_self(victim) or is_valid_player_name(victim)):
+        note_outcome("death", sys.intern(victim), ctx.event_ts, killer if killer and killer != victim else None)
+    # Skip if you killed yourself
+    if victim and is_self(victim):
+        if killer and is_valid_player_name(killer) and not is_self(killer):
+            player_registry.killed_me(sys.intern(killer), clock.now(), zone)
+        return True
+
+    if killer and is_self(killer) and victim:
+        is_npc = is_npc_name(victim)
+        is_player = is_valid_player_name(victim) and not is_npc
+        if is_npc or is_player:
+            now = clock.now()
+            record_zone(zone, 'death')
+
+            if is_player:
+                state["player_kills"] += 1
+                state["session_player_kills"] += 1
+                state["players_killed"].add(victim)
+                player_registry.killed_by_me(victim, now, zone)
             else:
-                friendly = door_name
-                overlay_anchor = None
-            ping = {
-                "ts": now_ts,
-                "pos": (0.0, 0.0, 0.0),
-                "zone": state.get("current_station", "Station"),
-                "action": door_state.upper(),
-                "tag": "transit",
-                "fresh": True
-            }
-            if overlay_anchor:
-                ping["overlay"] = True
-                ping["overlay_anchor"] = overlay_anchor
+                state["npc_kills"] += 1
+                state["session_npc_kills"] += 1
+
+            state["total_kills"] = state["player_kills"] + state["npc_kills"]
+            state["session_kills"] = state["session_player_kills"] + state["session_npc_kills"]
+            state["activity"].kill(now)
+
+            if state["session_kills"] % 5 == 0 or state["session_kills"] == 1:
+                export_summary_to_file()
+
+            prevpos = _victim_position(ctx, victim)
+            pos = prevpos or state.get("player_pos")
+            overlay = not prevpos and not state.get("player_pos")
+            heatmaps.add(zone, "kills", pos)
+            if not pos:
+                pos = (0.0,0.0,0.0)
+            if is_player:
+                ping_tag = Tag.PLAYER_KILL
+                friendly = "Player Kill"
+                victim_display = victim
+                log_event("player_kill", ctx.event_ts, (victim_display,), zone=zone, pos=pos)
+            else:
+                ping_tag = Tag.NPC_KILL
+                friendly = "NPC Kill"
+                victim_display = victim.split('_')[-2] if '_' in victim else "NPC"
+                victim_display = victim_display.capitalize()
+                log_event("npc_kill", ctx.event_ts, (victim_display,), zone=zone, pos=pos)
+
+            ping = Ping(now, pos, zone or "Unknown", "KILL", ping_tag,
+                        anchor=Anchor.TOP_RIGHT if overlay else Anchor.NONE, victim_name=victim_display)
             add_ping(friendly, ping)
-            add_event(f"{short_ts} [DOOR] {door_state} {friendly}", "transit")
             _cleanup_pings(state)
+            ctx.killed = True
 
-        # ========== CARRIAGE TRANSIT ==========
-        m = carriage_re.search(raw)
-        if m:
-            car_no, car_id, manager_raw, action, zone = m.group(1,2,3,4,5)
-            x, y, z = map(float, (m.group(6), m.group(7), m.group(8)))
-            friendly = normalize_manager(manager_raw, zone)
-            state["transit_locations"].add(friendly)
-            record_zone(zone, 'transit')
-            is_dungeon = bool(re.search(r'Dungeon', manager_raw, re.IGNORECASE))
-            is_exfil = bool(re.search(r'Exfil', manager_raw, re.IGNORECASE) or re.search(r'Dungeon_Exfil', manager_raw, re.IGNORECASE))
-            tag = classify_tag(manager_raw)
-            action_label = "START" if "start" in action.lower() else "FINISH"
-            now_ts = time.time()
-            ping = {
-                "ts": now_ts,
-                "pos": (x, y, z),
-                "zone": zone,
-                "action": action_label,
-                "carriage": car_no,
-                "id": car_id,
-                "tag": tag,
-                "fresh": True
-            }
-            last_player = state.get("last_seen_player", {"name": None, "ts": 0})
-            if last_player.get("name") and (now_ts - last_player.get("ts", 0) < PLAYER_TRANSIT_ASSOCIATION_WINDOW):
-                if is_valid_player_name(last_player["name"]):
-                    ping["player_name"] = last_player["name"]
-                    state["last_seen_player"] = {"name": None, "ts": 0}
-            if tag == 'exit':
-                ping["overlay"] = True
-                ping["overlay_anchor"] = "bottom_right"
-            add_ping(friendly, ping)
-            ping_type = "DUNGEON" if tag == 'dungeon' else "EXIT" if tag == 'exit' else "TRANSIT"
-            player_part = f"[{ping['player_name']}] " if ping.get('player_name') else ""
-            add_event(f"{short_ts} [{ping_type} {action_label}] {player_part}{friendly} zone={zone} pos=({x:.1f},{y:.1f},{z:.1f})", tag if tag != 'exit' else 'transit')
-            if tag == 'dungeon' and state.get("sound_enabled") and (now_ts - state.get("last_sound_ts",0) > SOUND_COOLDOWN):
-                play_dungeon_alert()
-                state["last_sound_ts"] = now_ts
-                add_event(f"{short_ts} [SOUND] Dungeon alert", "info")
-            _cleanup_pings(state)
-            continue
+def _on_kill(death_m, ctx):
+    victim, vid, zone, killer, kid, weapon, wclass, dtype, dx, dy, dz = death_m.groups()
+    # dx, dy, dz are the direction the damage came from, not where the victim was
+    pos = _victim_position(ctx, victim) or (state.get("player_pos") if is_self(victim) else None)
+    heatmaps.add(zone, "deaths", pos)
+    return _record_kill(ctx, victim, zone, killer)
 
-        # ========== PLAYER NICKNAMES ==========
-        nm = nick_re.search(raw)
-        if nm:
-            name = nm.group(1).strip()
-            if is_valid_player_name(name):
-                # Skip if this is you
-                if is_self(name):
-                    continue
+def _on_kill_alt(death_m_alt, ctx):
+    if ctx.death_matched:
+        return
+    victim, zone, killer, weapon, wclass, dtype = death_m_alt.groups()
+    return _record_kill(ctx, victim, zone, killer)
 
-                # Check if line contains your player ID/GEID - if so, skip
-                if state.get("player_id") and state["player_id"] in raw:
-                    continue
+def _on_kill_fallback(fb, ctx):
+    if ctx.killed:
+        return
+    victim = sys.intern(fb.group(1))
+    zone = fb.group(2) or state.get("current_station") or "Unknown"
+    killer = fb.group(3) or ""
+    if not ctx.death_matched and victim and not is_npc_name(victim) and (is_self(victim) or is_valid_player_name(victim)):
+        note_outcome("death", victim, ctx.event_ts, killer if killer and killer != victim else None)
+
+    # Skip if you killed yourself
+    if victim and is_self(victim):
+        if killer and is_valid_player_name(killer) and not is_self(killer):
+            player_registry.killed_me(sys.intern(killer), clock.now(), zone)
+        return True
+
+    if killer and is_self(killer) and victim:
+        is_npc = is_npc_name(victim)
+        is_player = is_valid_player_name(victim) and not is_npc
+        if is_npc or is_player:
+            now = clock.now()
+
+            if is_player:
+                state["player_kills"] += 1
+                state["session_player_kills"] += 1
+                state["players_killed"].add(victim)
+                player_registry.killed_by_me(victim, now, zone)
+            else:
+                state["npc_kills"] += 1
+                state["session_npc_kills"] += 1
+
+            state["total_kills"] = state["player_kills"] + state["npc_kills"]
+            state["session_kills"] = state["session_player_kills"] + state["session_npc_kills"]
+            state["activity"].kill(now)
+
+            if state["session_kills"] % 5 == 0 or state["session_kills"] == 1:
+                export_summary_to_file()
+
+            pos = _victim_position(ctx, victim)
+            overlay = not pos and not state.get("player_pos")
+            heatmaps.add(zone, "kills", pos)
+            if is_player:
+                ping_tag = Tag.PLAYER_KILL
+                friendly = "Player Kill"
+                victim_display = victim
+                log_event("player_kill_zone", ctx.event_ts, (victim_display,), zone=zone, pos=pos)
+            else:
+                ping_tag = Tag.NPC_KILL
+                friendly = "NPC Kill"
+                victim_display = victim.split('_')[-2] if '_' in victim else "NPC"
+                victim_display = victim_display.capitalize()
+                log_event("npc_kill_zone", ctx.event_ts, (victim_display,), zone=zone, pos=pos)
+
+            ping = Ping(now, pos or (0.0, 0.0, 0.0), zone, "KILL", ping_tag,
+                        anchor=Anchor.TOP_RIGHT if overlay else Anchor.NONE, victim_name=victim_display)
+            add_ping(friendly, ping)
+            _cleanup_pings(state)
 
-                now = time.time()
-                state["last_seen_player"] = {"name": name, "ts": now}
-
-                prevpos = None
-                for prev in reversed(list(recent_lines)[-12:]):
-                    pm = pos_re.search(prev)
-                    if pm:
-                        prevpos = tuple(map(float, pm.groups()))
-                        break
-                ent = state["entities"].get(name, {"type":"player", "status":"alive"})
-                if prevpos:
-                    ent.update({"pos": prevpos, "last_seen": now})
-                    add_event(f"{short_ts} [PLAYER] {name} @ ({prevpos[0]:.1f},{prevpos[1]:.1f},{prevpos[2]:.1f})", "player")
-                    if name == state["player_name"]:
-                        state["player_pos"] = prevpos
-                else:
-                    ent.update({"last_seen": now})
-                    add_event(f"{short_ts} [PLAYER] {name} detected (pos unknown)", "player")
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== CORPSIFY DETECTION ==========
-        corpsify_m = corpsify_re.search(raw)
-        if corpsify_m:
-            name = corpsify_m.group(1).strip()
-            if is_valid_player_name(name) and not is_self(name):
-                now = time.time()
-                ent = state["entities"].get(name, {"type":"player","status":"alive"})
-                if name not in state["entities"] or (now - ent.get("last_seen", 0) > 60):
-                    ent.update({"status":"dead","last_seen":now,"death_ts":now})
-                    add_event(f"{short_ts} [CORPSE INSTANT] {name} detected and immediately dead", "death")
-                else:
-                    ent.update({"status":"dead","last_seen":now,"death_ts":now})
-                    add_event(f"{short_ts} [CORPSE] {name} is now a corpse", "death")
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== KILL PARSING ==========
-        death_m = death_re.search(raw)
-        death_m_alt = None if death_m else death_alt_re.search(raw)
-        killed = False
-        if death_m or death_m_alt:
-            if death_m:
-                victim, vid, zone, killer, kid, weapon, wclass, dtype, dx, dy, dz = death_m.groups()
+def _on_incap(incap_m, ctx):
+    name = sys.intern(incap_m.group(1).strip())
+    causes = incap_m.group(2).strip()
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        ent = state["entities"].get(name) or Entity()
+        ent.status = Status.INCAP
+        ent.last_seen = now
+        log_event("incap", ctx.event_ts, (name,), detail=causes)
+        state["entities"][name] = ent
+        note_player(name)
+        note_outcome("incap", name, ctx.event_ts)
+
+def _on_corpse(corpse_m, ctx):
+    name = sys.intern(corpse_m.group(1).strip())
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        ent = state["entities"].get(name) or Entity()
+        if ent.status != Status.DEAD or now - ent.death_ts > 10:
+            ent.status = Status.DEAD
+            ent.last_seen = now
+            ent.death_ts = now
+            log_event("corpse", ctx.event_ts, (name,))
+            state["entities"][name] = ent
+            note_player(name)
+            note_outcome("corpse", name, ctx.event_ts)
+
+def _on_stall(stall_m, ctx):
+    name, stall_type, length = stall_m.groups()
+    name = name.strip()
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        if name != state["player_name"]:
+            state["sightings"].add(name, now)
+        ent = state["entities"].get(name) or Entity()
+        ent.last_seen = now
+        log_event("stall", ctx.event_ts, (name,), detail=(stall_type, length))
+        state["entities"][name] = ent
+        note_player(name)
+
+def _on_player_event(pem, ctx):
+    name = sys.intern(pem.group(1).strip())
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        if name != state["player_name"]:
+            state["sightings"].add(name, now)
+        ent = state["entities"].get(name) or Entity()
+        ent.last_seen = now
+        state["entities"][name] = ent
+        note_player(name)
+
+def _on_spawn_flow(spawn_m, ctx):
+    name = sys.intern(spawn_m.group(1).strip())
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        state["sightings"].add(name, now)
+
+        ent = state["entities"].get(name) or Entity()
+        if ent.status == Status.DEAD:
+            ent.status = Status.ALIVE
+            log_event("respawn", ctx.event_ts, (name,))
+        else:
+            log_event("spawn_flow", ctx.event_ts, (name,))
+
+        ent.last_seen = now
+        state["entities"][name] = ent
+        note_player(name)
+
+def _on_entity_detach(detach_m, ctx):
+    name = sys.intern(detach_m.group(1).strip())
+    if is_valid_player_name(name) and not is_self(name):
+        now = clock.now()
+        ent = state["entities"].get(name) or Entity()
+        ent.last_seen = now
+        log_event("entity_detach", ctx.event_ts, (name,))
+        state["entities"][name] = ent
+        note_player(name)
+
+def _on_hostility(hostility_m, ctx):
+    attacker = sys.intern(hostility_m.group(1).strip()) if hostility_m.group(1) else None
+    target = sys.intern(hostility_m.group(2).strip()) if hostility_m.group(2) else None
+    child_player = sys.intern(hostility_m.group(3).strip()) if hostility_m.group(3) else None
+
+    now = clock.now()
+    state["activity"].hostility_hit(now)
+    victim = child_player or target
+    if attacker and victim and (is_self(victim) or is_valid_player_name(victim)):
+        state["engagements"].hit(attacker, victim, now)
+
+    # Detect attacker if valid player
+    if attacker:
+        if is_valid_player_name(attacker) and not is_self(attacker):
+            state["sightings"].add(attacker, now)
+            player_registry.hostile(attacker, now)
+
+            ent = state["entities"].get(attacker)
+            if ent is None or ent.type != Tag.PLAYER:
+                state["entities"][attacker] = Entity(Tag.PLAYER, last_seen=now)
+                note_player(attacker)
+                log_event("hostility_attacker", ctx.event_ts, (attacker,))
             else:
-                victim, zone, killer, weapon, wclass, dtype = death_m_alt.groups()
-            # Skip if you killed yourself
-            if victim and is_self(victim):
-                continue
+                ent.last_seen = now
+
+    # Detect child player (the actual player being hit)
+    if child_player:
+        if is_valid_player_name(child_player) and not is_self(child_player):
+            state["sightings"].add(child_player, now)
+            player_registry.hostile(child_player, now)
+
+            ent = state["entities"].get(child_player)
+            if ent is None or ent.type != Tag.PLAYER:
+                state["entities"][child_player] = Entity(Tag.PLAYER, last_seen=now)
+                note_player(child_player)
+                log_event("hostility_target", ctx.event_ts, (child_player,))
+            else:
+                ent.last_seen = now
+
+def _on_position(pm, ctx):
+    x,y,z = map(float, pm.groups())
+    assoc = None
+    for prev in reversed(list(ctx.recent_lines)[-12:]):
+        nm2 = nick_re.search(prev)
+        if nm2:
+            assoc = nm2.group(1)
+            break
+        e2 = transit_manager_re.search(prev)
+        if e2:
+            assoc = normalize_manager(e2.group(1))
+            break
+    if assoc:
+        prev_ent = state["entities"].get(assoc)
+        state["entities"][assoc] = Entity(prev_ent.type if prev_ent else Tag.TRANSIT, (x,y,z), clock.now())
+    else:
+        state["position_grid"].add(x, y, clock.now())
+
+# What the parser detects, in the order the rules run. Gaps leave room for rules-file entries;
+# the vehicle control pair and the three kill formats rely on their relative order.
+BUILTIN_RULES = (
+    DetectionRule("identity", ("geid",), None, _on_identity, 0),
+    DetectionRule("login", ("login success",), login_pattern_re, _on_login, 10),
+    DetectionRule("version", ("system-trace-env-id",), version_pattern_re, _on_version, 20),
+    DetectionRule("spawned", ("onclientspawned",), spawned_re, _on_spawned, 30),
+    DetectionRule("frontend_closed", ("sc_frontend closed",), frontend_closed_re, _on_frontend_closed, 40),
+    DetectionRule("spawn_reset", ("lost reservation for spawnpoint",), spawn_reset_re, _on_spawn_reset, 50),
+    DetectionRule("setup_envelope", ("<setup envelope failure>",), setup_envelope_re, _on_setup_envelope, 60),
+    DetectionRule("fuel_controller", ("ownerless fuel controller created",), fuel_controller_lambda_re,
+                  _on_fuel_controller, 70),
+    DetectionRule("fuel_confirm", ("no vehicle for fuel controller",), fuel_controller_confirm_re, _on_fuel_confirm, 80),
+    DetectionRule("vehicle_destruction", ("<vehicle destruction>",), vehicle_destruction_re, _on_vehicle_destruction, 90),
+    DetectionRule("vehicle_control", ("requesting control token",), vehicle_control_re, _on_vehicle_control, 100),
+    DetectionRule("vehicle_granted", ("granted control token",), vehicle_granted_re, _on_vehicle_control, 101),
+    DetectionRule("location", ("landing zone location",), location_re, _on_location, 110),
+    DetectionRule("door", ("landingarea",), landing_door_re, _on_door, 120),
+    DetectionRule("carriage", ("carriage",), carriage_re, _on_carriage, 130),
+    DetectionRule("nickname", ('nickname="',), nick_re, _on_nickname, 140),
+    DetectionRule("corpsify", ("running corpsify",), corpsify_re, _on_corpsify, 150),
+    DetectionRule("kill", ("cactor::kill",), death_re, _on_kill, 160),
+    DetectionRule("kill_alt", ("cactor::kill",), death_alt_re, _on_kill_alt, 161),
+    DetectionRule("kill_fallback", ("cactor::kill",), death_fallback_re, _on_kill_fallback, 162),
+    DetectionRule("incap", ("logged an incap",), incap_re, _on_incap, 170),
+    DetectionRule("corpse", ("corpse>", "corpsify"), corpse_re, _on_corpse, 180),
+    DetectionRule("stall", ("actor stall detected",), stall_re, _on_stall, 190),
+    DetectionRule("player_event", ("player",), player_event_re, _on_player_event, 200),
+    DetectionRule("spawn_flow", ("player '",), spawn_flow_re, _on_spawn_flow, 210),
+    DetectionRule("entity_detach", ("centity::onownerremoved", "force detaching entity attachment"),
+                  entity_detach_re, _on_entity_detach, 220),
+    DetectionRule("hostility", ("fake hit from",), hostility_hit_re, _on_hostility, 230),
+    DetectionRule("position", ("at position x:",), pos_re, _on_position, 240),
+)
 
-            if killer and is_self(killer) and victim:
-                is_npc = is_npc_name(victim)
-                is_player = is_valid_player_name(victim) and not is_npc
-                if is_npc or is_player:
-                    now = time.time()
-                    record_zone(zone, 'death')
-
-                    if is_player:
-                        state["player_kills"] += 1
-                        state["session_player_kills"] += 1
-                        state["players_killed"].add(victim)
-                    else:
-                        state["npc_kills"] += 1
-                        state["session_npc_kills"] += 1
-
-                    state["total_kills"] = state["player_kills"] + state["npc_kills"]
-                    state["session_kills"] = state["session_player_kills"] + state["session_npc_kills"]
-
-                    if state["session_kills"] % 5 == 0 or state["session_kills"] == 1:
-                        export_summary_to_file()
-
-                    prevpos = None
-                    for prev in reversed(recent_lines):
-                        if victim in prev:
-                            p = pos_re.search(prev)
-                            if p:
-                                prevpos = tuple(map(float, p.groups()))
-                                break
-                    pos = prevpos or state.get("player_pos")
-                    overlay = not prevpos and not state.get("player_pos")
-                    if not pos:
-                        pos = (0.0,0.0,0.0)
-                    if is_player:
-                        ping_tag = "player_kill"
-                        friendly = "Player Kill"
-                        victim_display = victim
-                        add_event(f"{short_ts} [PLAYER KILL] Killed {victim_display} at pos=({pos[0]:.1f},{pos[1]:.1f},{pos[2]:.1f})", "player_kill")
-                    else:
-                        ping_tag = "npc_kill"
-                        friendly = "NPC Kill"
-                        victim_display = victim.split('_')[-2] if '_' in victim else "NPC"
-                        victim_display = victim_display.capitalize()
-                        add_event(f"{short_ts} [NPC KILL] Killed {victim_display}", "npc_kill")
-
-                    ping = {
-                        "ts": now,
-                        "pos": pos,
-                        "zone": zone or "Unknown",
-                        "action": "KILL",
-                        "tag": ping_tag,
-                        "fresh": True,
-                        "overlay": overlay,
-                        "victim_name": victim_display
-                    }
-                    if overlay:
-                        ping["overlay_anchor"] = "top_right"
-                    add_ping(friendly, ping)
-                    state["entities"][friendly] = {"pos": pos, "type": ping_tag, "last_seen": now}
-                    _cleanup_pings(state)
-                    killed = True
-
-        # ========== FALLBACK KILL ==========
-        if not killed:
-            fb = death_fallback_re.search(raw)
-            if fb:
-                victim = fb.group(1)
-                zone = fb.group(2) or state.get("current_station") or "Unknown"
-                killer = fb.group(3) or ""
-
-                # Skip if you killed yourself
-                if victim and is_self(victim):
-                    continue
+def _file_rule_handler(template: str, tag: str, player: str, stop: bool):
+    """Handler for a rules-file rule: note its player group as a sighting, then log its event"""
+    def handle(m, ctx):
+        groups = {key: (value or "").strip() for key, value in m.groupdict().items()}
+        name = groups.get(player) if player else None
+        if name and is_valid_player_name(name) and not is_self(name):
+            name = sys.intern(name)
+            now = clock.now()
+            state["sightings"].add(name, now)
+            ent = state["entities"].get(name) or Entity()
+            ent.last_seen = now
+            state["entities"][name] = ent
+            note_player(name)
+        if template:
+            log_event("rule", ctx.event_ts, (name,) if name else (), detail=template.format(**groups), tag=tag)
+        return stop
+    return handle
+
+def _file_rule(spec: dict, index: int) -> DetectionRule:
+    name = str(spec.get("name") or f"rule {index + 1}")
+    literals = tuple(str(lit).lower() for lit in spec.get("literals", ()) if lit)
+    if not literals:
+        raise ValueError(f"{name}: list at least one literal that every matching line contains")
+    if not isinstance(spec.get("pattern"), str):
+        raise ValueError(f"{name}: missing pattern")
+    try:
+        pattern = re.compile(spec["pattern"], re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"{name}: bad pattern: {e}")
+    template = str(spec.get("event", ""))
+    tag = spec.get("tag", "info")
+    player = spec.get("player")
+    if not template and not player:
+        raise ValueError(f"{name}: give an event, a player group or both")
+    if tag not in {known for known, _ in EVENT_KINDS.values()}:
+        raise ValueError(f"{name}: unknown tag {tag!r}")
+    if player and player not in pattern.groupindex:
+        raise ValueError(f"{name}: the pattern has no group named {player!r}")
+    try:
+        template.format(**dict.fromkeys(pattern.groupindex, ""))
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"{name}: the event uses {e}, which is not a named group of the pattern")
+    try:
+        priority = int(spec.get("priority", 1000))  # After every builtin rule
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: priority must be a number")
+    return DetectionRule(name, literals, pattern, _file_rule_handler(template, tag, player, bool(spec.get("stop"))),
+                         priority, origin="file")
+
+def load_rules(path: str = RULES_PATH):
+    """(rules, names of builtin rules to disable) from a rules file; ValueError names what is wrong"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("expected an object with \"rules\" and/or \"disabled\"")
+    specs = data.get("rules", [])
+    disabled = data.get("disabled", [])
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError("\"rules\" must be a list of objects")
+    if not isinstance(disabled, list):
+        raise ValueError("\"disabled\" must be a list of rule names")
+    return [_file_rule(spec, i) for i, spec in enumerate(specs)], set(map(str, disabled))
+
+class DetectionRules:
+    """The builtin rule table plus the rules file, recompiled whenever the file changes.
+
+    The file lets a new game patch be followed without touching the parser: each of its
+    rules logs an event built from the pattern's named groups and/or marks one group as a
+    player sighting, and "disabled" switches off builtin rules by name.
+    """
+    def __init__(self, builtin, path: str = RULES_PATH):
+        self.builtin = tuple(builtin)
+        self.path = path
+        self.mtime = None
+        self.checked = -math.inf
+        self.file_rules = 0
+        self.compiled = RuleMatcher(self.builtin)
+
+    def refresh(self, now: float):
+        """Reload the rules file if it changed, looking at most every RULES_RELOAD_INTERVAL seconds"""
+        if now - self.checked < RULES_RELOAD_INTERVAL:
+            return
+        self.checked = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        filename = os.path.basename(self.path)
+        if mtime is None:
+            self.file_rules = 0
+            self.compiled = RuleMatcher(self.builtin)
+            add_event(f"[RULES] {filename} removed, using the builtin rules only", "info")
+            return
+        try:
+            rules, disabled = load_rules(self.path)
+            unknown = disabled - {rule.name for rule in self.builtin}
+            if unknown:
+                raise ValueError(f"no builtin rule named {', '.join(sorted(unknown))}")
+        except (OSError, ValueError) as e:
+            add_event(f"[RULES] {filename} not loaded, keeping the previous rules: {e}", "info")
+            return
+        self.file_rules = len(rules)
+        self.compiled = RuleMatcher([rule for rule in self.builtin if rule.name not in disabled] + rules)
+        note = f", disabled {', '.join(sorted(disabled))}" if disabled else ""
+        add_event(f"[RULES] Loaded {len(rules)} rules from {filename}{note}", "info")
 
-                if killer and is_self(killer) and victim:
-                    is_npc = is_npc_name(victim)
-                    is_player = is_valid_player_name(victim) and not is_npc
-                    if is_npc or is_player:
-                        now = time.time()
+detection_rules = DetectionRules(BUILTIN_RULES)
 
-                        if is_player:
-                            state["player_kills"] += 1
-                            state["session_player_kills"] += 1
-                            state["players_killed"].add(victim)
-                        else:
-                            state["npc_kills"] += 1
-                            state["session_npc_kills"] += 1
-
-                        state["total_kills"] = state["player_kills"] + state["npc_kills"]
-                        state["session_kills"] = state["session_player_kills"] + state["session_npc_kills"]
-
-                        if state["session_kills"] % 5 == 0 or state["session_kills"] == 1:
-                            export_summary_to_file()
-
-                        pos = None
-                        for prev in reversed(recent_lines):
-                            if victim in prev:
-                                p = pos_re.search(prev)
-                                if p:
-                                    pos = tuple(map(float, p.groups()))
-                                    break
-                        overlay = not pos and not state.get("player_pos")
-                        if is_player:
-                            ping_tag = "player_kill"
-                            friendly = "Player Kill"
-                            victim_display = victim
-                            add_event(f"{short_ts} [PLAYER KILL] Killed {victim_display} in {zone}", "player_kill")
-                        else:
-                            ping_tag = "npc_kill"
-                            friendly = "NPC Kill"
-                            victim_display = victim.split('_')[-2] if '_' in victim else "NPC"
-                            victim_display = victim_display.capitalize()
-                            add_event(f"{short_ts} [NPC KILL] Killed {victim_display} in {zone}", "npc_kill")
-
-                        ping = {
-                            "ts": now,
-                            "pos": pos or (0,0,0),
-                            "zone": zone,
-                            "action": "KILL",
-                            "tag": ping_tag,
-                            "fresh": True,
-                            "overlay": overlay,
-                            "victim_name": victim_display
-                        }
-                        if overlay:
-                            ping["overlay_anchor"] = "top_right"
-                        add_ping(friendly, ping)
-                        state["entities"][friendly] = {"pos": pos or (0,0,0), "type": ping_tag, "last_seen": now}
-                        _cleanup_pings(state)
-
-        # ========== INCAP ==========
-        incap_m = incap_re.search(raw)
-        if incap_m:
-            name = incap_m.group(1).strip()
-            causes = incap_m.group(2).strip()
-            if is_valid_player_name(name) and not is_self(name):
-                now = time.time()
-                ent = state["entities"].get(name, {"type":"player","status":"alive"})
-                ent.update({"status":"incap","last_seen":now})
-                add_event(f"{short_ts} [INCAP] {name} incapacitated, causes: {causes}", "death")
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== CORPSE DETECTION ==========
-        if "Corpse>" in raw or "corpsify" in raw.lower():
-            corpse_m = corpse_re.search(raw)
-            if corpse_m:
-                name = corpse_m.group(1).strip()
-                if is_valid_player_name(name) and not is_self(name):
-                    now = time.time()
-                    ent = state["entities"].get(name, {"type":"player","status":"alive"})
-                    if ent.get("status") != "dead" or now - ent.get("death_ts", 0) > 10:
-                        ent.update({"status":"dead","last_seen":now,"death_ts":now})
-                        add_event(f"{short_ts} [CORPSE] {name} is now a corpse", "death")
-                        state["entities"][name] = ent
-                        state["player_names"].add(name)
-
-        # ========== STALL ==========
-        stall_m = stall_re.search(raw)
-        if stall_m:
-            name, stall_type, length = stall_m.groups()
-            name = name.strip()
-            if is_valid_player_name(name) and not is_self(name):
-                now = time.time()
-                if name != state["player_name"]:
-                    state["last_seen_player"] = {"name": name, "ts": now}
-                ent = state["entities"].get(name, {"type":"player", "status":"alive"})
-                ent["last_seen"] = now
-                add_event(f"{short_ts} [STALL] Saw {name} (type: {stall_type}, len: {length})", "player")
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== PLAYER EVENTS ==========
-        pem = player_event_re.search(raw)
-        if pem:
-            name = pem.group(1).strip()
-            if is_valid_player_name(name) and not is_self(name):
-                now = time.time()
-                if name != state["player_name"]:
-                    state["last_seen_player"] = {"name": name, "ts": now}
-                ent = state["entities"].get(name, {"type":"player", "status":"alive"})
-                ent["last_seen"] = now
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== SPAWN FLOW ==========
-        spawn_m = spawn_flow_re.search(raw)
-        if spawn_m:
-            name = spawn_m.group(1).strip()
-            if is_valid_player_name(name) and not is_self(name):
-                now = time.time()
-                state["last_seen_player"] = {"name": name, "ts": now}
-
-                ent = state["entities"].get(name, {"type":"player","status":"alive"})
-                if ent.get("status") == "dead":
-                    ent["status"] = "alive"
-                    add_event(f"{short_ts} [SPAWN FLOW] {name} respawned, marked alive again", "player")
-                else:
-                    add_event(f"{short_ts} [SPAWN FLOW] Detected {name}", "player")
+# ---------------- PARSER ----------------
+def parse_line(item, recent_lines, queued: int = 0):
+    """Run one (line, read_ts, source) item through the detection rules and expire stale entities"""
+    raw, read_ts, source = item
+    state["line_source"] = source if len(log_sources) > 1 else None
+    ts_m = timestamp_re.search(raw)
+    ts = ts_m.group(1) if ts_m else datetime.now(timezone.utc).isoformat()
+    log_ts = parse_log_timestamp(ts) if ts_m else None
+    event_ts = log_ts if log_ts is not None else time.time()
+    clock.observe(log_ts)
+    if log_ts is not None:
+        state.stamp_start(clock.now())
+    ingest_lag.begin_line(log_ts, read_ts, queued)
+    detection_rules.refresh(time.monotonic())
+
+    recent_lines.append(raw)
+    if detection_rules.compiled.dispatch(LineContext(raw, event_ts, recent_lines)):
+        return
 
-                ent["last_seen"] = now
-                state["entities"][name] = ent
-                state["player_names"].add(name)
-
-        # ========== ENTITY DETACHMENT ==========
-        if "CEntity::OnOwnerRemoved" in raw or "force detaching ENTITY ATTACHMENT" in raw:
-            detach_m = entity_detach_re.search(raw)
-            if detach_m:
-                name = detach_m.group(1).strip()
-                if is_valid_player_name(name) and not is_self(name):
-                    now = time.time()
-                    ent = state["entities"].get(name, {"type":"player", "status":"alive"})
-                    ent["last_seen"] = now
-                    add_event(f"{short_ts} [ENTITY] Detected {name} (entity detach)", "player")
-                    state["entities"][name] = ent
-                    state["player_names"].add(name)
-        # ========== HOSTILITY EVENTS ==========
-        hostility_m = hostility_hit_re.search(raw)
-        if hostility_m:
-            attacker = hostility_m.group(1).strip() if hostility_m.group(1) else None
-            target = hostility_m.group(2).strip() if hostility_m.group(2) else None
-            child_player = hostility_m.group(3).strip() if hostility_m.group(3) else None
-
-            now = time.time()
-
-            # Detect attacker if valid player
-            if attacker:
-                if is_valid_player_name(attacker) and not is_self(attacker):
-                    state["last_seen_player"] = {"name": attacker, "ts": now}
-
-                    if attacker not in state["entities"] or state["entities"].get(attacker, {}).get("type") != "player":
-                        ent = {"type": "player", "status": "alive", "last_seen": now}
-                        state["entities"][attacker] = ent
-                        state["player_names"].add(attacker)
-                        add_event(f"{short_ts} [PLAYER] {attacker} detected (hostility attacker)", "player")
-                    else:
-                        state["entities"][attacker]["last_seen"] = now
-
-            # Detect child player (the actual player being hit)
-            if child_player:
-                if is_valid_player_name(child_player) and not is_self(child_player):
-                    state["last_seen_player"] = {"name": child_player, "ts": now}
-
-                    if child_player not in state["entities"] or state["entities"].get(child_player, {}).get("type") != "player":
-                        ent = {"type": "player", "status": "alive", "last_seen": now}
-                        state["entities"][child_player] = ent
-                        state["player_names"].add(child_player)
-                        add_event(f"{short_ts} [PLAYER] {child_player} detected (hostility target)", "player")
-                    else:
-                        state["entities"][child_player]["last_seen"] = now
-        # ========== POSITION LINES ==========
-        pm = pos_re.search(raw)
-        if pm:
-            x,y,z = map(float, pm.groups())
-            assoc = None
-            for prev in reversed(list(recent_lines)[-12:]):
-                nm2 = nick_re.search(prev)
-                if nm2:
-                    assoc = nm2.group(1)
-                    break
-                e2 = re.search(r'(TransitManager[^\s,;:]*)', prev)
-                if e2:
-                    assoc = normalize_manager(e2.group(1))
-                    break
-            key = assoc if assoc else f"obj_{len(state['entities'])+1}"
-            state["entities"][key] = {"pos": (x,y,z), "type": state["entities"].get(key,{}).get("type","transit"), "last_seen": time.time()}
+    # ========== CLEANUP STALE ENTITIES ==========
+    nowt = clock.now()
+    stale = [k for k,v in state["entities"].items() if nowt - v.last_seen > ENTITY_TIMEOUT and not k in state["pings"]]
+    for k in stale:
+        del state["entities"][k]
 
-        # ========== CLEANUP STALE ENTITIES ==========
-        nowt = time.time()
-        stale = [k for k,v in state["entities"].items() if nowt - v.get("last_seen", nowt) > ENTITY_TIMEOUT and not k in state["pings"]]
-        for k in stale:
-            del state["entities"][k]
+    stale_vehicles = [vid for vid, v in state["vehicles"].items() if nowt - v.last_update > VEHICLE_TIMEOUT]
+    for vid in stale_vehicles:
+        del state["vehicles"][vid]
 
-        stale_vehicles = [vid for vid, v in state["vehicles"].items() if nowt - v.get("last_update", nowt) > VEHICLE_TIMEOUT]
-        for vid in stale_vehicles:
-            del state["vehicles"][vid]
+    cooldowns = state["spawn_reset_cooldown"]
+    if cooldowns:
+        expired = [k for k, t in cooldowns.items() if nowt - t > SPAWN_RESET_COOLDOWN]
+        for k in expired:
+            del cooldowns[k]
 
-        _cleanup_pings(state)
+    state["position_grid"].expire(nowt)
+    _cleanup_pings(state)
+
+def parser_loop(in_q: queue.Queue, state: dict):
+    recent_lines = collections.deque(maxlen=400)
+    while True:
+        ingest_lag.end_line()
+        item = in_q.get()
+        if item is None:
+            time.sleep(0.05)
+            continue
+        parse_line(item, recent_lines, in_q.qsize())
 
 # ---------------- PING CLEANUP ----------------
 def _cleanup_pings(state):
-    """Remove expired pings and trim based on priority"""
-    now = time.time()
-    for key in list(state["pings"].keys()):
-        pings = state["pings"][key]
-        kept = []
-
-        for p in pings:
-            tag = str(p.get("tag", "")).lower()
-
-            if "exit" in tag or "exfil" in tag:
-                lifetime = EXIT_PING_LIFETIME
-            elif "dungeon" in tag:
-                lifetime = DUNGEON_PING_LIFETIME
-            elif tag in ("npc_kill", "player_kill"):
-                lifetime = NPC_KILL_LIFETIME
-            elif tag == "vehicle":
-                lifetime = 60.0
-            elif tag in ("vehicle_potential", "vehicle_confirmed"):
-                lifetime = 30.0
-            else:
-                lifetime = PING_LIFETIME
+    """Remove expired pings; per-manager trimming already happened on append"""
+    state["pings"].expire(clock.now())
+
+# ---------------- DELTA API ----------------
+class DeltaHub:
+    """Loopback NDJSON stream of state changes for overlays and dashboards.
+
+    Every message is one JSON object per line with a sequence number, so a
+    client can tell when it missed something and ask for a full snapshot by
+    sending the line "snapshot". Pings and events are pushed as the parser
+    produces them; entity and vehicle changes are found by diffing every
+    API_DIFF_INTERVAL. Clients that fall API_CLIENT_BUFFER messages behind,
+    or leave a write unread for API_DRAIN_TIMEOUT, are disconnected rather
+    than slowing the parser down. Sequence numbers are only taken on the
+    event loop, in the order messages are broadcast.
+    """
+    def __init__(self, port: int):
+        self.port = port
+        self.seq = 0
+        self.clients = set()
+        self.loop = None
+        self.sent_entities = {}
+        self.sent_vehicles = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self.clients)
+
+    def _message(self, kind: str, data, advance: bool = True, ts: float = None) -> str:
+        """One NDJSON line, built on the event loop; hello and snapshot replies carry the latest seq
+        without taking a new one"""
+        if advance:
+            self.seq += 1
+        return json.dumps({"seq": self.seq, "type": kind, "ts": clock.now() if ts is None else ts,
+                           "data": data}) + "\n"
+
+    def publish(self, kind: str, data):
+        """Queue a delta for every client; safe to call from any thread"""
+        if not self.clients or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._broadcast, kind, data, clock.now())
 
-            ts = p.get("ts", 0)
-            age = now - ts if ts else 999999
+    def _broadcast(self, kind: str, data, ts: float = None):
+        line = self._message(kind, data, ts=ts)
+        for client in list(self.clients):
+            try:
+                client.put_nowait(line)
+            except asyncio.QueueFull:
+                # Too far behind: drop what it hasn't read and end its connection
+                self.clients.discard(client)
+                while not client.empty():
+                    client.get_nowait()
+                client.put_nowait(None)
+
+    def snapshot(self) -> dict:
+        return {
+            "player_name": state.get("player_name"),
+            "player_pos": state.get("player_pos"),
+            "current_station": state.get("current_station"),
+            "current_vehicle": state.get("current_vehicle"),
+            "kills": {k: state.get(k, 0) for k in ("total_kills", "npc_kills", "player_kills",
+                                                   "session_kills", "session_npc_kills", "session_player_kills")},
+            "entities": {name: ent.to_dict() for name, ent in list(state["entities"].items())},
+            "vehicles": {vid: v.to_dict() for vid, v in list(state["vehicles"].items())},
+            "pings": {key: [p.to_dict() for p in pings] for key, pings in state["pings"].items()},
+            "events": [event_to_dict(e) for e in filter_events(state["events"], limit=EXPORT_RECENT_EVENTS)],
+        }
 
-            if age <= lifetime:
-                kept.append(p)
+    def _diff(self, current: dict, sent: dict, kind: str):
+        for key, value in current.items():
+            if sent.get(key) != value:
+                self._broadcast(kind, {"id": key, **value})
+        for key in sent.keys() - current.keys():
+            self._broadcast(kind + "_removed", {"id": key})
+
+    async def _diff_loop(self):
+        while True:
+            await asyncio.sleep(API_DIFF_INTERVAL)
+            if not self.clients:
+                continue
+            entities = {name: ent.to_dict() for name, ent in list(state["entities"].items())}
+            vehicles = {vid: v.to_dict() for vid, v in list(state["vehicles"].items())}
+            for d in list(entities.values()) + list(vehicles.values()):
+                d.pop("last_seen", None)
+                d.pop("last_update", None)  # Only real changes, not every sighting
+            self._diff(entities, self.sent_entities, "entity")
+            self._diff(vehicles, self.sent_vehicles, "vehicle")
+            self.sent_entities, self.sent_vehicles = entities, vehicles
+
+    async def _serve_client(self, reader, writer):
+        client = asyncio.Queue(maxsize=API_CLIENT_BUFFER)
+        client.put_nowait(self._message("hello", {"player_name": state.get("player_name")}, advance=False))
+        self.clients.add(client)
+
+        async def read_commands():
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip().lower() == b"snapshot":
+                    await client.put(self._message("snapshot", self.snapshot(), advance=False))
+            await client.put(None)
 
-        kept.sort(key=lambda x: x.get("ts", 0))
+        reader_task = asyncio.ensure_future(read_commands())
+        try:
+            while True:
+                line = await client.get()
+                if line is None:
+                    break
+                writer.write(line.encode("utf-8"))
+                await asyncio.wait_for(writer.drain(), API_DRAIN_TIMEOUT)
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.clients.discard(client)
+            reader_task.cancel()
+            writer.close()
+
+    async def _main(self):
+        self.loop = asyncio.get_event_loop()
+        # Loopback only: this is a local feed, never a network service
+        server = await asyncio.start_server(self._serve_client, "127.0.0.1", self.port)
+        add_event(f"[API] Streaming deltas on 127.0.0.1:{self.port}", "info")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self._diff_loop())
+
+    def run(self):
+        """Thread entry point"""
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            add_event(f"[API ERROR] {e}", "info")
 
-        max_pings = 10
+api_hub = None  # DeltaHub when --api is given
 
-        low_priority = ["Elevator", "HangarLobby", "Habs Transit", "TransitManager-001",
-                       "TransitManager_Hangar-to-Lobby", "TransitManager_Habs", "Spaceport-to-Hangars", "Internal", "Spaceport_to_Hangars", "MetroPlatform"]
+# ---------------- PARSER PROCESS ----------------
+# State keys copied verbatim into each snapshot
+SNAPSHOT_KEYS = (
+    "player_pos", "current_station", "pending_vehicle", "current_vehicle",
+    "player_name", "game_version", "total_kills", "session_kills", "npc_kills", "player_kills",
+    "session_npc_kills", "session_player_kills", "player_id", "radar_epoch",
+)
 
-        if any(lp in key for lp in low_priority):
-            max_pings = 1
+def snapshot_state(after_seq: int, heatmap_version: int = -1) -> dict:
+    """Picklable copy of what the UI draws, with only the events newer than after_seq
+    and the heatmap view only if it changed since heatmap_version"""
+    snap = {key: state[key] for key in SNAPSHOT_KEYS}
+    snap["entities"] = dict(state["entities"])
+    # Entities only hold plain values and pickle safely; a vehicle's history deque would
+    # raise if a hit were appended while it is being pickled, so vehicles are copied
+    snap["vehicles"] = {vid: vehicle.copy() for vid, vehicle in list(state["vehicles"].items())}
+    snap["zone_mentions"] = list(state["zone_mentions"])
+    snap["pings"] = state["pings"].items()
+    snap["position_cells"] = state["position_grid"].dump()
+    snap["players_killed"] = list(state["players_killed"])
+    snap["events"] = filter_events(state["events"], after_seq=after_seq)
+    snap["now"] = clock.now()
+    snap["lag_summary"] = status_summary()
+    snap["activity"] = state["activity"].summary(clock.now())
+    snap["registry"] = player_registry.view(name for name, ent in snap["entities"].items() if ent.type == Tag.PLAYER)
+    view = heatmaps.view()
+    if heatmaps.version != heatmap_version:
+        snap["heatmap_view"] = view
+    snap["heatmap_version"] = heatmaps.version
+    return snap
+
+def apply_snapshot(snap: dict):
+    """Load a snapshot from the parser process into this process's state"""
+    if snap["radar_epoch"] != state["radar_epoch"]:
+        state.new_session(clock.now())
+    if snap["player_name"] != state["player_name"]:
+        # Through the setter so is_self and the cached name verdicts follow the new name
+        set_player_name(snap["player_name"])
+    for key in SNAPSHOT_KEYS:
+        state[key] = snap[key]
+    state["entities"] = snap["entities"]
+    state["vehicles"] = snap["vehicles"]
+    state["zone_mentions"] = collections.deque(snap["zone_mentions"], maxlen=state["zone_mentions"].maxlen)
+    state["pings"].load(snap["pings"])
+    state["position_grid"].load(snap["position_cells"])
+    killed = state["players_killed"]
+    killed.clear()
+    for name in snap["players_killed"]:
+        killed.add(name)
+    for rec in reversed(snap["events"]):
+        # Renumber so records added locally (menu actions) stay in the same sequence
+        rec.seq = next(_event_seq)
+        state["events"].appendleft(rec)
+    state["lag_summary"] = snap["lag_summary"]
+    if "heatmap_view" in snap:
+        state["heatmap_view"] = snap["heatmap_view"]
+    state["activity_summary"] = snap["activity"]
+    player_registry.merge(snap["registry"])
+    clock.observe(snap["now"])
+    state.stamp_start(snap["now"])
+
+def parser_process_main(sources, speed: float, api_port, conn, stop):
+    """Child process: tail or replay, parse and export, sending snapshots to the UI until stop is set"""
+    load_config()
+    start_ingest(sources, speed, api_port)
 
-        if len(kept) > max_pings:
-            kept = kept[-max_pings:]
+    last_seq = -1
+    heatmap_version = -1
+    try:
+        while not stop.wait(SNAPSHOT_INTERVAL):
+            while conn.poll():
+                settings = conn.recv()
+                state.update(settings)
+            try:
+                snap = snapshot_state(last_seq, heatmap_version)
+                conn.send(snap)
+            except (EOFError, OSError):
+                raise
+            except Exception as e:
+                # Skip this one; its events and changes go out with the next snapshot
+                add_event(f"[PROCESS] Snapshot skipped: {e!r}", "info")
+                continue
+            if snap["events"]:
+                last_seq = snap["events"][0].seq
+            heatmap_version = snap["heatmap_version"]
+            # Publishing is this process's last stage, so it closes the "ui" lag sample
+            ingest_lag.mark_drawn(time.time())
+    except (EOFError, OSError):
+        pass  # UI went away
+    finally:
+        export_summary_to_file()
+        conn.close()
+
+class ParserProcess:
+    """UI-side handle on parser_process_main running in a child process"""
+    def __init__(self, sources, speed: float, api_port: int = None):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.stop_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=parser_process_main, args=(sources, speed, api_port, child_conn, self.stop_event),
+            name="yapr-parser", daemon=True)
+        self.sent_settings = {}
+
+    def start(self):
+        self.process.start()
+
+    def send_settings(self, **settings):
+        """Forward UI toggles the parser acts on (e.g. sound_enabled), only when they change"""
+        changed = {k: v for k, v in settings.items() if self.sent_settings.get(k) != v}
+        if changed:
+            self.sent_settings.update(changed)
+            try:
+                self.conn.send(changed)
+            except (EOFError, OSError):
+                pass
 
-        for p in kept:
-            p["fresh"] = False
-        if kept:
-            newest = kept[-1]
-            newest["fresh"] = (now - newest.get("ts", 0) <= PING_FLASH_WINDOW)
+    def poll(self) -> bool:
+        """Apply every snapshot waiting in the pipe; False once the child has gone"""
+        try:
+            while self.conn.poll():
+                apply_snapshot(self.conn.recv())
+        except (EOFError, OSError):
+            return False
+        return self.process.is_alive()
 
-        if kept:
-            state["pings"][key] = kept
-        else:
-            state["pings"].pop(key, None)
+    def stop(self):
+        """Ask the child to export and exit, killing it if it doesn't within PARSER_STOP_TIMEOUT"""
+        self.stop_event.set()
+        self.process.join(PARSER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
 
 # ---------------- UI ----------------
 class DarkScrolledText(scrolledtext.ScrolledText):
@@ -1342,7 +3615,7 @@ dark_colors = {
     'alive_fg': '#00ff00', 'dead_fg': '#ff0000', 'incap_fg': '#ffa500',
     'faded_fg': '#90ee90', 'gray_fg': '#a9a9a9', 'line_fill': '#4a5568',
     'npc_kill_fg': '#ffa500', 'player_kill_fg': '#ff4500', 'vehicle_fg': '#00ff00', 'vehicle_destroy_fg': '#ff6600',
-    'vehicle_potential_fg': '#ff0000', 'vehicle_confirmed_fg': '#ffff00'
+    'vehicle_potential_fg': '#ff0000', 'vehicle_confirmed_fg': '#ffff00', 'density_fg': '#3b82f6'
 }
 
 light_colors = {
@@ -1355,12 +3628,13 @@ light_colors = {
     'alive_fg': '#008000', 'dead_fg': '#ff0000', 'incap_fg': '#ff8c00',
     'faded_fg': '#90ee90', 'gray_fg': '#a9a9a9', 'line_fill': '#a9a9a9',
     'npc_kill_fg': '#ff8c00', 'player_kill_fg': '#d2691e', 'vehicle_fg': '#006400', 'vehicle_destroy_fg': '#ff4500',
-    'vehicle_potential_fg': '#cc0000', 'vehicle_confirmed_fg': '#cccc00'
+    'vehicle_potential_fg': '#cc0000', 'vehicle_confirmed_fg': '#cccc00', 'density_fg': '#1d4ed8'
 }
 class RadarApp:
-    def __init__(self, root, state):
+    def __init__(self, root, state, parser_proc=None):
         self.root = root
         self.state = state
+        self.parser_proc = parser_proc
         self.W = 600
         self.H = 720
         self.scale = INITIAL_SCALE
@@ -1373,6 +3647,16 @@ class RadarApp:
         view_menu = tk.Menu(menubar, tearoff=0)
         view_menu.add_checkbutton(label="Dark Mode", variable=self.dark_mode, command=self.toggle_mode)
         view_menu.add_checkbutton(label="Dungeon Sound Alert", variable=self.sound_alert)
+        self.heatmap_layer = tk.StringVar(value="off")
+        heatmap_menu = tk.Menu(view_menu, tearoff=0)
+        heatmap_menu.add_radiobutton(label="Off", value="off", variable=self.heatmap_layer)
+        for layer in HEATMAP_LAYERS:
+            heatmap_menu.add_radiobutton(label=layer.capitalize(), value=layer, variable=self.heatmap_layer)
+        view_menu.add_cascade(label="Heatmap Underlay", menu=heatmap_menu,
+                              state="normal" if np is not None else "disabled")
+        view_menu.add_separator()
+        view_menu.add_command(label="Memory Report", command=self.report_memory)
+        view_menu.add_command(label="Server Sessions", command=self.report_sessions)
         menubar.add_cascade(label="Options", menu=view_menu)
         root.config(menu=menubar)
 
@@ -1387,6 +3671,8 @@ class RadarApp:
         self.canvas = tk.Canvas(root, width=self.W, height=self.H, bg=self.colors['canvas_bg'],
                                 highlightthickness=0, bd=2, relief="ridge")
         self.canvas.grid(row=1, column=0, rowspan=3, padx=(8,4), pady=8, sticky="nsew")
+        self.static_dirty = True  # Rings and self marker need (re)building
+        self.header_key = None    # What the header texts currently show
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)
         self.canvas.bind("<Button-4>", self.on_mousewheel)
         self.canvas.bind("<Button-5>", self.on_mousewheel)
@@ -1411,6 +3697,15 @@ class RadarApp:
 
         ttk.Label(self.panel, text="Recent Events (Newest First)",
                  style="Header.TLabel").grid(row=0, column=0, sticky="ew", pady=(4,0))
+        self.event_filter = tk.StringVar(value="All")
+        filter_box = ttk.Combobox(self.panel, textvariable=self.event_filter, values=list(EVENT_FILTERS),
+                                  state="readonly", width=10)
+        filter_box.grid(row=0, column=0, sticky="e", pady=(4,0))
+        filter_box.bind("<<ComboboxSelected>>", lambda e: self.reset_log())
+        self.log_last_seq = 0
+        self.log_rows = 0
+        self.log_epoch = self.state["radar_epoch"]
+        self.log_events = self.state["events"]
         self.log = DarkScrolledText(self.panel, self.colors, width=80, height=10,
                                    wrap="word", font=("TkDefaultFont",10))
         self.log.grid(row=1, column=0, sticky="nsew", pady=(6,6))
@@ -1422,6 +3717,9 @@ class RadarApp:
                                style="Legend.TLabel")
         self.legend.grid(row=3, column=0, sticky="w", pady=(4,0))
 
+        self.lag_label = ttk.Label(self.panel, text="Lag: waiting for log lines", style="Legend.TLabel")
+        self.lag_label.grid(row=2, column=0, sticky="w", pady=(0,2))
+
         # Kill summary frame
         kill_frame = ttk.Frame(self.panel, style="Dark.TFrame")
         kill_frame.grid(row=3, column=0, sticky="e", pady=(4,0))
@@ -1473,6 +3771,11 @@ class RadarApp:
         self.npc_kills_log.configure(state="normal")
         self.update_kill_tags()  # Call this ONCE at the end after both kill logs exist
 
+        # Rolling activity sparklines
+        self.activity_canvas = tk.Canvas(self.panel, height=ACTIVITY_PANEL_HEIGHT, bg=self.colors['log_bg'],
+                                         highlightthickness=0)
+        self.activity_canvas.grid(row=5, column=0, sticky="ew", pady=(0,6))
+
         self.running = True
 
         # Track if user has manually scrolled
@@ -1506,6 +3809,8 @@ class RadarApp:
         self.refresh()
 
     def on_canvas_resize(self, event):
+        # Recentre the static layer in place; the self marker keeps its pixel size
+        self.canvas.move("static", (event.width - self.W) / 2, (event.height - self.H) / 2)
         self.W = event.width
         self.H = event.height
 
@@ -1513,6 +3818,8 @@ class RadarApp:
         self.colors = dark_colors if self.dark_mode.get() else light_colors
         self.root.configure(bg=self.colors['panel_bg'])
         self.canvas.configure(bg=self.colors['canvas_bg'])
+        self.static_dirty = True
+        self.header_key = None
         self.update_style()
         self.log.update_colors()
         self.players_log.update_colors()
@@ -1523,6 +3830,22 @@ class RadarApp:
         self.update_players_tags()
         self.update_vehicles_tags()
         self.update_kill_tags()
+        self.activity_canvas.configure(bg=self.colors['log_bg'])
+
+    def report_memory(self):
+        report = memory_report()
+        rss = report.pop("rss_mb")
+        sizes = ", ".join(f"{k}={v}" for k, v in report.items())
+        add_event(f"[MEMORY] rss={rss if rss is not None else '?'}MB {sizes}", "info")
+
+    def report_sessions(self):
+        for session in reversed(self.state.sessions()):
+            info = session.summary()
+            start = time.strftime("%H:%M:%S", time.localtime(info["started"])) if info["started"] else "?"
+            end = time.strftime("%H:%M:%S", time.localtime(info["ended"])) if info["ended"] else "now"
+            add_event(f"[SESSION {info['number']}] {start}-{end} "
+                      f"players={info['players']} vehicles={info['vehicles']} kills={info['kills']} "
+                      f"(npc={info['npc_kills']} player={info['player_kills']})", "info")
 
     def update_style(self):
         self.style.configure("Dark.TFrame", background=self.colors['panel_bg'],
@@ -1583,96 +3906,120 @@ class RadarApp:
             setattr(self, f'{log_name}_auto_scroll', True)
 
     def on_mousewheel(self, event):
+        old_scale = self.scale
         if hasattr(event, "delta"):
             self.scale *= 1.12 if event.delta > 0 else 0.88
         else:
             self.scale *= 1.12 if event.num == 4 else 0.88
         self.scale = max(0.2, min(40.0, self.scale))
+        # Rings are world-sized, so zoom them about the centre instead of rebuilding
+        factor = self.scale / old_scale
+        self.canvas.scale("rings", self.W/2, self.H/2, factor, factor)
 
     def world_to_screen(self, dx, dy):
         return self.W/2 + dx * self.scale, self.H/2 - dy * self.scale
 
-    def draw(self):
-        self.canvas.delete("all")
-        now = time.time()
-
+    def build_static_layer(self):
+        """Distance rings and self marker; rebuilt only on theme change, zoom and resize move them"""
+        self.canvas.delete("static")
         for r in (25, 50, 100, 250, 500):
             self.canvas.create_oval(self.W/2 - r*self.scale, self.H/2 - r*self.scale,
                                    self.W/2 + r*self.scale, self.H/2 + r*self.scale,
-                                   outline=self.colors['grid_outline'], width=1)
+                                   outline=self.colors['grid_outline'], width=1, tags=("static", "rings"))
 
         self.canvas.create_oval(self.W/2-PLAYER_DOT_RADIUS, self.H/2-PLAYER_DOT_RADIUS,
                                self.W/2+PLAYER_DOT_RADIUS, self.H/2+PLAYER_DOT_RADIUS,
                                fill=self.colors['player_fill'],
-                               outline=self.colors['player_outline'], width=2)
+                               outline=self.colors['player_outline'], width=2, tags="static")
         self.canvas.create_oval(self.W/2-PLAYER_DOT_RADIUS_INNER, self.H/2-PLAYER_DOT_RADIUS_INNER,
                                self.W/2+PLAYER_DOT_RADIUS_INNER, self.H/2+PLAYER_DOT_RADIUS_INNER,
                                fill=self.colors['player_glow'],
-                               outline=self.colors['player_outline'])
+                               outline=self.colors['player_outline'], tags="static")
+        self.canvas.tag_lower("static")
+        self.static_dirty = False
+
+    def draw_header(self):
+        """Player, vehicle, zoom and zone lines, redrawn only when one of them changes"""
+        current_vehicle = self.state.get("current_vehicle")
+        mentions = list(self.state.get("zone_mentions", []))[:MAX_ZONE_MENTIONS_DISPLAY]
+        key = (self.state.get('player_name', 'Unknown'), current_vehicle, round(self.scale, 2),
+               tuple((src, ztxt) for _, src, ztxt in mentions))
+        if key == self.header_key:
+            return
+        self.header_key = key
+        self.canvas.delete("header")
 
         self.canvas.create_text(12, 10, anchor="nw", text=f"You: {self.state.get('player_name', 'Unknown')}",
-                               fill=self.colors['label_fg'], font=("TkDefaultFont",11,"bold"))
+                               fill=self.colors['label_fg'], font=("TkDefaultFont",11,"bold"), tags="header")
 
-        current_vehicle = self.state.get("current_vehicle")
         if current_vehicle:
             vehicle_display = current_vehicle.split('_')[0] if '_' in current_vehicle else current_vehicle
             self.canvas.create_text(12, 28, anchor="nw", text=f"Vehicle: {vehicle_display}",
-                                   fill=self.colors['vehicle_fg'], font=("TkDefaultFont",10,"bold"))
+                                   fill=self.colors['vehicle_fg'], font=("TkDefaultFont",10,"bold"), tags="header")
             y_offset = 48
         else:
             y_offset = 30
 
         self.canvas.create_text(12, y_offset, anchor="nw", text=f"Zoom: {self.scale:.2f}x",
-                               fill=self.colors['zoom_fg'], font=("TkDefaultFont",10))
+                               fill=self.colors['zoom_fg'], font=("TkDefaultFont",10), tags="header")
 
         y = y_offset + 18
-        mentions = list(self.state.get("zone_mentions", []))[:MAX_ZONE_MENTIONS_DISPLAY]
         for ts, src, ztxt in reversed(mentions):
             label = f"{src}: {ztxt}" if src else str(ztxt)
             self.canvas.create_text(12, y, anchor="nw", text=label,
-                                   fill=self.colors['label_fg'], font=("TkDefaultFont",9))
+                                   fill=self.colors['label_fg'], font=("TkDefaultFont",9), tags="header")
             y += 16
+        # Header sits above the rings but below everything drawn per frame
+        self.canvas.tag_lower("header")
+        self.canvas.tag_lower("static")
+
+    def draw(self):
+        self.canvas.delete("dynamic")
+        now = clock.now()
+
+        if self.static_dirty:
+            self.build_static_layer()
+        self.draw_header()
+
+        player_pos = self.state.get("player_pos") or (0.0, 0.0, 0.0)
+        self.draw_heatmap(player_pos)
+        self.draw_density(player_pos)
 
         placed_label_boxes = []
         all_pings = []
         for manager, ping_list in self.state["pings"].items():
+            newest_idx = len(ping_list) - 1
             for idx, ping in enumerate(ping_list):
-                all_pings.append({'manager': manager, 'ping': ping, 'idx': idx})
+                all_pings.append({'manager': manager, 'ping': ping, 'is_newest': idx == newest_idx})
 
-        player_pos = self.state.get("player_pos") or (0.0, 0.0, 0.0)
         all_pings.sort(key=lambda item: self.world_to_screen(
-            item['ping'].get('pos', (0,0,0))[0] - player_pos[0],
-            item['ping'].get('pos', (0,0,0))[1] - player_pos[1])[1])
+            item['ping'].pos[0] - player_pos[0],
+            item['ping'].pos[1] - player_pos[1])[1])
 
+        # Place every live ping: overlays stack in their corner, positioned ones are
+        # culled to an edge arrow when off-canvas and clustered when they overlap
         overlay_top_row = 0
         overlay_bottom_row = 0
         overlay_bottom_left_row = 0
+        placed = []
+        offscreen = []
         for item in all_pings:
-            manager, ping, idx = item['manager'], item['ping'], item['idx']
-            is_newest = (idx == len(self.state["pings"][manager]) - 1)
-            age = now - ping["ts"]
-            lifetime = (DUNGEON_PING_LIFETIME if ping.get('tag') == 'dungeon'
-                       else NPC_KILL_LIFETIME if ping.get('tag') in ('npc_kill','player_kill')
-                       else (60.0 if ping.get('tag') == 'vehicle'
-                            else (30.0 if ping.get('tag') in ('vehicle_potential', 'vehicle_confirmed')
-                                 else (EXIT_PING_LIFETIME if ping.get('tag') == 'exit' else PING_LIFETIME))))
-            if age > lifetime or not ping.get("pos"):
+            ping = item['ping']
+            age = now - ping.ts
+            lifetime = PING_LIFETIMES[ping.tag]
+            if age > lifetime or not ping.pos:
                 continue
+            item['age'] = age
+            item['color'] = get_color_for_age(age, lifetime, item['is_newest'], ping.tag, self.colors)
 
-            is_overlay = bool(ping.get('overlay'))
-
-            if is_overlay:
+            anchor = ping.anchor
+            if anchor != Anchor.NONE:
                 margin = 12
-                anchor = ping.get('overlay_anchor', 'top_right')
-                if anchor == 'top_right':
-                    sx = self.W - margin
-                    sy = 48 + overlay_top_row * STACK_OFFSET_PX
-                    overlay_top_row += 1
-                elif anchor == 'bottom_right':
+                if anchor == Anchor.BOTTOM_RIGHT:
                     sx = self.W - margin
                     sy = self.H - (48 + overlay_bottom_row * STACK_OFFSET_PX)
                     overlay_bottom_row += 1
-                elif anchor == 'bottom_left':
+                elif anchor == Anchor.BOTTOM_LEFT:
                     sx = margin
                     sy = self.H - (48 + overlay_bottom_left_row * STACK_OFFSET_PX)
                     overlay_bottom_left_row += 1
@@ -1681,111 +4028,278 @@ class RadarApp:
                     sy = 48 + overlay_top_row * STACK_OFFSET_PX
                     overlay_top_row += 1
             else:
-                dx, dy = ping["pos"][0] - player_pos[0], ping["pos"][1] - player_pos[1]
+                dx, dy = ping.pos[0] - player_pos[0], ping.pos[1] - player_pos[1]
                 sx, sy = self.world_to_screen(dx, dy)
+                if not self.on_canvas(sx, sy):
+                    offscreen.append((sx, sy, item['color']))
+                    continue
+            placed.append((sx, sy, item))
+
+        positioned = [i for i, p in enumerate(placed) if p[2]['ping'].anchor == Anchor.NONE]
+        groups = cluster_points([placed[i][:2] for i in positioned], CLUSTER_RADIUS_PX)
+        cluster_of = {}
+        for group in groups:
+            if len(group) > 1:
+                members = [positioned[g] for g in group]
+                for m in members:
+                    cluster_of[m] = members
+
+        drawn_clusters = set()
+        for idx, (sx, sy, item) in enumerate(placed):
+            members = cluster_of.get(idx)
+            if members is None:
+                self.draw_ping(sx, sy, item, placed_label_boxes)
+            elif members[0] not in drawn_clusters:
+                drawn_clusters.add(members[0])
+                self.draw_cluster([placed[m] for m in members], placed_label_boxes)
+
+        edge_seen = set()
+        for sx, sy, color in offscreen:
+            ex, ey = self.edge_point(sx, sy)
+            key = (int(ex // EDGE_MARKER_SPACING_PX), int(ey // EDGE_MARKER_SPACING_PX))
+            if key not in edge_seen:
+                edge_seen.add(key)
+                self.draw_edge_marker(sx, sy, color)
+
+        ent_points = []
+        for name, ent in list(self.state["entities"].items()):
+            if not ent.pos or name in self.state["pings"] or name == PLAYER_NAME:
+                continue
+            dx, dy = ent.pos[0] - player_pos[0], ent.pos[1] - player_pos[1]
+            sx, sy = self.world_to_screen(dx, dy)
+            col = (self.colors['player_fg'] if ent.type == Tag.PLAYER
+                  else self.colors['transit_fg'])
+            if not self.on_canvas(sx, sy):
+                continue
+            ent_points.append((sx, sy, name, col))
+
+        for group in cluster_points([p[:2] for p in ent_points], CLUSTER_RADIUS_PX):
+            if len(group) == 1:
+                sx, sy, name, col = ent_points[group[0]]
+                self.canvas.create_oval(sx-6, sy-6, sx+6, sy+6,
+                                       fill=col, outline="#ffffff", width=1, tags="dynamic")
+                self.canvas.create_text(sx+10, sy, anchor="w", text=name,
+                                       fill=self.colors['label_fg'], font=self.label_font, tags="dynamic")
+                continue
+            members = [ent_points[g] for g in group]
+            sx = sum(m[0] for m in members) / len(members)
+            sy = sum(m[1] for m in members) / len(members)
+            names = ", ".join(m[2] for m in members[:3]) + (" ..." if len(members) > 3 else "")
+            self.canvas.create_oval(sx-9, sy-9, sx+9, sy+9,
+                                   fill=members[0][3], outline="#ffffff", width=1, tags="dynamic")
+            self.canvas.create_text(sx, sy, text=str(len(members)),
+                                   fill=self.colors['canvas_bg'], font=("TkDefaultFont",8,"bold"), tags="dynamic")
+            self.canvas.create_text(sx+13, sy, anchor="w", text=names,
+                                   fill=self.colors['label_fg'], font=self.label_font, tags="dynamic")
+
+    def on_canvas(self, sx, sy) -> bool:
+        return 0 <= sx <= self.W and 0 <= sy <= self.H
+
+    def edge_point(self, sx, sy):
+        """Where the line from the radar centre towards (sx, sy) meets the canvas margin"""
+        cx, cy = self.W/2, self.H/2
+        dx, dy = sx - cx, sy - cy
+        m = EDGE_MARKER_MARGIN_PX
+        t = min((cx - m) / abs(dx) if dx else math.inf,
+                (cy - m) / abs(dy) if dy else math.inf)
+        return cx + dx * t, cy + dy * t
+
+    def draw_edge_marker(self, sx, sy, color):
+        """Arrow on the canvas edge pointing at an off-canvas ping"""
+        ex, ey = self.edge_point(sx, sy)
+        dx, dy = sx - self.W/2, sy - self.H/2
+        d = math.hypot(dx, dy) or 1.0
+        ux, uy = dx / d, dy / d
+        s = 7
+        self.canvas.create_polygon(ex + ux*s, ey + uy*s,
+                                   ex - ux*s - uy*s*0.7, ey - uy*s + ux*s*0.7,
+                                   ex - ux*s + uy*s*0.7, ey - uy*s - ux*s*0.7,
+                                   fill=color, outline=self.colors['canvas_bg'], tags="dynamic")
+
+    def place_label(self, label_sx_start, sy, label_width, placed_label_boxes):
+        """Nudge a label down until it clears the ones already placed, return its y"""
+        label_height = self.label_font.metrics("linespace")
+        final_label_sy = sy
+        for _ in range(10):
+            current_box = (label_sx_start, final_label_sy - label_height/2,
+                          label_sx_start + label_width, final_label_sy + label_height/2)
+            overlap = False
+            for pb in placed_label_boxes:
+                if not (current_box[2] < pb[0] or current_box[0] > pb[2] or
+                       current_box[3] < pb[1] or current_box[1] > pb[3]):
+                    overlap = True
+                    break
+            if not overlap:
+                break
+            final_label_sy += label_height * 0.6
 
-            color = get_color_for_age(age, lifetime, is_newest, ping["tag"], self.colors)
+        placed_label_boxes.append((label_sx_start, final_label_sy - label_height/2,
+                                  label_sx_start + label_width, final_label_sy + label_height/2))
+        return final_label_sy
 
-            player_name_str = f"{ping['player_name']} | " if ping.get("player_name") else ""
-            victim_name_str = f"{ping.get('victim_name', '')} | " if ping.get("victim_name") else ""
-            vehicle_name_str = f"{ping.get('vehicle_name', '').split('_')[0]} | " if ping.get("vehicle_name") else ""
-            attacker_str = f"by {ping.get('attacker', '')} | " if ping.get("attacker") else ""
+    def draw_ping(self, sx, sy, item, placed_label_boxes):
+        manager, ping, is_newest = item['manager'], item['ping'], item['is_newest']
+        age, color = item['age'], item['color']
+        anchor = ping.anchor
+        is_overlay = anchor != Anchor.NONE
 
-            display_name = re.sub(r'TransitManager[-_]?','', manager).strip()
-            display_name = display_name if len(display_name) <= 30 else (display_name[:27] + "...")
+        player_name_str = f"{ping.player_name} | " if ping.player_name else ""
+        victim_name_str = f"{ping.victim_name} | " if ping.victim_name else ""
+        vehicle_name_str = f"{ping.vehicle_name.split('_')[0]} | " if ping.vehicle_name else ""
+        attacker_str = f"by {ping.attacker} | " if ping.attacker else ""
 
-            age_str = f"({int(age)}s ago)"
-            label = f"{player_name_str}{victim_name_str}{vehicle_name_str}{attacker_str}{display_name} | {ping['action']} | {age_str}"
+        display_name = re.sub(r'TransitManager[-_]?','', manager).strip()
+        display_name = display_name if len(display_name) <= 30 else (display_name[:27] + "...")
 
-            lbl_col = self.colors['player_fg'] if ping.get("player_name") else color
+        age_str = f"({int(age)}s ago)"
+        label = f"{player_name_str}{victim_name_str}{vehicle_name_str}{attacker_str}{display_name} | {ping.action} | {age_str}"
 
-            label_width = self.label_font.measure(label)
-            label_height = self.label_font.metrics("linespace")
+        lbl_col = self.colors['player_fg'] if ping.player_name else color
 
-            if is_overlay:
-                if ping.get('overlay_anchor') == 'bottom_left':
-                    label_sx_start = sx
-                    text_anchor = "w"
-                else:
-                    label_sx_start = sx - label_width
-                    text_anchor = "w"
+        label_width = self.label_font.measure(label)
+
+        if is_overlay:
+            if anchor == Anchor.BOTTOM_LEFT:
+                label_sx_start = sx
+                text_anchor = "w"
             else:
-                label_sx_start = sx + 12
+                label_sx_start = sx - label_width
                 text_anchor = "w"
+        else:
+            label_sx_start = sx + 12
+            text_anchor = "w"
 
-            final_label_sy = sy
-            for _ in range(10):
-                current_box = (label_sx_start, final_label_sy - label_height/2,
-                              label_sx_start + label_width, final_label_sy + label_height/2)
-                overlap = False
-                for pb in placed_label_boxes:
-                    if not (current_box[2] < pb[0] or current_box[0] > pb[2] or
-                           current_box[3] < pb[1] or current_box[1] > pb[3]):
-                        overlap = True
-                        break
-                if not overlap:
-                    break
-                final_label_sy += label_height * 0.6
-
-            placed_label_boxes.append((label_sx_start, final_label_sy - label_height/2,
-                                      label_sx_start + label_width, final_label_sy + label_height/2))
+        final_label_sy = self.place_label(label_sx_start, sy, label_width, placed_label_boxes)
 
-            r = 8 if is_newest else 6
-            outline_col = "#ffffff"
+        r = 8 if is_newest else 6
+        outline_col = "#ffffff"
 
-            is_kill = ping["tag"] in ("npc_kill", "player_kill", "vehicle")
+        is_kill = ping.tag in KILL_TAGS
 
-            if is_kill:
-                self.canvas.create_rectangle(sx-r-1, sy-r-1, sx+r+1, sy+r+1,
-                                           fill=color, outline=outline_col, width=1)
-                self.canvas.create_rectangle(sx-r, sy-r, sx+r, sy+r,
-                                           fill=color, outline=self.colors['canvas_bg'])
+        if is_kill:
+            self.canvas.create_rectangle(sx-r-1, sy-r-1, sx+r+1, sy+r+1,
+                                       fill=color, outline=outline_col, width=1, tags="dynamic")
+            self.canvas.create_rectangle(sx-r, sy-r, sx+r, sy+r,
+                                       fill=color, outline=self.colors['canvas_bg'], tags="dynamic")
+        else:
+            self.canvas.create_oval(sx-r-1, sy-r-1, sx+r+1, sy+r+1,
+                                   fill=color, outline=outline_col, width=1, tags="dynamic")
+            self.canvas.create_oval(sx-r, sy-r, sx+r, sy+r,
+                                   fill=color, outline=self.colors['canvas_bg'], tags="dynamic")
+
+        self.canvas.create_text(label_sx_start, final_label_sy, anchor=text_anchor,
+                               text=label, fill=lbl_col, font=self.label_font, tags="dynamic")
+
+        if abs(final_label_sy - sy) > 1:
+            if anchor == Anchor.BOTTOM_LEFT:
+                line_start_x = sx + r
+                line_end_x = label_sx_start - 3
+            elif is_overlay:
+                line_start_x = sx - r
+                line_end_x = label_sx_start - 3
             else:
-                self.canvas.create_oval(sx-r-1, sy-r-1, sx+r+1, sy+r+1,
-                                       fill=color, outline=outline_col, width=1)
-                self.canvas.create_oval(sx-r, sy-r, sx+r, sy+r,
-                                       fill=color, outline=self.colors['canvas_bg'])
-
-            self.canvas.create_text(label_sx_start, final_label_sy, anchor=text_anchor,
-                                   text=label, fill=lbl_col, font=self.label_font)
-
-            if abs(final_label_sy - sy) > 1:
-                if ping.get('overlay_anchor') == 'bottom_left':
-                    line_start_x = sx + r
-                    line_end_x = label_sx_start - 3
-                elif is_overlay:
-                    line_start_x = sx - r
-                    line_end_x = label_sx_start - 3
-                else:
-                    line_start_x = sx + r
-                    line_end_x = label_sx_start - 3
-                self.canvas.create_line(line_start_x, sy, line_end_x, final_label_sy,
-                                       fill=self.colors['line_fill'], dash=(2,2))
-
-        for name, ent in list(self.state["entities"].items()):
-            if not ent.get("pos") or name in self.state["pings"] or name == PLAYER_NAME:
+                line_start_x = sx + r
+                line_end_x = label_sx_start - 3
+            self.canvas.create_line(line_start_x, sy, line_end_x, final_label_sy,
+                                   fill=self.colors['line_fill'], dash=(2,2), tags="dynamic")
+
+    def draw_cluster(self, members, placed_label_boxes):
+        """One marker with a count for pings that would overlap at this zoom"""
+        sx = sum(m[0] for m in members) / len(members)
+        sy = sum(m[1] for m in members) / len(members)
+        newest = max(members, key=lambda m: m[2]['ping'].ts)[2]
+        color = newest['color']
+        managers = []
+        for _, _, item in members:
+            name = re.sub(r'TransitManager[-_]?','', item['manager']).strip()
+            if name not in managers:
+                managers.append(name)
+        label = f"{len(members)} pings | {', '.join(managers[:3])}{' ...' if len(managers) > 3 else ''} | ({int(newest['age'])}s ago)"
+        label_width = self.label_font.measure(label)
+        label_sx_start = sx + 15
+        final_label_sy = self.place_label(label_sx_start, sy, label_width, placed_label_boxes)
+
+        r = 11
+        self.canvas.create_oval(sx-r-1, sy-r-1, sx+r+1, sy+r+1,
+                               fill=color, outline="#ffffff", width=1, tags="dynamic")
+        self.canvas.create_text(sx, sy, text=str(len(members)),
+                               fill=self.colors['canvas_bg'], font=("TkDefaultFont",9,"bold"), tags="dynamic")
+        self.canvas.create_text(label_sx_start, final_label_sy, anchor="w",
+                               text=label, fill=color, font=self.label_font, tags="dynamic")
+        if abs(final_label_sy - sy) > 1:
+            self.canvas.create_line(sx + r, sy, label_sx_start - 3, final_label_sy,
+                                   fill=self.colors['line_fill'], dash=(2,2), tags="dynamic")
+
+    def draw_heatmap(self, player_pos):
+        """Underlay the chosen heatmap layer for the zone it was last updated in"""
+        layer = self.heatmap_layer.get()
+        if layer == "off":
+            return
+        views = self.state.get("heatmap_view", {}) if self.parser_proc else heatmaps.view()
+        if layer not in views:
+            return
+        zone, cells = views[layer]
+        color = self.colors[HEATMAP_COLOR_KEYS[layer]]
+        for x, y, size, intensity in cells:
+            sx0, sy0 = self.world_to_screen(x - player_pos[0], y + size - player_pos[1])
+            sx1, sy1 = self.world_to_screen(x + size - player_pos[0], y - player_pos[1])
+            if sx1 < 0 or sy1 < 0 or sx0 > self.W or sy0 > self.H:
                 continue
-            dx, dy = ent["pos"][0] - player_pos[0], ent["pos"][1] - player_pos[1]
-            sx, sy = self.world_to_screen(dx, dy)
+            col = interpolate_color(self.colors['canvas_bg'], color, 0.15 + 0.85 * intensity)
+            self.canvas.create_rectangle(sx0, sy0, sx1, sy1, fill=col, outline="", tags="dynamic")
+        self.canvas.create_text(self.W - 12, self.H - 12, anchor="se", text=f"Heatmap: {layer} @ {zone}",
+                               fill=self.colors['zoom_fg'], font=("TkDefaultFont",9), tags="dynamic")
+
+    def draw_density(self, player_pos):
+        """Shade grid cells by how many unnamed positions landed in them"""
+        cells = self.state["position_grid"].items()
+        if not cells:
+            return
+        peak = max(c[2] for c in cells)
+        half = max(2.0, self.state["position_grid"].cell_size * self.scale / 2)
+        for cx, cy, count, _ in cells:
+            sx, sy = self.world_to_screen(cx - player_pos[0], cy - player_pos[1])
+            if sx < -half or sy < -half or sx > self.W + half or sy > self.H + half:
+                continue
+            ratio = 0.25 + 0.75 * (count / peak)
+            col = interpolate_color(self.colors['canvas_bg'], self.colors['density_fg'], ratio)
+            self.canvas.create_rectangle(sx - half, sy - half, sx + half, sy + half, fill=col, outline="", tags="dynamic")
 
-            col = (self.colors['player_fg'] if ent.get("type")=="player"
-                  else self.colors['transit_fg'])
-            self.canvas.create_oval(sx-6, sy-6, sx+6, sy+6,
-                                   fill=col, outline="#ffffff", width=1)
-            self.canvas.create_text(sx+10, sy, anchor="w", text=name,
-                                   fill=self.colors['label_fg'], font=self.label_font)
+    def reset_log(self):
+        """Rebuild the events panel from scratch on the next refresh (filter change)"""
+        self.log_last_seq = -1
 
     def update_log(self):
         # Save current scroll position
         current_yview = self.log.yview()[0]
 
-        self.log.delete("1.0", tk.END)
-        for text, tag in list(self.state["events"]):
+        events = self.state["events"]
+        newest_seq = events[0].seq if events else 0
+
+        # Sequence numbers never go back, so a cleared feed is told apart by its deque being replaced
+        if self.log_epoch != self.state["radar_epoch"] or events is not self.log_events or self.log_last_seq < 0:
+            # New server session, cleared feed or the filter changed
+            self.log.delete("1.0", tk.END)
+            self.log_rows = 0
+            self.log_last_seq = 0
+            self.log_epoch = self.state["radar_epoch"]
+            self.log_events = events
+
+        # Only records newer than the last refresh are formatted and inserted
+        fresh = filter_events(events, self.event_filter.get(), after_seq=self.log_last_seq)
+        for rec in reversed(fresh):
+            self.log.insert("1.0", "-"*80 + "\n", "info")
             try:
-                self.log.insert(tk.END, text + "\n", tag)
+                self.log.insert("1.0", format_event(rec) + "\n", rec.tag)
             except Exception:
-                self.log.insert(tk.END, text + "\n")
-            self.log.insert(tk.END, "-"*80 + "\n", "info")
+                self.log.insert("1.0", format_event(rec) + "\n")
+        self.log_rows += len(fresh)
+        self.log_last_seq = newest_seq
+
+        if self.log_rows > EVENT_LOG_SIZE:
+            # Each row is the event line plus its separator line
+            self.log.delete(f"{EVENT_LOG_SIZE * 2 + 1}.0", tk.END)
+            self.log_rows = EVENT_LOG_SIZE
 
         # Only auto-scroll to top if user hasn't manually scrolled
         if self.log_auto_scroll:
@@ -1793,34 +4307,67 @@ class RadarApp:
         else:
             self.log.yview_moveto(current_yview)
 
+    def update_activity(self):
+        """Four cells of current value plus a sparkline over the last ACTIVITY_WINDOW seconds"""
+        summary = (self.state.get("activity_summary") if self.parser_proc
+                   else self.state["activity"].summary(clock.now()))
+        c = self.activity_canvas
+        c.delete("all")
+        if not summary:
+            return
+        top = ", ".join(f"{m} {n}" for m, n in summary["dungeon_top"])
+        cells = (
+            (f"Kills/min {summary['kills_per_min']}", summary["kills_series"], 'player_kill_fg'),
+            (f"Players 5m {summary['players_5m']} / 15m {summary['players_15m']}", summary["sightings_series"], 'player_fg'),
+            (f"Dungeon starts 15m {summary['dungeon_starts']}" + (f" ({top})" if top else ""),
+             summary["dungeon_series"], 'dungeon_fg'),
+            (f"Hostility hits/min {summary['hostility_per_min']}", summary["hostility_series"], 'incap_fg'),
+        )
+        width = max(c.winfo_width(), 400) / len(cells)
+        spark_top, spark_bottom = 20, ACTIVITY_PANEL_HEIGHT - 4
+        for i, (text, series, color_key) in enumerate(cells):
+            x0 = i * width + 6
+            c.create_text(x0, 4, anchor="nw", text=text, fill=self.colors['legend_fg'],
+                          font=("TkDefaultFont", 8))
+            peak = max(series) or 1
+            step = (width - 12) / max(len(series) - 1, 1)
+            points = []
+            for j, v in enumerate(series):
+                points += [x0 + j * step, spark_bottom - (spark_bottom - spark_top) * v / peak]
+            c.create_line(*points, fill=self.colors[color_key], width=1)
+
     def update_players(self):
         self.players_log.delete("1.0", tk.END)
-        now = time.time()
-        players = [(v["last_seen"], k, v) for k, v in self.state["entities"].items()
-                  if v.get("type") == "player" and k != self.state.get("player_name", "Unknown") and is_valid_player_name(k)]
-        players.sort(reverse=True)
+        now = clock.now()
+        players = [(v.last_seen, k, v) for k, v in list(self.state["entities"].items())
+                  if v.type == Tag.PLAYER and k != self.state.get("player_name", "Unknown") and is_valid_player_name(k)]
+        players.sort(key=lambda p: (p[0], p[1]), reverse=True)
 
         for last, name, ent in players:
             age = int(now - last)
             status_parts = []
 
-            if ent.get("spawn_reset") and (now - ent.get("spawn_reset_ts", 0) < 300):
+            recent_reset = ent.spawn_reset_ts and (now - ent.spawn_reset_ts < 300)
+            if recent_reset:
                 status_parts.append("Reset Spawn")
 
-            if ent.get("status") == "dead":
-                death_age = int(now - ent.get("death_ts", now))
+            if ent.status == Status.DEAD:
+                death_age = int(now - (ent.death_ts or now))
                 status_parts.append(f"dead for {death_age}s")
                 tag = 'dead'
-            elif ent.get("status") == "incap":
+            elif ent.status == Status.INCAP:
                 status_parts.append("incap")
                 tag = 'incap'
             else:
                 tag = 'alive' if age < 180 else 'faded' if age < 300 else 'gray'
 
-            if ent.get("spawn_reset") and (now - ent.get("spawn_reset_ts", 0) < 300):
+            if recent_reset:
                 tag = 'faded'
 
             status_parts.append(f"seen {age}s ago")
+            history = player_registry.get(name)
+            if history and history.describe():
+                status_parts.append(history.describe())
 
             status_str = ", ".join(status_parts)
             text = f"{name} ({status_str})\n"
@@ -1833,7 +4380,7 @@ class RadarApp:
 
     def update_vehicles(self):
         self.vehicles_log.delete("1.0", tk.END)
-        now = time.time()
+        now = clock.now()
 
         if self.state.get("pending_vehicle"):
             pv = self.state["pending_vehicle"]
@@ -1847,29 +4394,27 @@ class RadarApp:
             self.vehicles_log.insert(tk.END, "No vehicles detected\n", "gray")
             return
 
-        vehicles = sorted(self.state["vehicles"].items(),
-                         key=lambda x: x[1].get("last_update", 0), reverse=True)
+        vehicles = sorted(list(self.state["vehicles"].items()),
+                         key=lambda x: x[1].last_update, reverse=True)
 
         for vid, vehicle in vehicles:
-            age = int(now - vehicle.get("last_update", now))
-            state_names = {0: "Alive", 1: "Softed", 2: "FullDead"}
-            state_name = state_names.get(vehicle.get("state", 0), "Unknown")
+            age = int(now - vehicle.last_update)
+            state_name = VEHICLE_STATE_NAMES.get(vehicle.state, "Unknown")
 
-            if vehicle.get("state") == 2:
+            if vehicle.state == 2:
                 tag = 'dead'
-            elif vehicle.get("state") == 1:
+            elif vehicle.state == 1:
                 tag = 'softed'
             else:
                 tag = 'alive'
 
-            vname = vehicle.get("name", "Unknown")
+            vname = vehicle.name or "Unknown"
             vname_short = vname.split('_')[0] if '_' in vname else vname
 
             text = f"{vname_short} - {state_name}"
 
-            if vehicle.get("history"):
-                latest = vehicle["history"][-1]
-                attacker = latest.get("attacker", "Unknown")
+            if vehicle.history:
+                attacker = vehicle.history[-1].attacker
                 if attacker and attacker != "unknown":
                     text += f" (by {attacker})"
 
@@ -1917,6 +4462,11 @@ class RadarApp:
         if not self.running:
             return
         self.state["sound_enabled"] = self.sound_alert.get()
+        if self.parser_proc:
+            self.parser_proc.send_settings(sound_enabled=self.state["sound_enabled"])
+            if not self.parser_proc.poll() and not self.parser_proc.stop_event.is_set():
+                add_event("[ERROR] Parser process stopped", "info")
+                self.parser_proc.stop_event.set()
 
         version = self.state.get("game_version", "Unknown")
         if version != "Unknown":
@@ -1937,51 +4487,234 @@ class RadarApp:
         try:
             self.draw()
             self.update_log()
+            if self.parser_proc:
+                self.lag_label.configure(text=self.state.get("lag_summary", ""))
+            else:
+                ingest_lag.mark_drawn(time.time())
+                self.lag_label.configure(text=status_summary())
             self.update_players()
             self.update_vehicles()
             self.update_player_kills()
             self.update_npc_kills()
+            self.update_activity()
         except Exception as e:
             print("UI update error:", e)
         self.root.after(300, self.refresh)
 
+# ---------------- REGEX BENCHMARK ----------------
+# Openings of the line patterns repeated without their endings, plus plain filler.
+# Repeating an opening is what makes a .*? pattern rescan the rest of the line once per occurrence.
+REGEX_BENCH_FRAGMENTS = (
+    "x", " ", "'", ".", "a_b ",
+    "CActor::Kill: 'a' ", "in zone 'z' killed by ", "Player 'a' [1] ", "[ActorState] Corpse Player 'a' ",
+    'name = "a" ', "geid 1 ", "<Jump Drive State Changed> Now A ", "CVehicle::Initialize ",
+    "<lambda_1>::operator ", "<Setup Envelope Failure> | ", "<Spawn Flow> Player 'a' [1] ",
+    "Fake hit FROM a TO b", 'nickname="', "at position x: 1, y: 1, ", "Carriage 1 (Id: 1) for manager ",
+    "Logged an incap.! nickname: ", "Actor stall detected, Player: ", "Player 'a ", "CActor::Kill: 'a ",
+    "LandingArea - Door: a, ", "LandingArea - Door: a, State: ",
+)
+
+def regex_bench_corpus(length: int = REGEX_BENCH_LINE_LENGTH) -> dict:
+    """Adversarial Game.log lines of about length characters, by description"""
+    prefix = "<2025-01-01T00:00:00.000Z> [Notice] "
+    lines = {f"repeat {frag!r}": prefix + frag * (length // len(frag)) for frag in REGEX_BENCH_FRAGMENTS}
+    names = "".join(f'name = "n{i}" ' for i in range(length // 14))
+    lines["distinct names"] = prefix + names[:length]
+    return lines
+
+def line_patterns() -> dict:
+    """Every line pattern in this module (compiled *_re and the step-wise ones) and the rules file, by name"""
+    patterns = {name: value for name, value in globals().items()
+                if name.endswith("_re") and isinstance(value, (re.Pattern, SequencePattern, RepeatPattern))}
+    detection_rules.refresh(time.monotonic())
+    patterns.update((f"rule {rule.name}", rule.pattern) for rule in detection_rules.compiled.rules
+                    if rule.origin == "file")
+    return patterns
+
+def _time_search(pattern, line: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pattern.search(line)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def bench_regex(length: int = REGEX_BENCH_LINE_LENGTH, repeat: int = 3) -> list:
+    """(worst ms, growth, name, line) per line pattern, slowest first.
+
+    growth is how much longer the worst line takes at twice the length: about 2 for
+    a linear scan, 4 or more when the pattern rescans the line per occurrence.
+    """
+    corpus = regex_bench_corpus(length)
+    doubled = regex_bench_corpus(length * 2)
+    results = []
+    for name, pattern in line_patterns().items():
+        ms, desc = max((_time_search(pattern, line, repeat), desc) for desc, line in corpus.items())
+        growth = _time_search(pattern, doubled[desc], repeat) / ms if ms else 1.0
+        results.append((ms, growth, name, desc))
+    results.sort(reverse=True)
+    return results
+
+def print_regex_bench(length: int = REGEX_BENCH_LINE_LENGTH):
+    print(f"Worst case per line pattern over {len(regex_bench_corpus(length))} adversarial lines of ~{length} chars")
+    print(f"{'ms':>10}  {'x2 len':>6}  {'pattern':28} worst line")
+    for ms, growth, name, desc in bench_regex(length):
+        flag = "  SLOW" if ms > REGEX_BENCH_BUDGET_MS or growth > 3 else ""
+        print(f"{ms:10.3f}  {growth:6.1f}  {name:28} {desc}{flag}")
+
+# ---------------- REPLAY CHECK ----------------
+def _replay_events_main(path: str, conn):
+    """Child process: replay path as fast as possible, writing nothing next to the app, and send back every event"""
+    global clock, EXPORT_LOG_PATH
+    scratch = tempfile.mkdtemp(prefix="yapr-check-")
+    EXPORT_LOG_PATH = os.path.join(scratch, os.path.basename(EXPORT_LOG_PATH))
+    heatmaps.path = os.path.join(scratch, os.path.basename(heatmaps.path))
+    player_registry.path = os.path.join(scratch, os.path.basename(player_registry.path))
+    clock = LogClock(0)
+
+    def ingest():
+        run_sources([LogSource("REPLAY", path, replay=True)], line_q, 0)
+        line_q.put(None)
+
+    threading.Thread(target=ingest, daemon=True).start()
+    recent_lines = collections.deque(maxlen=400)
+    texts = []
+    last_seq = 0
+    try:
+        while True:
+            item = line_q.get()
+            if item is None:
+                break
+            parse_line(item, recent_lines)
+            new = filter_events(state["events"], after_seq=last_seq)
+            if new:
+                last_seq = new[0].seq
+                texts.extend(format_event(rec) for rec in reversed(new))
+        conn.send(texts)
+    finally:
+        conn.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def check_replay(path: str) -> bool:
+    """Replay path twice, each in a fresh process, and report whether both runs logged the same events"""
+    runs = []
+    for _ in range(2):
+        conn, child_conn = multiprocessing.Pipe()
+        proc = multiprocessing.Process(target=_replay_events_main, args=(path, child_conn), daemon=True)
+        proc.start()
+        try:
+            runs.append(conn.recv())
+        except EOFError:
+            print(f"Replaying {path} failed, see the error above")
+            return False
+        finally:
+            proc.join()
+    first, second = runs
+    if first == second:
+        print(f"Replayed {os.path.basename(path)} twice: the same {len(first)} events both times")
+        return True
+    at = next((i for i, (a, b) in enumerate(zip(first, second)) if a != b), min(len(first), len(second)))
+    print(f"Replays of {os.path.basename(path)} differ at event {at + 1} ({len(first)} vs {len(second)} events)")
+    print(f"  first:  {first[at] if at < len(first) else '(none)'}")
+    print(f"  second: {second[at] if at < len(second) else '(none)'}")
+    return False
+
 # ---------------- MAIN ----------------
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Yertz Advanced Personal Reporter")
+    parser.add_argument("--replay", metavar="LOG",
+                        help="replay a recorded Game.log instead of tailing the live one")
+    parser.add_argument("--speed", type=float, default=REPLAY_SPEED,
+                        help="replay speed multiplier, 0 = as fast as possible (default: %(default)s)")
+    parser.add_argument("--source", action="append", default=[], metavar="NAME[=PATH]",
+                        help="tail this log too, e.g. PTU, EPTU or NAME=path/to/Game.log (repeatable, default: LIVE)")
+    parser.add_argument("--api", type=int, metavar="PORT",
+                        help="stream state changes as NDJSON on 127.0.0.1:PORT for overlays")
+    parser.add_argument("--process", action="store_true",
+                        help="run tailing and parsing in a child process so bursts don't stall the UI")
+    parser.add_argument("--bench-regex", action="store_true",
+                        help="time every line pattern against long adversarial lines and exit")
+    parser.add_argument("--check-replay", metavar="LOG",
+                        help="replay a recorded Game.log twice, check both runs log the same events and exit")
+    return parser.parse_args(argv)
+
+def build_sources(args) -> list:
+    sources = [LogSource("REPLAY", args.replay, replay=True)] if args.replay else []
+    sources += [parse_source_spec(spec) for spec in args.source]
+    return sources or [LogSource("LIVE", LOG_PATH)]
+
+def start_ingest(sources, speed: float, api_port: int = None):
+    """Start the source, parser, export and API threads; replaying switches to the log clock"""
+    global clock, api_hub
+    if any(src.replay for src in sources):
+        # Ages, expiries and association windows follow the recorded timestamps
+        clock = LogClock(speed)
+    else:
+        tailed = [src for src in sources if os.path.exists(src.path)]
+        if tailed:
+            threading.Thread(target=scan_log_for_metadata, args=(tailed[0].path,), daemon=True).start()
+    threading.Thread(target=run_sources, args=(sources, line_q, speed), daemon=True).start()
+    threading.Thread(target=parser_loop, args=(line_q, state), daemon=True).start()
+    threading.Thread(target=periodic_export_thread, daemon=True).start()
+    if api_port:
+        api_hub = DeltaHub(api_port)
+        threading.Thread(target=api_hub.run, daemon=True).start()
+
 def main():
-    if not os.path.exists(LOG_PATH):
+    global clock
+    args = parse_args()
+    if args.bench_regex:
+        print_regex_bench()
+        return
+    if args.check_replay:
+        sys.exit(0 if check_replay(args.check_replay) else 1)
+    sources = build_sources(args)
+
+    if not any(os.path.exists(src.path) for src in sources):
         root = tk.Tk()
         root.withdraw()
         from tkinter import messagebox
+        paths = "\n".join(src.path for src in sources)
         messagebox.showerror(
             "Game.log Not Found",
-            f"Game.log not found at:\n{LOG_PATH}\n\n"
+            f"Game.log not found at:\n{paths}\n\n"
             "Please start Star Citizen to generate the Game.log file."
         )
         root.destroy()
         return
 
-    load_config()
-
-    scan_thread = threading.Thread(target=scan_log_for_metadata, daemon=True)
-    scan_thread.start()
-
-    threading.Thread(target=tail_file, args=(LOG_PATH, line_q), daemon=True).start()
-    threading.Thread(target=parser_loop, args=(line_q, state), daemon=True).start()
-    threading.Thread(target=periodic_export_thread, daemon=True).start()
+    parser_proc = None
+    if args.process:
+        # The child owns the export; this process only draws snapshots
+        if any(src.replay for src in sources):
+            clock = LogClock(args.speed)
+        parser_proc = ParserProcess(sources, args.speed, args.api)
+        parser_proc.start()
+    else:
+        load_config()
+        start_ingest(sources, args.speed, args.api)
 
     root = tk.Tk()
     root.title("Yertz Advanced Personal Reporter")
-    app = RadarApp(root, state)
+    app = RadarApp(root, state, parser_proc)
 
     def on_close():
+        app.running = False
         try:
-            export_summary_to_file()
+            if parser_proc:
+                parser_proc.stop()
+            else:
+                export_summary_to_file()
         except Exception as e:
             print(f"Error saving on close: {e}")
         finally:
-            os._exit(0)
+            # Remaining threads are daemons and end with the interpreter
+            root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_close)
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file